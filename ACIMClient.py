@@ -1,26 +1,64 @@
 import requests
 import json
-from typing import List, Dict, Optional
+import threading
+from collections import deque
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 class ACIMSMSClient:
     """Client pour l'API SMS PRO d'ACIM SARL"""
     
-    def __init__(self, username: str, token: str, sender: str):
+    DEFAULT_BASE_URL = "https://sms.acim-ci.net:8443/api"
+
+    def __init__(self, username: str, token: str, sender: str, base_url: Optional[str] = None,
+                 pool_size: int = 10, max_retries: int = 2,
+                 timeout: Tuple[float, float] = (5, 30), history_size: int = 100):
         """
         Initialise le client SMS
         
         Args:
             username: Nom d'utilisateur du compte SMS
             token: Token du compte SMS
+            base_url: URL de l'API (par défaut l'API ACIM, surchargeable pour les tests)
+            pool_size: Nombre de connexions keep-alive conservées vers l'API
+            max_retries: Nouvelles tentatives sur erreur de connexion (jamais après
+                envoi de la requête, pour ne pas dupliquer un SMS)
+            timeout: Délais (connexion, lecture) en secondes
+            history_size: Nombre de messages conservés dans `sent_messages` /
+                `failed_messages` (0 désactive l'historique)
         """
-        self.base_url = "https://sms.acim-ci.net:8443/api"
+        self.base_url = (base_url or self.DEFAULT_BASE_URL).rstrip('/')
         self.username = username
         self.token = token
         self.sender = sender
-        self.sent_messages = []  # Messages envoyés avec succès
-        self.failed_messages = []  # Messages échoués
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=max_retries, connect=max_retries, read=0, status=0, backoff_factor=0.5)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.history_size = history_size
+        self._lock = threading.Lock()
+        self.total_sent = 0
+        self.total_failed = 0
+        self.sent_messages = deque(maxlen=history_size)  # Derniers messages envoyés avec succès
+        self.failed_messages = deque(maxlen=history_size)  # Derniers messages échoués
         
+    def _record(self, status_info: Dict):
+        """Comptabilise un envoi et le conserve dans l'historique borné."""
+        with self._lock:
+            if status_info.get('success'):
+                self.total_sent += 1
+                if self.history_size:
+                    self.sent_messages.append(status_info)
+            else:
+                self.total_failed += 1
+                if self.history_size:
+                    self.failed_messages.append(status_info)
+
+
     def send_one_sms(self, dest: str, message: str, 
                      flash: str = "", titre: str = "") -> Dict:
         """
@@ -49,18 +87,14 @@ class ACIMSMSClient:
         }
         
         try:
-            response = requests.post(url, json=payload, timeout=30)
+            response = self.session.post(url, json=payload, timeout=self.timeout)
             response.raise_for_status()
             result = response.json()
             
             # Analyse du statut
             status_info = self._analyze_send_status(result, dest, message)
             
-            # Stockage selon le statut
-            if status_info['success']:
-                self.sent_messages.append(status_info)
-            else:
-                self.failed_messages.append(status_info)
+            self._record(status_info)
             
             return status_info
             
@@ -72,7 +106,7 @@ class ACIMSMSClient:
                 'message': message,
                 'timestamp': datetime.now().isoformat()
             }
-            self.failed_messages.append(error_info)
+            self._record(error_info)
             return error_info
     
     def send_bulk_sms(self, messages: List[Dict]) -> Dict:
@@ -98,7 +132,7 @@ class ACIMSMSClient:
         }
         
         try:
-            response = requests.post(url, json=payload, timeout=30)
+            response = self.session.post(url, json=payload, timeout=self.timeout)
             response.raise_for_status()
             result = response.json()
             
@@ -106,12 +140,10 @@ class ACIMSMSClient:
             status_info = self._analyze_send_status(result, "bulk", f"{len(messages)} messages")
             status_info['messages_count'] = len(messages)
             status_info['messages_details'] = messages
+            # Une entrée `Rep` par destinataire (Ref, Dest, Statut...)
+            status_info['reps'] = result.get('Rep', []) if status_info['success'] else []
             
-            # Stockage selon le statut
-            if status_info['success']:
-                self.sent_messages.append(status_info)
-            else:
-                self.failed_messages.append(status_info)
+            self._record(status_info)
             
             return status_info
             
@@ -122,7 +154,7 @@ class ACIMSMSClient:
                 'messages_count': len(messages),
                 'timestamp': datetime.now().isoformat()
             }
-            self.failed_messages.append(error_info)
+            self._record(error_info)
             return error_info
     
     def get_delivery_report(self, ref: str, dest: str) -> Dict:
@@ -145,7 +177,7 @@ class ACIMSMSClient:
         }
         
         try:
-            response = requests.post(url, json=payload, timeout=30)
+            response = self.session.post(url, json=payload, timeout=self.timeout)
             response.raise_for_status()
             result = response.json()
             
@@ -268,14 +300,18 @@ class ACIMSMSClient:
     
     def get_sent_summary(self) -> Dict:
         """Retourne un résumé des messages envoyés"""
-        return {
-            'total_sent': len(self.sent_messages),
-            'total_failed': len(self.failed_messages),
-            'sent_messages': self.sent_messages,
-            'failed_messages': self.failed_messages
-        }
+        with self._lock:
+            return {
+                'total_sent': self.total_sent,
+                'total_failed': self.total_failed,
+                'sent_messages': list(self.sent_messages),
+                'failed_messages': list(self.failed_messages)
+            }
     
     def reset_history(self):
         """Réinitialise l'historique des envois"""
-        self.sent_messages = []
-        self.failed_messages = []
+        with self._lock:
+            self.total_sent = 0
+            self.total_failed = 0
+            self.sent_messages.clear()
+            self.failed_messages.clear()
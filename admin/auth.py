@@ -1,7 +1,8 @@
 from flask import request, current_app, Response, jsonify, g
 from werkzeug.security import check_password_hash
 from . import admin_bp
-from models import Admin, TokenBlocklist
+from models import Admin
+from blocklist import revoked_tokens, revoke_token
 import jwt
 from datetime import datetime, timedelta
 import uuid
@@ -58,9 +59,9 @@ def decode_token(token):
     """Decode a JWT token and return its payload."""
     algo = _get_jwt_settings()
     payload = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=[algo])
-    # Check blocklist
+    # Check blocklist (in-process cache, see blocklist.py)
     jti = payload.get('jti')
-    if jti and TokenBlocklist.is_blocked(jti):
+    if jti and revoked_tokens.is_revoked(jti):
         raise jwt.InvalidTokenError('Token has been revoked')
     return payload
 
@@ -179,19 +180,8 @@ def logout():
 
     try:
         payload = decode_token(token)
-        jti = payload.get('jti')
-        ttype = payload.get('type') or 'access'
-        # Save jti to blocklist (store numeric admin_id when possible)
-        admin_id_val = None
-        try:
-            admin_id_val = int(payload.get('sub'))
-        except Exception:
-            admin_id_val = payload.get('sub')
-        if jti:
-            tb = TokenBlocklist(jti=jti, token_type=ttype, admin_id=admin_id_val)
-            from models import db
-            db.session.add(tb)
-            db.session.commit()
+        # Save jti to blocklist and to this process's cache
+        revoke_token(payload)
         return jsonify({'message': 'token revoked'}), 200
     except Exception as exc:
         current_app.logger.debug('logout token revoke failed: %s', exc)
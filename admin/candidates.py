@@ -10,6 +10,7 @@ from datetime import datetime
 from . import admin_bp
 from models import db, Candidate, Election
 from .utils import allowed_file
+from election_cache import election_cache
 
 
 @admin_bp.route('/elections/<election_uid>/candidates', methods=['POST'])
@@ -53,6 +54,7 @@ def create_candidate(election_uid):
     c = Candidate(name=name, prenom=prenom, election_id=election.id, photo=photo)
     db.session.add(c)
     db.session.commit()
+    election_cache.invalidate(election.uid)
     return jsonify({'uid': c.uid, 'name': c.name, 'prenom': c.prenom}), 201
 
 
@@ -66,6 +68,7 @@ def delete_candidate(election_uid, candidate_uid):
         return jsonify({'error': "Cannot delete candidate while election is in progress"}), 403
     db.session.delete(candidate)
     db.session.commit()
+    election_cache.invalidate(election.uid)
     return jsonify({'message': 'Candidate deleted'}), 200
 
 
@@ -125,6 +128,7 @@ def update_candidate(election_uid, candidate_uid):
             candidate.photo = photo_field
 
     db.session.commit()
+    election_cache.invalidate(election.uid)
     return jsonify({'uid': candidate.uid, 'name': candidate.name, 'prenom': candidate.prenom, 'photo': candidate.photo}), 200
 
 @admin_bp.route('/elections/<election_uid>/candidates', methods=['GET'])
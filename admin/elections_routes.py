@@ -1,8 +1,12 @@
 from flask import jsonify, request
 from datetime import datetime
+import os
 from . import admin_bp
 from models import db, Election, Candidate
 from .utils import _parse_datetime
+from utils import build_results
+from election_cache import election_cache
+from sealing import seal_election, unseal_election, archive_election, sealed_payload
 
 
 @admin_bp.route('/elections', methods=['GET'])
@@ -42,6 +46,7 @@ def create_election():
             c = Candidate(name=name, prenom=prenom, election_id=election.id, photo=photo)
             db.session.add(c)
     db.session.commit()
+    election_cache.invalidate(election.uid)
     return jsonify({'uid': election.uid, 'title': election.title}), 201
 
 
@@ -50,6 +55,7 @@ def delete_election(election_uid):
     election = Election.query.filter_by(uid=election_uid).first_or_404()
     db.session.delete(election)
     db.session.commit()
+    election_cache.invalidate(election_uid)
     return jsonify({'message': 'Election deleted'}), 200
 
 
@@ -75,25 +81,55 @@ def update_election(election_uid):
         election.start_at = start_at
     if end_at is not None:
         election.end_at = end_at
+        # Reopening a sealed election discards its frozen results
+        if end_at > datetime.utcnow():
+            try:
+                unseal_election(election)
+            except ValueError as e:
+                db.session.rollback()
+                return jsonify({'error': str(e)}), 409
 
     db.session.commit()
+    election_cache.invalidate(election.uid)
     return jsonify({'uid': election.uid, 'title': election.title, 'start_at': election.start_at, 'end_at': election.end_at}), 200
 
 
 @admin_bp.route('/elections/<election_uid>/results', methods=['GET'])
 def results(election_uid):
+    """Live counts until the election is sealed, then its frozen final results (never seals)."""
     election = Election.query.filter_by(uid=election_uid).first_or_404()
-    results = []
-    for candidate in election.candidates:
-        vote_count = candidate.votes and len(candidate.votes) or 0
-        results.append({
-            'candidate_uid': candidate.uid,
-            'name': candidate.name,
-            'prenom': getattr(candidate, 'prenom', ''),
-            'photo': getattr(candidate, 'photo', ''),
-            'vote_count': vote_count
+    sealed = election.final_result
+    if sealed is not None:
+        return jsonify({
+            'election': {'uid': election.uid, 'title': election.title},
+            'results': sealed.results,
+            'final': sealed_payload(sealed),
         })
+    results = build_results(election)
     return jsonify({
         'election': {'uid': election.uid, 'title': election.title},
         'results': results
     })
+
+
+@admin_bp.route('/elections/<election_uid>/seal', methods=['POST'])
+def seal(election_uid):
+    """Freeze the final results of a closed election (also done by `flask elections seal`)."""
+    election = Election.query.filter_by(uid=election_uid).first_or_404()
+    try:
+        sealed = seal_election(election)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify({'uid': election.uid, 'final': sealed_payload(sealed)}), 200
+
+
+@admin_bp.route('/elections/<election_uid>/archive', methods=['POST'])
+def archive(election_uid):
+    """Move the vote and token rows of a closed election to a compressed file and delete them."""
+    election = Election.query.filter_by(uid=election_uid).first_or_404()
+    try:
+        report = archive_election(election)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify({'uid': election.uid, 'archived_votes': report['votes'], 'archived_tokens': report['tokens'],
+                    'archive': os.path.basename(report['path'])}), 200
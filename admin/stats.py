@@ -1,26 +1,82 @@
-from flask import jsonify
+from flask import jsonify, request, current_app, Response, stream_with_context
 from . import admin_bp
-from models import db, Vote, VoteToken, Candidate, Election
-from sqlalchemy import func
+from models import db, VoteToken, Candidate, Election, TurnoutBucket, ElectionResult
+from sqlalchemy import func, select
+import csv
+import io
+import json
+from extensions import results_broadcaster
+from vote_batcher import vote_batcher
+from .utils import _parse_datetime
 
 
 @admin_bp.route('/stats', methods=['GET'])
 def get_stats():
-    elections = Election.query.order_by(Election.created_at.desc()).all()
-    stats_list = []
-    for e in elections:
-        total_voters = db.session.query(func.count(func.distinct(VoteToken.phone_number))).filter(VoteToken.election_id == e.id).scalar() or 0
-        total_tokens = db.session.query(func.count(VoteToken.id)).filter(VoteToken.election_id == e.id).scalar() or 0
-        votes_cast = db.session.query(func.count(Vote.id)).filter(Vote.election_id == e.id).scalar() or 0
-        total_candidates = db.session.query(func.count(Candidate.id)).filter(Candidate.election_id == e.id).scalar() or 0
+    """Per-election participation stats computed in a single grouped query.
+
+    Sealed elections (see sealing.py) are read from their frozen `ElectionResult`
+    row; only open elections are aggregated from the token and candidate tables.
+
+    Optional query parameters:
+    - `from` / `to`: only elections whose voting window overlaps this range.
+    - `page` / `per_page`: paginate the list (total returned in `X-Total-Count`).
+    """
+    try:
+        date_from = _parse_datetime(request.args.get('from'))
+        date_to = _parse_datetime(request.args.get('to'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        page = int(request.args['page']) if 'page' in request.args else None
+        per_page = int(request.args.get('per_page', 50))
+    except ValueError:
+        return jsonify({'error': 'page and per_page must be integers'}), 400
+    if (page is not None and page < 1) or per_page < 1:
+        return jsonify({'error': 'page and per_page must be positive'}), 400
+
+    sealed_ids = select(ElectionResult.election_id).scalar_subquery()
+    token_counts = db.session.query(
+        VoteToken.election_id.label('election_id'),
+        func.count(func.distinct(VoteToken.phone_number)).label('total_voters'),
+        func.count(VoteToken.id).label('total_tokens'),
+    ).filter(VoteToken.election_id.notin_(sealed_ids)).group_by(VoteToken.election_id).subquery()
+    # votes_cast is the sum of the per-candidate counters (see Candidate.vote_count)
+    candidate_counts = db.session.query(
+        Candidate.election_id.label('election_id'),
+        func.count(Candidate.id).label('total_candidates'),
+        func.sum(Candidate.vote_count).label('votes_cast'),
+    ).filter(Candidate.election_id.notin_(sealed_ids)).group_by(Candidate.election_id).subquery()
 
+    query = db.session.query(
+        Election.uid,
+        Election.title,
+        func.coalesce(ElectionResult.total_voters, token_counts.c.total_voters, 0),
+        func.coalesce(ElectionResult.total_tokens, token_counts.c.total_tokens, 0),
+        func.coalesce(ElectionResult.votes_cast, candidate_counts.c.votes_cast, 0),
+        func.coalesce(ElectionResult.total_candidates, candidate_counts.c.total_candidates, 0),
+    ).outerjoin(ElectionResult, ElectionResult.election_id == Election.id) \
+     .outerjoin(token_counts, token_counts.c.election_id == Election.id) \
+     .outerjoin(candidate_counts, candidate_counts.c.election_id == Election.id)
+    if date_from:
+        query = query.filter(Election.end_at >= date_from)
+    if date_to:
+        query = query.filter(Election.start_at <= date_to)
+
+    headers = {}
+    query = query.order_by(Election.created_at.desc(), Election.id.desc())
+    if page is not None:
+        headers['X-Total-Count'] = str(query.order_by(None).count())
+        query = query.offset((page - 1) * per_page).limit(per_page)
+
+    stats_list = []
+    for uid, title, total_voters, total_tokens, votes_cast, total_candidates in query.all():
         participation_rate = 0.0
         if total_voters:
             participation_rate = float(votes_cast) / float(total_voters)
 
         stats_list.append({
-            'election_uid': e.uid,
-            'title': e.title,
+            'election_uid': uid,
+            'title': title,
             'total_voters': int(total_voters),
             'total_tokens': int(total_tokens),
             'votes_cast': int(votes_cast),
@@ -28,17 +84,188 @@ def get_stats():
             'participation_rate': participation_rate
         })
 
-    return jsonify(stats_list), 200
+    return jsonify(stats_list), 200, headers
+
+
+@admin_bp.route('/stats/broadcast', methods=['GET'])
+def get_broadcast_stats():
+    """Counters of the coalescing `results_update` broadcaster."""
+    return jsonify(results_broadcaster.metrics()), 200
+
+
+@admin_bp.route('/stats/votes', methods=['GET'])
+def get_vote_batcher_stats():
+    """Counters of the group-commit vote writer (`VOTE_GROUP_COMMIT`)."""
+    return jsonify(vote_batcher.metrics()), 200
+
+
+@admin_bp.route('/elections/<election_uid>/turnout', methods=['GET'])
+def get_turnout(election_uid):
+    """Votes over time from the turnout rollup (never scans the Vote table).
+
+    Query parameters: `granularity` (`minute` or `hour`, default `hour`),
+    `from` / `to` (ISO datetimes, UTC) and `by_candidate=1` for per-candidate counts.
+    """
+    election = Election.query.filter_by(uid=election_uid).first_or_404()
+    granularity = request.args.get('granularity', 'hour')
+    if granularity not in ('minute', 'hour'):
+        return jsonify({'error': 'granularity must be minute or hour'}), 400
+    try:
+        date_from = _parse_datetime(request.args.get('from'))
+        date_to = _parse_datetime(request.args.get('to'))
+        by_candidate = _parse_bool(request.args.get('by_candidate')) or False
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    filters = [TurnoutBucket.election_id == election.id, TurnoutBucket.granularity == granularity]
+    if date_from:
+        filters.append(TurnoutBucket.bucket_start >= date_from)
+    if date_to:
+        filters.append(TurnoutBucket.bucket_start <= date_to)
+
+    buckets = []
+    if by_candidate:
+        rows = db.session.query(TurnoutBucket.bucket_start, Candidate.uid, TurnoutBucket.count) \
+            .join(Candidate, Candidate.id == TurnoutBucket.candidate_id) \
+            .filter(*filters).order_by(TurnoutBucket.bucket_start).all()
+        for bucket_start, candidate_uid, count in rows:
+            if not buckets or buckets[-1]['start'] != bucket_start:
+                buckets.append({'start': bucket_start, 'votes': 0, 'candidates': {}})
+            buckets[-1]['votes'] += count
+            buckets[-1]['candidates'][candidate_uid] = count
+    else:
+        rows = db.session.query(TurnoutBucket.bucket_start, func.sum(TurnoutBucket.count)) \
+            .filter(*filters).group_by(TurnoutBucket.bucket_start).order_by(TurnoutBucket.bucket_start).all()
+        buckets = [{'start': bucket_start, 'votes': int(votes)} for bucket_start, votes in rows]
+
+    return jsonify({
+        'election_uid': election.uid,
+        'granularity': granularity,
+        'total': sum(b['votes'] for b in buckets),
+        'buckets': buckets,
+    }), 200
+
+
+VOTER_COLUMNS = ('id', 'phone', 'token', 'is_active', 'sent')
+
+
+def _parse_bool(value):
+    if value is None:
+        return None
+    value = value.lower()
+    if value in ('1', 'true', 'yes'):
+        return True
+    if value in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f'invalid boolean: {value}')
+
+
+def _voters_query(election_id):
+    """Column-only SELECT of an election's voters with the `sent`, `is_active` and `phone` filters."""
+    sent = _parse_bool(request.args.get('sent'))
+    is_active = _parse_bool(request.args.get('is_active'))
+    phone_prefix = request.args.get('phone')
+    stmt = select(VoteToken.id, VoteToken.phone_number, VoteToken.token, VoteToken.is_active, VoteToken.sent) \
+        .where(VoteToken.election_id == election_id)
+    if sent is not None:
+        stmt = stmt.where(VoteToken.sent.is_(sent))
+    if is_active is not None:
+        stmt = stmt.where(VoteToken.is_active.is_(is_active))
+    if phone_prefix:
+        escaped = phone_prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        stmt = stmt.where(VoteToken.phone_number.like(escaped + '%', escape='\\'))
+    return stmt.order_by(VoteToken.id)
+
+
+def _voter_row(row) -> dict:
+    return {'id': row.id, 'phone': row.phone_number, 'token': row.token, 'is_active': row.is_active, 'sent': row.sent}
+
+
+def _archived_response(election):
+    """410 response if the election's voter rows were archived (see sealing.py), else None."""
+    sealed = election.final_result
+    if sealed is None or sealed.archived_at is None:
+        return None
+    return jsonify({'error': 'voters of this election were archived', 'archived_at': sealed.archived_at}), 410
 
 
 @admin_bp.route('/elections/<election_uid>/votants', methods=['GET', 'OPTIONS'])
 def list_voters(election_uid):
+    """Voters of an election, ordered by id.
+
+    Without `limit` or `after` every voter is returned, as before pagination
+    existed. With either, one page is returned (keyset pagination): `limit`
+    (default `VOTER_PAGE_SIZE`), `after` (the `X-Next-Cursor` of the previous
+    page). Filters: `sent`, `is_active` (true/false) and `phone` (number prefix).
+    """
     election = Election.query.filter_by(uid=election_uid).first_or_404()
-    voters = VoteToken.query.filter_by(election_id=election.id).all()
-    result = []
-    for v in voters:
-        result.append({'phone': v.phone_number, 'token': v.token, 'is_active': v.is_active, 'sent': v.sent})
-    return jsonify(result)
+    archived = _archived_response(election)
+    if archived is not None:
+        return archived
+    max_limit = int(current_app.config.get('VOTER_PAGE_MAX', 5000))
+    try:
+        stmt = _voters_query(election.id)
+        if 'limit' not in request.args and 'after' not in request.args:
+            return jsonify([_voter_row(r) for r in db.session.execute(stmt)]), 200
+        limit = int(request.args.get('limit', current_app.config.get('VOTER_PAGE_SIZE', 500)))
+        after = int(request.args['after']) if request.args.get('after') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+    limit = min(limit, max_limit)
+    if after is not None:
+        stmt = stmt.where(VoteToken.id > after)
+    # One extra row tells whether another page follows
+    rows = db.session.execute(stmt.limit(limit + 1)).all()
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers['X-Next-Cursor'] = str(rows[-1].id)
+    return jsonify([_voter_row(r) for r in rows]), 200, headers
+
+
+@admin_bp.route('/elections/<election_uid>/votants/export', methods=['GET'])
+def export_voters(election_uid):
+    """Stream every voter matching the filters as NDJSON (default) or CSV (`?format=csv`).
+
+    Rows are read from a server-side cursor in chunks, so memory use does not
+    depend on the size of the roster.
+    """
+    election = Election.query.filter_by(uid=election_uid).first_or_404()
+    archived = _archived_response(election)
+    if archived is not None:
+        return archived
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    try:
+        stmt = _voters_query(election.id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    chunk = int(current_app.config.get('VOTER_EXPORT_CHUNK_SIZE', 1000))
+
+    def generate():
+        result = db.session.execute(stmt.execution_options(stream_results=True, yield_per=chunk))
+        if fmt == 'csv':
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            writer.writerow(VOTER_COLUMNS)
+            for partition in result.partitions():
+                for r in partition:
+                    writer.writerow((r.id, r.phone_number, r.token, int(bool(r.is_active)), int(bool(r.sent))))
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+            yield buf.getvalue()
+        else:
+            for partition in result.partitions():
+                yield ''.join(json.dumps(_voter_row(r)) + '\n' for r in partition)
+
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    filename = f'votants-{election.uid}.{"csv" if fmt == "csv" else "ndjson"}'
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
 
 @admin_bp.route('/elections/<election_uid>/votants/<phone>', methods=['DELETE'])
 def delete_voters(election_uid, phone):
@@ -1,170 +1,176 @@
 from flask import request, jsonify, current_app
 from . import admin_bp
 from models import Election, db, VoteToken
-from utils import get_accuse_sms, obfuscate_token, send_vote_one_sms, send_vote_sms_bulk
-import csv
+from utils import normalize_phone, is_valid_phone, import_voters_csv, TOKEN_INSERT_RETRIES
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from sqlalchemy.exc import IntegrityError
+from dispatch import start_send_job, get_job, campaign_progress, outbox_stats, requeue_failed, JobAlreadyRunning
+from campaign import CampaignRenderer
 import io
 
 
 @admin_bp.route('/elections/<election_uid>/tokens/create/csv', methods=['POST'])
 def create_tokens_csv(election_uid):
-    """Import a CSV of voters and send each a voting URL containing their token.
+    """Import a CSV of voters and create a vote token for each new phone number.
 
     Expects a multipart/form-data file field named `file` (CSV) with a header column `phone` or `phone_number`.
+    The upload is parsed as a stream and written in batches (see `utils.import_voters_csv`).
+    If the file becomes unreadable part-way, the batches already written are kept and the
+    response is 207 with `stopped_at` (line and error); re-uploading the fixed file skips them.
     """
     # file required
     upload = request.files.get('file')
     if not upload:
         return jsonify({'error': 'file is required (multipart/form-data with field "file")'}), 400
 
-    # read CSV
-    try:
-        content = upload.stream.read().decode('utf-8')
-    except Exception:
-        return jsonify({'error': 'cannot read uploaded file'}), 400
-    
     election = Election.query.filter_by(uid=election_uid).first_or_404()
-    reader = csv.DictReader(io.StringIO(content))
-    created = []
-    errors = []
-    with current_app.app_context():
-        for row in reader:
-            phone = (row.get('phone') or row.get('phone_number') or row.get('telephone') or row.get('numero') or '').strip()
-            
-            if phone.startswith('+225'):
-                phone = phone[1:]
-            elif not phone.startswith('225'):
-                phone = '225' + phone
-
-            if not phone:
-                errors.append({'row': row, 'error': 'missing phone number'})
-                continue
-            # create token by phone number
-            vtoken = VoteToken.query.filter_by(phone_number=phone, election_id=election.id).first()
-            if not vtoken:
-                vtoken = VoteToken(phone_number=phone, election_id=election.id)
-
-            if vtoken:
-                created.append({'phone': phone, 'token': vtoken.token})
-                db.session.add(vtoken)
-            else:
-                errors.append({'phone': phone, 'error': 'token for this phone already exists'})
-
-        db.session.commit()
-    
-    if not created:
-        return jsonify({'error': 'no tokens created', 'errors': errors}), 400
-
-    return jsonify({'created': len(created), 'errors': errors}), 201
+    chunk_size = int(current_app.config.get('VOTER_IMPORT_CHUNK_SIZE', 5000))
+    stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+    report = import_voters_csv(stream, election.id, chunk_size=chunk_size)
+
+    if not report['created'] and not report['skipped']:
+        if report.get('stopped_at'):
+            return jsonify({'error': 'cannot read uploaded file', 'stopped_at': report['stopped_at']}), 400
+        return jsonify({'error': 'no tokens created', 'errors': report['errors']}), 400
+    if report.get('stopped_at'):
+        return jsonify(report), 207
+
+    return jsonify(report), 201
 
 @admin_bp.route('/elections/<election_uid>/tokens/create/phone', methods=['POST'])
 def create_token_phone(election_uid):
     """
     Create a single vote token for the specified phone number provided in JSON body.
-    Example JSON body: {"phone": "2250554760285"}
+    Example JSON body: {"phone": "2250554760285", "email": "voter@example.com"}
     """
     data = request.get_json() or {}
-    phone = (data.get('phone') or data.get('phone_number') or '').strip()
-
-    if phone.startswith('+225'):
-        phone = phone[1:]
-    elif not phone.startswith('225'):
-        phone = '225' + phone
+    phone = normalize_phone(data.get('phone') or data.get('phone_number'))
+    email = (data.get('email') or '').strip() or None
 
     if not phone:
         return jsonify({'error': 'phone parameter is required'}), 400
+    if not is_valid_phone(phone):
+        return jsonify({'error': 'invalid phone number'}), 400
 
     election = Election.query.filter_by(uid=election_uid).first_or_404()
-    if not VoteToken.query.filter_by(phone_number=phone, election_id=election.id).first():
-        vtoken = VoteToken(phone_number=phone, election_id=election.id)
-        db.session.add(vtoken)
-        db.session.commit()
-        return jsonify({'phone': phone, 'token': vtoken.token}), 201
-    else:
+    if VoteToken.query.filter_by(phone_number=phone, election_id=election.id).first():
         return jsonify({'error': 'token for this phone already exists'}), 400
 
+    vtoken = VoteToken(phone_number=phone, email=email, election_id=election.id)
+    for _ in range(TOKEN_INSERT_RETRIES):
+        db.session.add(vtoken)
+        try:
+            db.session.commit()
+            return jsonify({'phone': phone, 'token': vtoken.token}), 201
+        except IntegrityError:
+            db.session.rollback()
+            if VoteToken.query.filter_by(phone_number=phone, election_id=election.id).first():
+                return jsonify({'error': 'token for this phone already exists'}), 400
+            # token collision: retry with a fresh value
+            vtoken = VoteToken(phone_number=phone, email=email, election_id=election.id)
+    return jsonify({'error': 'could not generate a unique token'}), 500
+
 @admin_bp.route('/elections/<election_uid>/tokens/send', methods=['POST'])
 def send_tokens(election_uid):
     """
-    Send SMS to voters with their voting URLs.
+    Send SMS (or emails with `?channel=email`) to voters with their voting URLs (tokens not sent yet).
+    Runs as a background job; poll `/jobs/<job_id>` for progress.
     """
     election = Election.query.filter_by(uid=election_uid).first_or_404()
-    vote_tokens = VoteToken.query.filter_by(election_id=election.id, sent=False).all()
-    sent = []
-    errors = []
-    for vote_token in vote_tokens:
-        result = send_vote_one_sms(vote_token, election_uid)
-        if not result.get('success'):
-            errors.append({'phone': vote_token.phone_number, 'error': result.get('error', 'unknown error')})
-            continue
-
-        ref = result.get('ref') if result.get('ref') not in (None, '', 'N/A') else None
-        dest = vote_token.phone_number
-        delivery_confirmed = False
-        ack_error = None
-
-        if ref:
-            delivery_confirmed = get_accuse_sms(ref, dest)
-            if not delivery_confirmed:
-                ack_error = 'accuse de reception indisponible'
-        else:
-            ack_error = 'reference sms indisponible'
-
-        vote_token.sent = True
-        db.session.commit()
-
-        sent.append({
-            'phone': vote_token.phone_number,
-            'is_active': vote_token.is_active,
-            'sent': vote_token.sent,
-            'delivery_confirmed': delivery_confirmed,
-            'ref': ref
-        })
-
-        if ack_error:
-            errors.append({'phone': vote_token.phone_number, 'error': ack_error, 'ref': ref})
-    
-    return jsonify({'sent': len(sent), 'errors': errors}), 200
+    try:
+        job = start_send_job(current_app._get_current_object(), election, mode=request.args.get('mode'),
+                             channel=request.args.get('channel', 'sms'))
+    except JobAlreadyRunning as e:
+        return jsonify({'error': str(e), 'job_id': e.campaign}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(job.to_dict()), 202
 
 @admin_bp.route('/elections/<election_uid>/tokens/send/all', methods=['POST'])
 def send_all_tokens(election_uid):
     """
-    Send SMS to all voters with their voting URLs, regardless of sent status.
+    Send SMS (or emails with `?channel=email`) to all voters with their voting URLs, regardless of sent status.
+    Runs as a background job; poll `/jobs/<job_id>` for progress.
     """
     election = Election.query.filter_by(uid=election_uid).first_or_404()
-    vote_tokens = VoteToken.query.filter_by(election_id=election.id).all()
-    sent = []
-    errors = []
-    for vote_token in vote_tokens:
-        result = send_vote_one_sms(vote_token, election_uid)
-        if not result.get('success'):
-            errors.append({'phone': vote_token.phone_number, 'error': result.get('error', 'unknown error')})
-            continue
-
-        ref = result.get('ref') if result.get('ref') not in (None, '', 'N/A') else None
-        dest = vote_token.phone_number
-        delivery_confirmed = False
-        ack_error = None
-
-        if ref:
-            delivery_confirmed = get_accuse_sms(ref, dest)
-            if not delivery_confirmed:
-                ack_error = 'accuse de reception indisponible'
-        else:
-            ack_error = 'reference sms indisponible'
-
-        vote_token.sent = True
-        db.session.commit()
-
-        sent.append({
-            'phone': vote_token.phone_number,
-            'is_active': vote_token.is_active,
-            'sent': vote_token.sent,
-            'delivery_confirmed': delivery_confirmed,
-            'ref': ref
-        })
-
-        if ack_error:
-            errors.append({'phone': vote_token.phone_number, 'error': ack_error, 'ref': ref})
-    
-    return jsonify({'sent': len(sent), 'errors': errors}), 200
+    try:
+        job = start_send_job(current_app._get_current_object(), election, resend_all=True, mode=request.args.get('mode'),
+                             channel=request.args.get('channel', 'sms'))
+    except JobAlreadyRunning as e:
+        return jsonify({'error': str(e), 'job_id': e.campaign}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(job.to_dict()), 202
+
+@admin_bp.route('/elections/<election_uid>/tokens/send/estimate', methods=['GET'])
+def estimate_send(election_uid):
+    """SMS segments a send (or resend with `?all=1`) would cost, computed before sending."""
+    election = Election.query.filter_by(uid=election_uid).first_or_404()
+    query = VoteToken.query.options(joinedload(VoteToken.short_link)).filter_by(election_id=election.id)
+    if request.args.get('all', '').lower() not in ('1', 'true', 'yes'):
+        query = query.filter_by(sent=False)
+    renderer = CampaignRenderer(election.uid)
+    estimate = renderer.estimate(query.yield_per(1000))
+    estimate['election_uid'] = election.uid
+    return jsonify(estimate), 200
+
+@admin_bp.route('/elections/<election_uid>/tokens/delivery', methods=['GET'])
+def delivery_stats(election_uid):
+    """Aggregate SMS delivery states for the election's tokens."""
+    election = Election.query.filter_by(uid=election_uid).first_or_404()
+    counts = dict(
+        db.session.query(VoteToken.delivery_status, func.count(VoteToken.id))
+        .filter(VoteToken.election_id == election.id, VoteToken.sent.is_(True))
+        .group_by(VoteToken.delivery_status).all()
+    )
+    total = VoteToken.query.filter_by(election_id=election.id).count()
+    sent = sum(counts.values())
+    return jsonify({
+        'election_uid': election.uid,
+        'total': total,
+        'not_sent': total - sent,
+        'sent': sent,
+        'delivered': counts.get('delivered', 0),
+        'pending': counts.get('pending', 0),
+        'failed': counts.get('failed', 0),
+        'unknown': counts.get('unknown', 0) + counts.get(None, 0),
+    }), 200
+
+@admin_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_send_job(job_id):
+    """Progress of a background SMS send job.
+
+    Detailed counters are only known by the process running the job; the
+    outbox state counts are available from any process.
+    """
+    job = get_job(job_id)
+    outbox = campaign_progress(job_id)
+    if not job and not any(outbox.values()):
+        return jsonify({'error': 'job not found'}), 404
+    result = job.to_dict() if job else {'job_id': job_id}
+    result['outbox'] = outbox
+    return jsonify(result), 200
+
+@admin_bp.route('/outbox/stats', methods=['GET'])
+def get_outbox_stats():
+    """Outbox queue depth per channel and state, and recent send throughput."""
+    try:
+        window = int(request.args.get('window', 60))
+    except ValueError:
+        return jsonify({'error': 'window must be an integer'}), 400
+    return jsonify(outbox_stats(window_seconds=max(window, 1))), 200
+
+@admin_bp.route('/outbox/requeue', methods=['POST'])
+def requeue_outbox():
+    """Requeue failed outbox messages, optionally for one election or job.
+
+    Messages interrupted mid-send are left alone: they may already have been
+    delivered and are only requeued with `flask outbox requeue --interrupted`.
+    """
+    data = request.get_json(silent=True) or {}
+    election_id = None
+    if data.get('election_uid'):
+        election_id = Election.query.filter_by(uid=data['election_uid']).first_or_404().id
+    count = requeue_failed(election_id=election_id, campaign=data.get('job_id'))
+    return jsonify({'requeued': count}), 200
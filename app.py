@@ -5,7 +5,10 @@ from dotenv import load_dotenv
 load_dotenv()
 from config import Config
 from models import db
-from extensions import socketio
+from extensions import socketio, results_broadcaster
+from blocklist import revoked_tokens
+from election_cache import election_cache
+from vote_batcher import vote_batcher
 from flask_migrate import Migrate
 from flask_cors import CORS
 
@@ -16,8 +19,27 @@ def create_app():
     app.config.setdefault('UPLOAD_FOLDER', os.path.join(app.root_path, 'uploads'))
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     db.init_app(app)
-    socketio.init_app(app)
-    Migrate(app, db)
+    # With a message queue (Redis/Kombu URL) every worker relays emits to the
+    # clients it holds, so rooms are shared across processes and nodes
+    socketio.init_app(
+        app,
+        message_queue=app.config.get('SOCKETIO_MESSAGE_QUEUE') or None,
+        channel=app.config.get('SOCKETIO_CHANNEL', 'flask-socketio'),
+    )
+    results_broadcaster.init_app(app)
+    revoked_tokens.init_app(app)
+    election_cache.init_app(app)
+    vote_batcher.init_app(app)
+    # Batch mode lets Alembic alter constraints on SQLite (copy-and-move tables)
+    Migrate(app, db, render_as_batch=True)
+
+    from commands import register_commands
+    register_commands(app)
+
+    # Optional in-process delivery receipt polling (otherwise run `flask sms reconcile-deliveries --loop`)
+    if app.config.get('DELIVERY_RECONCILER_ENABLED'):
+        from dispatch import start_delivery_reconciler
+        start_delivery_reconciler(app)
 
     # Configure CORS to allow the configured frontend origin and support cookies (credentials).
     # Use the configured `FRONTEND_URL` so the browser accepts cookies (credentials must have a concrete origin).
@@ -25,7 +47,9 @@ def create_app():
     #if frontend_origin:
         #CORS(app, resources={r"/api/*": {"origins": frontend_origin}}, supports_credentials=True)
     #else:
-    CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True)
+    # Pagination cursors and totals travel in response headers the admin frontend must be able to read
+    CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True,
+         expose_headers=['X-Next-Cursor', 'X-Total-Count'])
 
     # simple root
     @app.route('/')
@@ -54,10 +78,12 @@ def create_app():
         return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
     
     from admin import admin_bp
-    from public import public_bp
+    from public import public_bp, shortlink_bp
 
     app.register_blueprint(admin_bp, url_prefix='/api/v1/admin')
     app.register_blueprint(public_bp, url_prefix='/api/v1')
+    # Short vote links (`/s/<code>` by default) redirect to the frontend vote page
+    app.register_blueprint(shortlink_bp, url_prefix=app.config.get('SHORTLINK_PREFIX', '/s'))
 
     return app
 
@@ -0,0 +1,520 @@
+"""Benchmarks and load tests behind the `flask ... bench` commands.
+
+Kept out of the runtime modules: nothing here is imported by the application,
+only by `commands.py`. Benchmarks that need data run against the configured
+database on throwaway elections (`throwaway_elections`), deleted with all
+their rows afterwards.
+"""
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+@contextmanager
+def throwaway_elections(app):
+    """Yield `create(title, start_at=None, end_at=None) -> election id`; created elections are deleted on exit.
+
+    Elections are open for an hour by default. The cleanup uses bulk deletes
+    (no ORM cascade), so it stays fast with a million tokens.
+    """
+    from models import db, Election
+
+    ids = []
+
+    def create(title, start_at=None, end_at=None):
+        with app.app_context():
+            now = datetime.utcnow()
+            election = Election(title=title, start_at=start_at or now, end_at=end_at or now + timedelta(hours=1))
+            db.session.add(election)
+            db.session.commit()
+            ids.append(election.id)
+            return election.id
+
+    try:
+        yield create
+    finally:
+        if ids:
+            with app.app_context():
+                _delete_elections(ids)
+
+
+def _delete_elections(ids):
+    from models import (db, Election, Candidate, Vote, VoteToken, ShortLink, OutboxMessage,
+                        TurnoutBucket, ElectionResult)
+
+    token_ids = db.session.query(VoteToken.id).filter(VoteToken.election_id.in_(ids)).scalar_subquery()
+    db.session.query(ShortLink).filter(ShortLink.vote_token_id.in_(token_ids)).delete(synchronize_session=False)
+    for model in (OutboxMessage, ElectionResult, TurnoutBucket, Vote, VoteToken, Candidate):
+        db.session.query(model).filter(model.election_id.in_(ids)).delete(synchronize_session=False)
+    db.session.query(Election).filter(Election.id.in_(ids)).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def _count_statements(engine):
+    """Start counting the SQL statements run on `engine`; returns `(statements, stop)`."""
+    from sqlalchemy import event
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', count_statement)
+    return statements, lambda: event.remove(engine, 'before_cursor_execute', count_statement)
+
+
+def benchmark_token_lookup(app, sizes: list, lookups: int = 1000, chunk_size: int = 10000) -> list:
+    """Latency of `get_vote_token_by_hash` for each token count of `sizes`.
+
+    One throwaway election is filled by bulk INSERT up to each size, in
+    increasing order; each step resolves `lookups` random hashes. Latency should
+    stay flat however large the table grows (index on `token_hash`). Returns one
+    report per size.
+    """
+    from sqlalchemy import insert
+    from models import db, VoteToken
+    from utils import _with_new_token, get_vote_token_by_hash
+
+    reports = []
+    hashes = []
+    with throwaway_elections(app) as create:
+        election_id = create('token lookup benchmark')
+        with app.app_context():
+            insert_stmt = insert(VoteToken.__table__)
+            for size in sorted(sizes):
+                while len(hashes) < size:
+                    start = len(hashes)
+                    rows = [
+                        _with_new_token({'phone_number': f'L{election_id % 1000:03d}{i:09d}', 'election_id': election_id,
+                                         'is_active': True, 'sent': False})
+                        for i in range(start, min(size, start + chunk_size))
+                    ]
+                    db.session.execute(insert_stmt, rows)
+                    db.session.commit()
+                    hashes.extend(row['token_hash'] for row in rows)
+                latencies = []
+                for token_hash in random.sample(hashes, min(lookups, len(hashes))):
+                    started = time.perf_counter()
+                    found = get_vote_token_by_hash(token_hash)
+                    latencies.append(time.perf_counter() - started)
+                    if found is None:
+                        raise RuntimeError(f'token {token_hash} not found')
+                    # no identity-map hit between two lookups
+                    db.session.expunge_all()
+                latencies.sort()
+                reports.append({
+                    'tokens': len(hashes),
+                    'lookups': len(latencies),
+                    'p50_us': round(percentile(latencies, 50) * 1e6, 1),
+                    'p99_us': round(percentile(latencies, 99) * 1e6, 1),
+                })
+    return reports
+
+
+def benchmark_token_generation(app, count: int = 10000, chunk_size: int = 1000) -> list:
+    """Create `count` tokens with and without a uniqueness SELECT per token.
+
+    `select_per_token` is the former path (a SELECT on `token` for every uuid4
+    before using it), `constraint` the current one (`VoteToken.generate_token`,
+    uniqueness enforced by the UNIQUE constraint). Both write in commits of
+    `chunk_size` tokens to their own throwaway election. Returns one report per path.
+    """
+    from models import db, VoteToken
+
+    def select_per_token():
+        while True:
+            candidate = VoteToken.generate_token()
+            if not VoteToken.query.filter_by(token=candidate).first():
+                return candidate
+
+    reports = []
+    for name, make_token in (('select_per_token', select_per_token), ('constraint', None)):
+        with throwaway_elections(app) as create:
+            election_id = create('token generation benchmark')
+            with app.app_context():
+                statements, stop = _count_statements(db.engine)
+                try:
+                    started = time.perf_counter()
+                    for start in range(0, count, chunk_size):
+                        db.session.add_all([
+                            VoteToken(phone_number=f'G{election_id % 1000:03d}{i:09d}', election_id=election_id,
+                                      **({'token': make_token()} if make_token else {}))
+                            for i in range(start, min(count, start + chunk_size))
+                        ])
+                        db.session.commit()
+                    elapsed = time.perf_counter() - started
+                finally:
+                    stop()
+                    db.session.rollback()
+        reports.append({
+            'path': name,
+            'tokens': count,
+            'seconds': round(elapsed, 3),
+            'tokens_per_sec': round(count / elapsed, 1),
+            'queries': len(statements),
+        })
+    return reports
+
+
+class _CountingSocketIO:
+    """Stand-in for the Socket.IO server that counts emits and bytes instead of sending."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.emits = 0
+        self.bytes = 0
+
+    def emit(self, event, payload, to=None):
+        size = len(payload) if isinstance(payload, bytes) else len(json.dumps(payload).encode('utf-8'))
+        with self._lock:
+            self.emits += 1
+            self.bytes += size
+
+    def start_background_task(self, target):
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        return thread
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+def broadcast_load_test(voters: int, subscribers: int, intervals_ms: list, candidates: int = 10,
+                        duration: float = 2.0, concurrency: int = 32, delta: bool = False,
+                        protocol: str = 'full') -> list:
+    """Simulate `voters` ballots spread over `duration` seconds on one election watched by `subscribers`.
+
+    Each ballot publishes the new counts to a `ResultsBroadcaster` (one per
+    interval of `intervals_ms`) whose emits are counted, not sent; every emit
+    reaches each subscriber of the room, so deliveries and bytes are the emit
+    figures times `subscribers`. An interval of 0 is the uncoalesced baseline.
+    Returns one report per interval.
+    """
+    import uuid
+    from concurrent.futures import ThreadPoolExecutor
+    from extensions import ResultsBroadcaster
+
+    election_uid = str(uuid.uuid4())
+    candidate_uids = [str(uuid.uuid4()) for _ in range(candidates)]
+    reports = []
+    for interval_ms in intervals_ms:
+        sio = _CountingSocketIO()
+        broadcaster = ResultsBroadcaster(sio, interval=interval_ms / 1000.0, delta=delta)
+        broadcaster.protocol = protocol
+        counts = [0] * candidates
+        counts_lock = threading.Lock()
+        started = time.perf_counter()
+
+        def vote(i):
+            delay = started + duration * i / voters - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            choice = random.randrange(candidates)
+            with counts_lock:
+                counts[choice] += 1
+                results = [
+                    {'candidate_uid': uid, 'name': f'Candidat {n}', 'prenom': '', 'photo': '', 'vote_count': counts[n]}
+                    for n, uid in enumerate(candidate_uids)
+                ]
+            broadcaster.publish(election_uid, results, changed=candidate_uids[choice])
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(vote, range(voters)))
+        broadcaster.flush()
+        # let the flusher notice there is nothing left and stop
+        while broadcaster._flusher_running:
+            time.sleep(broadcaster.interval)
+        metrics = broadcaster.metrics()
+        reports.append({
+            'interval_ms': interval_ms,
+            'published': metrics['published'],
+            'emitted': metrics['emitted'],
+            'emits_saved': metrics['emits_saved'],
+            'deliveries': sio.emits * subscribers,
+            'bytes_sent': sio.bytes * subscribers,
+        })
+    return reports
+
+
+def results_bandwidth(candidate_count: int) -> dict:
+    """Bytes of one results message (one count changed) for each protocol/encoding.
+
+    Built on synthetic candidates with realistic names and photo URLs; the
+    `msgpack` sizes are None when the package is not installed.
+    """
+    import uuid
+    from extensions import candidates_version, results_seq
+
+    try:
+        import msgpack
+    except ImportError:
+        msgpack = None
+    results = [
+        {
+            'candidate_uid': str(uuid.uuid4()),
+            'name': f'Candidat numero {i}',
+            'prenom': f'Prenom {i}',
+            'photo': f'https://vote.example.org/uploads/{uuid.uuid4()}.jpg',
+            'vote_count': 1000 + i,
+        }
+        for i in range(candidate_count)
+    ]
+    election_uid = str(uuid.uuid4())
+    seq = results_seq(results) + 1
+    results[0] = dict(results[0], vote_count=results[0]['vote_count'] + 1)
+    messages = {
+        'full': {'election_uid': election_uid, 'results': results, 'seq': seq},
+        'full_delta': {'election_uid': election_uid, 'results': results[:1], 'partial': True, 'seq': seq},
+        'compact': {'e': election_uid, 's': seq, 'v': candidates_version(results), 'd': [[0, results[0]['vote_count']]]},
+    }
+    report = {'candidates': candidate_count}
+    for name, payload in messages.items():
+        report[f'{name}_json'] = len(json.dumps(payload).encode('utf-8'))
+        report[f'{name}_msgpack'] = len(msgpack.packb(payload)) if msgpack else None
+    return report
+
+
+def benchmark_group_commit(app, batch_sizes: list, ballots: int = 2000, concurrency: int = 64,
+                           interval_ms: float = 10) -> list:
+    """Measure vote throughput and latency per batch size (0 = one commit per vote).
+
+    Casts `ballots` votes on a throwaway election for each batch size, through
+    the process's `vote_batcher` (restored afterwards) or `utils.cast_vote`.
+    Returns one report per batch size.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from models import db, Candidate, Vote, VoteToken
+    from utils import cast_vote
+    from vote_batcher import vote_batcher
+
+    def cast(token_hash, batch_size):
+        started = time.perf_counter()
+        if batch_size:
+            vote_batcher.submit(election_id, token_hash, candidate_id)
+        else:
+            with app.app_context():
+                cast_vote(election_id, token_hash, candidate_id)
+                db.session.remove()
+        return time.perf_counter() - started
+
+    previous = (vote_batcher.batch_size, vote_batcher.interval)
+    reports = []
+    with throwaway_elections(app) as create:
+        election_id = create('vote benchmark')
+        with app.app_context():
+            candidate = Candidate(name='benchmark', prenom='', photo='', election_id=election_id)
+            db.session.add(candidate)
+            tokens = [VoteToken(phone_number=f'B{election_id % 1000:03d}{i:09d}', election_id=election_id)
+                      for i in range(ballots)]
+            db.session.add_all(tokens)
+            db.session.commit()
+            candidate_id = candidate.id
+            hashes = [t.token_hash for t in tokens]
+        try:
+            for batch_size in batch_sizes:
+                with app.app_context():
+                    VoteToken.query.filter_by(election_id=election_id).update({VoteToken.is_active: True})
+                    Vote.query.filter_by(election_id=election_id).delete()
+                    db.session.commit()
+                vote_batcher.configure(batch_size=batch_size or 1, interval_ms=interval_ms)
+                batches_before = vote_batcher.batches
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    latencies = sorted(pool.map(lambda h: cast(h, batch_size), hashes))
+                elapsed = time.perf_counter() - started
+                with app.app_context():
+                    recorded = Vote.query.filter_by(election_id=election_id).count()
+                reports.append({
+                    'batch_size': batch_size,
+                    'votes': recorded,
+                    'votes_per_sec': round(recorded / elapsed, 1),
+                    'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+                    'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+                    'commits': (vote_batcher.batches - batches_before) if batch_size else recorded,
+                })
+        finally:
+            vote_batcher.configure(batch_size=previous[0], interval_ms=previous[1] * 1000)
+    return reports
+
+
+def benchmark_stats(app, election_counts: list, candidates: int = 3, tokens: int = 5) -> list:
+    """Count the SQL statements and time of `GET /stats` as the number of elections grows.
+
+    Adds throwaway elections (every other one sealed) up to each count of
+    `election_counts`, in increasing order, and requests the listing. The query
+    count must not depend on the number of elections. Returns one report per count.
+    """
+    from sqlalchemy import insert
+    from admin.auth import create_access_token
+    from models import db, Candidate, ElectionResult, VoteToken
+    from utils import _with_new_token
+
+    reports = []
+    with app.app_context():
+        headers = {'Authorization': 'Bearer ' + create_access_token(1)}
+    client = app.test_client()
+    # warm-up: the first authenticated request also syncs the token blocklist
+    client.get('/api/v1/admin/stats', headers=headers)
+    now = datetime.utcnow()
+    created = 0
+    with throwaway_elections(app) as create:
+        for target in sorted(election_counts):
+            while created < target:
+                sealed = created % 2 == 1
+                election_id = create(f'stats benchmark {created}', start_at=now - timedelta(days=2),
+                                     end_at=now - timedelta(days=1) if sealed else now + timedelta(days=1))
+                created += 1
+                with app.app_context():
+                    db.session.add_all([
+                        Candidate(name=f'benchmark {n}', prenom='', photo='', election_id=election_id, vote_count=n)
+                        for n in range(candidates)
+                    ])
+                    db.session.execute(insert(VoteToken.__table__), [
+                        _with_new_token({'phone_number': f'S{election_id % 100000:05d}{n:07d}',
+                                         'election_id': election_id, 'is_active': True, 'sent': False})
+                        for n in range(tokens)
+                    ])
+                    if sealed:
+                        db.session.add(ElectionResult(
+                            election_id=election_id, results=[], votes_cast=0, total_candidates=candidates,
+                            total_tokens=tokens, total_voters=tokens, tokens_used=0,
+                        ))
+                    db.session.commit()
+
+            with app.app_context():
+                statements, stop = _count_statements(db.engine)
+            try:
+                started = time.perf_counter()
+                response = client.get('/api/v1/admin/stats', headers=headers)
+                elapsed = time.perf_counter() - started
+            finally:
+                stop()
+            if response.status_code != 200:
+                raise RuntimeError(f'GET /stats returned {response.status_code}')
+            reports.append({
+                'elections': len(response.get_json()),
+                'queries': len(statements),
+                'ms': round(elapsed * 1000, 2),
+            })
+    return reports
+
+
+class FakeACIMServer:
+    """Stub of the ACIM SMS API on a local `http.server` thread, counting TCP connections and requests.
+
+    Answers `addOneSms`, `addBulkSms` (one `Rep` per message) and `getAccuses`
+    (delivered) with `Etat: 1`. With `drop_requests=True` the connection is
+    closed after the request is read, without a response. Received payloads are
+    kept in `payloads` as `(path, body)`. Use as a context manager; `url` is
+    the base URL to give the client.
+    """
+
+    def __init__(self, drop_requests: bool = False):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        stub = self
+        self.drop_requests = drop_requests
+        self.connections = 0
+        self.requests = 0
+        self.payloads = []
+        self._lock = threading.Lock()
+        self._refs = 0
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                with stub._lock:
+                    stub.requests += 1
+                    stub.payloads.append((self.path, body))
+                if stub.drop_requests:
+                    self.close_connection = True
+                    return
+                data = json.dumps(stub._answer(self.path, body)).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self._server.server_address[1]}/api'
+
+    def _next_ref(self):
+        with self._lock:
+            self._refs += 1
+            return f'ref{self._refs}'
+
+    def _answer(self, path, body):
+        if path.endswith('/addOneSms'):
+            return {'Etat': 1, 'Rep': [{'Ref': self._next_ref(), 'Dest': body.get('Dest'), 'Statut': 'Envoyé'}]}
+        if path.endswith('/addBulkSms'):
+            return {'Etat': 1, 'Rep': [
+                {'Ref': self._next_ref(), 'Dest': m.get('Dest'), 'Statut': 'Envoyé'} for m in body.get('Mssg', [])
+            ]}
+        if path.endswith('/getAccuses'):
+            return {'Accs': [{'Acc': {'Ref': body.get('Ref'), 'Dest': body.get('Dest'), 'Statut': 1,
+                                      'Statutsmc': 'ESME_ROK', 'Statutdelivred': 'delivered'}}]}
+        return {'Etat': -1}
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def benchmark_sms_client(sends: int = 200, workers: int = 4, pool_size: int = 10) -> list:
+    """Send `sends` SMS to a `FakeACIMServer` with and without the client's shared session.
+
+    `session` is `ACIMSMSClient` as used by the app (keep-alive pool of
+    `pool_size`); `no session` sends each SMS with `requests.post`, which opens
+    a new TCP connection per request. Returns one report per mode with the
+    requests and connections seen by the server.
+    """
+    import requests
+    from concurrent.futures import ThreadPoolExecutor
+    from ACIMClient import ACIMSMSClient
+
+    reports = []
+    for mode in ('no session', 'session'):
+        with FakeACIMServer() as server:
+            client = ACIMSMSClient('bench', 'bench', 'BENCH', base_url=server.url, pool_size=pool_size)
+            if mode == 'no session':
+                # `requests.post` has the same signature as `Session.post`
+                client.session = requests
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(lambda n: client.send_one_sms(f'225070{n:07d}', 'bench'), range(sends)))
+            elapsed = time.perf_counter() - started
+            reports.append({
+                'mode': mode,
+                'sends': sends,
+                'failed': sum(1 for r in results if not r['success']),
+                'requests': server.requests,
+                'connections': server.connections,
+                'ms': round(elapsed * 1000, 1),
+                'sends_per_sec': round(sends / elapsed, 1),
+            })
+    return reports
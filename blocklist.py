@@ -0,0 +1,130 @@
+"""In-process cache of revoked admin JWT ids.
+
+`TokenBlocklist` rows are loaded once into a `jti -> exp` mapping, so checking
+a token on each admin request is a dict lookup instead of a SELECT. Logouts in
+this process update the cache immediately; revocations made by other processes
+are picked up by a cheap incremental sync (rows whose primary key is above
+the highest one already loaded, so clock skew between processes does not
+matter) at most every `JWT_BLOCKLIST_SYNC_SECONDS`. A row committed long after
+rows with higher ids can fall outside that window, so the whole table is
+re-read every `JWT_BLOCKLIST_FULL_RELOAD_SECONDS`. Entries whose token has expired are
+dropped, since an expired token is rejected by its signature check anyway.
+
+`purge_expired_blocklist` deletes expired rows from the table
+(`flask auth purge-blocklist`).
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Ids are allocated before commit, so a row can become visible after rows with
+# higher ids: each sync re-reads this many ids below the highest one loaded.
+SYNC_ID_OVERLAP = 32
+
+
+class RevokedTokenCache:
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._last_id = 0
+        self._next_sync = 0.0
+        self._next_full_reload = 0.0
+        self.sync_interval = 5.0
+        self.full_reload_interval = 300.0
+
+    def init_app(self, app):
+        self.sync_interval = float(app.config.get('JWT_BLOCKLIST_SYNC_SECONDS', 5))
+        self.full_reload_interval = float(app.config.get('JWT_BLOCKLIST_FULL_RELOAD_SECONDS', 300))
+
+    def _expiry(self, row):
+        if row.expires_at is not None:
+            return row.expires_at
+        # Rows revoked before expires_at existed: keep them for the longest token lifetime
+        return (row.revoked_at or datetime.utcnow()) + timedelta(days=7)
+
+    def _sync(self):
+        from models import TokenBlocklist
+
+        full = not self._loaded or time.monotonic() >= self._next_full_reload
+        query = TokenBlocklist.query
+        if not full:
+            query = query.filter(TokenBlocklist.id > self._last_id - SYNC_ID_OVERLAP)
+        rows = query.all()
+        now = datetime.utcnow()
+        with self._lock:
+            for row in rows:
+                self._entries[row.jti] = self._expiry(row)
+                self._last_id = max(self._last_id, row.id)
+            for jti in [j for j, exp in self._entries.items() if exp < now]:
+                del self._entries[jti]
+            self._loaded = True
+            self._next_sync = time.monotonic() + self.sync_interval
+            if full:
+                self._next_full_reload = time.monotonic() + self.full_reload_interval
+
+    def is_revoked(self, jti: str) -> bool:
+        if not jti:
+            return False
+        if not self._loaded or time.monotonic() >= self._next_sync:
+            self._sync()
+        with self._lock:
+            exp = self._entries.get(jti)
+            if exp is None:
+                return False
+            if exp < datetime.utcnow():
+                del self._entries[jti]
+                return False
+            return True
+
+    def add(self, jti: str, expires_at: datetime):
+        with self._lock:
+            self._entries[jti] = expires_at
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._loaded = False
+            self._last_id = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+revoked_tokens = RevokedTokenCache()
+
+
+def revoke_token(payload: dict):
+    """Add the token described by `payload` to the blocklist table and cache."""
+    from models import db, TokenBlocklist
+
+    jti = payload.get('jti')
+    if not jti:
+        return
+    try:
+        admin_id = int(payload.get('sub'))
+    except (TypeError, ValueError):
+        admin_id = None
+    exp = payload.get('exp')
+    expires_at = datetime.utcfromtimestamp(exp) if exp else datetime.utcnow() + timedelta(days=7)
+    if TokenBlocklist.query.filter_by(jti=jti).first() is None:
+        db.session.add(TokenBlocklist(
+            jti=jti, token_type=payload.get('type') or 'access', admin_id=admin_id, expires_at=expires_at
+        ))
+        db.session.commit()
+    revoked_tokens.add(jti, expires_at)
+
+
+def purge_expired_blocklist() -> int:
+    """Delete blocklist rows whose token has expired; returns the number deleted."""
+    from models import db, TokenBlocklist
+    from sqlalchemy import or_, and_
+
+    now = datetime.utcnow()
+    count = db.session.query(TokenBlocklist).filter(or_(
+        TokenBlocklist.expires_at < now,
+        and_(TokenBlocklist.expires_at.is_(None), TokenBlocklist.revoked_at < now - timedelta(days=7)),
+    )).delete(synchronize_session=False)
+    db.session.commit()
+    return count
@@ -0,0 +1,103 @@
+"""Message rendering for SMS campaigns.
+
+A `CampaignRenderer` is built once per election and send job: it reads the
+configuration and compiles the message template up front, so rendering a
+recipient's SMS is a string format with the token's stored hash or short
+code. It also computes the SMS segment count of each message (GSM-7 or UCS-2)
+so the cost of a campaign can be estimated before sending.
+"""
+from flask import current_app
+
+DEFAULT_SMS_TEMPLATE = "Bonjour,\nVeuillez voter pour l'election du BDE en suivant ce lien : {url} \nCordialement."
+DEFAULT_EMAIL_SUBJECT = 'Votre lien de vote'
+DEFAULT_EMAIL_TEMPLATE = 'Bonjour,\n\nVeuillez voter en suivant ce lien : {url}\n\nCordialement.'
+
+# GSM 03.38 default alphabet and its extension table (extension characters
+# take two septets: ESC + char). ESC itself (0x1B) is not a character of the
+# basic table: text containing a literal ESC goes out as UCS-2.
+GSM7_BASIC = set(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+GSM7_EXTENDED = set("^{}\\[~]|€\f")
+
+
+def sms_segments(text: str) -> tuple:
+    """Return `(encoding, segments)` for `text` ('gsm7' or 'ucs2')."""
+    septets = 0
+    for ch in text:
+        if ch in GSM7_BASIC:
+            septets += 1
+        elif ch in GSM7_EXTENDED:
+            septets += 2
+        else:
+            # Any other character forces UCS-2 for the whole message
+            units = len(text.encode('utf-16-le')) // 2
+            return 'ucs2', 1 if units <= 70 else -(-units // 67)
+    return 'gsm7', 1 if septets <= 160 else -(-septets // 153)
+
+
+class CampaignRenderer:
+    """Render vote SMS for one election with a template compiled once."""
+
+    def __init__(self, election_uid: str, template: str = None, flash=0):
+        config = current_app.config
+        self.election_uid = election_uid
+        self.template = template or config.get('SMS_TEMPLATE') or DEFAULT_SMS_TEMPLATE
+        self.sender = config.get('SMS_API_SENDER')
+        self.flash = flash
+        self.shortener = config.get('URL_SHORTENER', 'local')
+        frontend = config.get('FRONTEND_URL', '').rstrip('/')
+        self._vote_url_prefix = f"{frontend}/elections/{election_uid}/vote/"
+        base = config.get('SHORTLINK_BASE_URL', '').rstrip('/')
+        prefix = config.get('SHORTLINK_PREFIX', '/s').rstrip('/')
+        self._short_url_prefix = f"{base}{prefix}/"
+        # Validate the template once rather than on every message
+        self.template.format(url='')
+
+    def vote_url(self, vtoken) -> str:
+        from utils import generate_vote_url, shorten
+
+        if self.shortener == 'local':
+            if vtoken.short_link is not None:
+                return self._short_url_prefix + vtoken.short_link.code
+            return generate_vote_url(vtoken, self.election_uid)
+        vote_url = self._vote_url_prefix + vtoken.token_hash
+        if self.shortener == 'tinyurl':
+            return shorten(vote_url)
+        return vote_url
+
+    def render(self, vtoken) -> str:
+        return self.template.format(url=self.vote_url(vtoken))
+
+    def payload(self, vtoken) -> dict:
+        """Message entry for `addBulkSms`."""
+        return {
+            'Dest': vtoken.phone_number,
+            'Sms': self.render(vtoken),
+            'Sender': self.sender,
+            'Flash': self.flash,
+        }
+
+    def iter_payloads(self, vtokens):
+        for vtoken in vtokens:
+            yield self.payload(vtoken)
+
+    def estimate(self, vtokens) -> dict:
+        """Segments that sending to `vtokens` would cost, without calling any shortener."""
+        recipients = 0
+        segments = 0
+        by_encoding = {'gsm7': 0, 'ucs2': 0}
+        for vtoken in vtokens:
+            if self.shortener == 'local' and vtoken.short_link is not None:
+                url = self._short_url_prefix + vtoken.short_link.code
+            elif self.shortener == 'local':
+                # Short code not created yet: same length as a real one
+                url = self._short_url_prefix + 'x' * int(current_app.config.get('SHORTLINK_CODE_LENGTH', 7))
+            else:
+                url = self._vote_url_prefix + (vtoken.token_hash or '')
+            encoding, count = sms_segments(self.template.format(url=url))
+            recipients += 1
+            segments += count
+            by_encoding[encoding] += 1
+        return {'recipients': recipients, 'segments': segments, 'messages_by_encoding': by_encoding}
@@ -0,0 +1,282 @@
+"""Flask CLI maintenance commands (`flask tokens ...`, `flask tallies ...`, `flask sms ...`,
+`flask outbox ...`, `flask auth ...`, `flask votes ...`, `flask results ...`,
+`flask turnout ...`, `flask elections ...`, `flask stats ...`).
+
+Registered on the application in `app.create_app`.
+"""
+import click
+from flask.cli import AppGroup
+
+tokens_cli = AppGroup('tokens', help='Vote token maintenance.')
+tallies_cli = AppGroup('tallies', help='Per-candidate vote counter maintenance.')
+sms_cli = AppGroup('sms', help='SMS delivery tracking.')
+outbox_cli = AppGroup('outbox', help='Outbound message queue.')
+auth_cli = AppGroup('auth', help='Admin authentication maintenance.')
+votes_cli = AppGroup('votes', help='Vote ingestion.')
+results_cli = AppGroup('results', help='Real-time results stream.')
+turnout_cli = AppGroup('turnout', help='Turnout-over-time rollup.')
+elections_cli = AppGroup('elections', help='Final results and archiving of closed elections.')
+stats_cli = AppGroup('stats', help='Admin statistics.')
+
+
+@tokens_cli.command('rehash')
+@click.option('--missing-only', is_flag=True, help='Only fill rows without a stored token_hash (backfill).')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows updated per transaction.')
+def rehash_tokens(missing_only, batch_size):
+    """Recompute VoteToken.token_hash with the current SECRET_KEY."""
+    from utils import rehash_vote_tokens
+
+    updated = rehash_vote_tokens(only_missing=missing_only, batch_size=batch_size)
+    click.echo(f'{updated} token(s) rehashed')
+
+
+@tokens_cli.command('bench')
+@click.option('--sizes', default='1000,10000,100000,1000000', show_default=True,
+              help='Comma-separated token counts, filled in increasing order.')
+@click.option('--lookups', default=1000, show_default=True, help='Random hash lookups per size.')
+def tokens_bench(sizes, lookups):
+    """Report p50/p99 vote-link lookup latency per token count (uses a throwaway election)."""
+    from flask import current_app
+    from bench import benchmark_token_lookup
+
+    counts = [int(s) for s in sizes.split(',') if s.strip()]
+    reports = benchmark_token_lookup(current_app._get_current_object(), counts, lookups=lookups)
+    click.echo(f"{'tokens':>9} {'lookups':>8} {'p50 us':>9} {'p99 us':>9}")
+    for r in reports:
+        click.echo(f"{r['tokens']:>9} {r['lookups']:>8} {r['p50_us']:>9} {r['p99_us']:>9}")
+
+
+@tokens_cli.command('bench-generate')
+@click.option('--count', default=10000, show_default=True, help='Tokens created per path.')
+@click.option('--chunk-size', default=1000, show_default=True, help='Tokens per commit.')
+def tokens_bench_generate(count, chunk_size):
+    """Compare token creation with a uniqueness SELECT per token vs the UNIQUE constraint."""
+    from flask import current_app
+    from bench import benchmark_token_generation
+
+    reports = benchmark_token_generation(current_app._get_current_object(), count=count, chunk_size=chunk_size)
+    click.echo(f"{'path':>16} {'tokens':>8} {'seconds':>8} {'tokens/s':>10} {'queries':>8}")
+    for r in reports:
+        click.echo(f"{r['path']:>16} {r['tokens']:>8} {r['seconds']:>8} {r['tokens_per_sec']:>10} {r['queries']:>8}")
+
+
+@tallies_cli.command('reconcile')
+@click.option('--fix', is_flag=True, help='Overwrite drifted counters with the value derived from Vote rows.')
+def reconcile_tallies(fix):
+    """Re-derive Candidate.vote_count from the Vote table and report drift."""
+    from utils import reconcile_vote_counts
+
+    drift = reconcile_vote_counts(fix=fix)
+    for d in drift:
+        click.echo(f"candidate {d['candidate_uid']} (election {d['election_id']}): stored={d['stored']} actual={d['actual']}")
+    if not drift:
+        click.echo('no drift')
+    elif fix:
+        click.echo(f'{len(drift)} counter(s) fixed')
+    else:
+        click.echo(f'{len(drift)} counter(s) drifted (rerun with --fix to repair)')
+
+
+@sms_cli.command('reconcile-deliveries')
+@click.option('--loop', is_flag=True, help='Keep polling every DELIVERY_POLL_INTERVAL seconds.')
+@click.option('--limit', default=None, type=int, help='Pending SMS checked per pass (default DELIVERY_POLL_BATCH).')
+def reconcile_deliveries_command(loop, limit):
+    """Poll getAccuses for pending SMS and store their delivery state."""
+    from flask import current_app
+    from dispatch import reconcile_deliveries, run_delivery_reconciler
+
+    app = current_app._get_current_object()
+    if loop:
+        run_delivery_reconciler(app)
+        return
+    report = reconcile_deliveries(app, limit=limit)
+    click.echo(f"{report['checked']} SMS checked, {report['updated']} updated, "
+               f"{report['expired']} pending too long marked unknown")
+
+
+@sms_cli.command('bench')
+@click.option('--sends', default=200, show_default=True, help='SMS sent per mode.')
+@click.option('--workers', default=4, show_default=True, help='Concurrent senders.')
+@click.option('--pool-size', default=10, show_default=True, help='Keep-alive connections of the shared session.')
+def sms_bench(sends, workers, pool_size):
+    """Compare TCP connections and throughput with and without the shared HTTP session (local stub API)."""
+    from bench import benchmark_sms_client
+
+    click.echo(f"{'mode':>10} {'sends':>6} {'failed':>6} {'requests':>8} {'conns':>6} {'ms':>8} {'sms/s':>8}")
+    for r in benchmark_sms_client(sends=sends, workers=workers, pool_size=pool_size):
+        click.echo(f"{r['mode']:>10} {r['sends']:>6} {r['failed']:>6} {r['requests']:>8} "
+                   f"{r['connections']:>6} {r['ms']:>8} {r['sends_per_sec']:>8}")
+
+
+@outbox_cli.command('work')
+@click.option('--once', is_flag=True, help='Drain the queue once and exit instead of polling.')
+def outbox_work(once):
+    """Send queued outbox messages (resumes interrupted send jobs)."""
+    from flask import current_app
+    from dispatch import process_outbox, run_outbox_worker, CHANNELS
+
+    app = current_app._get_current_object()
+    if once:
+        processed = sum(process_outbox(app, channel=channel) for channel in CHANNELS)
+        click.echo(f'{processed} message(s) processed')
+        return
+    run_outbox_worker(app)
+
+
+@outbox_cli.command('requeue')
+@click.option('--job', 'job_id', default=None, help='Only requeue messages of this send job.')
+@click.option('--interrupted', is_flag=True,
+              help='Also requeue messages interrupted mid-send (they may already have been delivered).')
+def outbox_requeue(job_id, interrupted):
+    """Requeue failed outbox messages."""
+    from dispatch import requeue_failed
+
+    click.echo(f'{requeue_failed(campaign=job_id, interrupted=interrupted)} message(s) requeued')
+
+
+@auth_cli.command('purge-blocklist')
+def purge_blocklist():
+    """Delete revoked-token rows whose token has already expired (run from cron)."""
+    from blocklist import purge_expired_blocklist
+
+    click.echo(f'{purge_expired_blocklist()} expired blocklist row(s) deleted')
+
+
+@votes_cli.command('bench')
+@click.option('--batch-sizes', default='0,10,50', show_default=True,
+              help='Comma-separated group-commit batch sizes (0 = one commit per vote).')
+@click.option('--ballots', default=2000, show_default=True, help='Ballots cast per batch size.')
+@click.option('--concurrency', default=64, show_default=True, help='Concurrent voters.')
+@click.option('--interval-ms', default=10.0, show_default=True, help='Max wait before flushing a partial batch.')
+def votes_bench(batch_sizes, ballots, concurrency, interval_ms):
+    """Report votes/sec and p50/p99 latency per batch size (uses a throwaway election)."""
+    from flask import current_app
+    from bench import benchmark_group_commit
+
+    sizes = [int(s) for s in batch_sizes.split(',') if s.strip()]
+    reports = benchmark_group_commit(current_app._get_current_object(), sizes, ballots=ballots,
+                                     concurrency=concurrency, interval_ms=interval_ms)
+    click.echo(f"{'batch':>6} {'votes':>7} {'votes/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'commits':>8}")
+    for r in reports:
+        click.echo(f"{r['batch_size']:>6} {r['votes']:>7} {r['votes_per_sec']:>9} {r['p50_ms']:>8} {r['p99_ms']:>8} {r['commits']:>8}")
+
+
+@results_cli.command('bandwidth')
+@click.option('--candidates', default='10,100', show_default=True, help='Comma-separated candidate counts.')
+def results_bandwidth_command(candidates):
+    """Compare bytes per results update for each protocol and encoding."""
+    from bench import results_bandwidth
+
+    columns = ('full', 'full_delta', 'compact')
+    click.echo(f"{'cands':>5} " + ' '.join(f'{c + "/" + e:>18}' for c in columns for e in ('json', 'msgpack')))
+    for count in [int(c) for c in candidates.split(',') if c.strip()]:
+        report = results_bandwidth(count)
+        cells = [report[f'{c}_{e}'] for c in columns for e in ('json', 'msgpack')]
+        click.echo(f'{count:>5} ' + ' '.join(f"{'n/a' if v is None else v:>18}" for v in cells))
+
+
+@results_cli.command('loadtest')
+@click.option('--voters', default=5000, show_default=True, help='Ballots cast during the run.')
+@click.option('--subscribers', default=1000, show_default=True, help='Clients watching the election.')
+@click.option('--intervals-ms', default='0,100,250,1000', show_default=True,
+              help='Comma-separated broadcast intervals (0 = one emit per vote).')
+@click.option('--candidates', default=10, show_default=True)
+@click.option('--duration', default=2.0, show_default=True, help='Seconds over which the ballots are spread.')
+def results_loadtest(voters, subscribers, intervals_ms, candidates, duration):
+    """Simulate voters and subscribers and report the emits saved by coalescing."""
+    from flask import current_app
+    from bench import broadcast_load_test
+
+    intervals = [int(i) for i in intervals_ms.split(',') if i.strip()]
+    reports = broadcast_load_test(voters, subscribers, intervals, candidates=candidates, duration=duration,
+                                  delta=bool(current_app.config.get('RESULTS_BROADCAST_DELTA', False)),
+                                  protocol=current_app.config.get('RESULTS_PROTOCOL', 'full'))
+    click.echo(f"{'interval':>8} {'published':>9} {'emitted':>8} {'saved':>8} {'deliveries':>11} {'bytes':>12}")
+    for r in reports:
+        click.echo(f"{r['interval_ms']:>8} {r['published']:>9} {r['emitted']:>8} {r['emits_saved']:>8} "
+                   f"{r['deliveries']:>11} {r['bytes_sent']:>12}")
+
+
+@stats_cli.command('bench')
+@click.option('--elections', default='10,100,1000', show_default=True,
+              help='Comma-separated election counts, added in increasing order.')
+def stats_bench(elections):
+    """Report SQL queries and time of GET /stats per election count (uses throwaway elections)."""
+    from flask import current_app
+    from bench import benchmark_stats
+
+    counts = [int(c) for c in elections.split(',') if c.strip()]
+    reports = benchmark_stats(current_app._get_current_object(), counts)
+    click.echo(f"{'elections':>9} {'queries':>8} {'ms':>9}")
+    for r in reports:
+        click.echo(f"{r['elections']:>9} {r['queries']:>8} {r['ms']:>9}")
+
+
+@turnout_cli.command('backfill')
+@click.option('--election', 'election_uid', default=None, help='Only rebuild this election (uid).')
+def turnout_backfill(election_uid):
+    """Rebuild per-minute/per-hour turnout buckets from existing votes."""
+    from models import Election
+    from utils import backfill_turnout
+
+    election_id = None
+    if election_uid:
+        election = Election.query.filter_by(uid=election_uid).first()
+        if election is None:
+            raise click.ClickException(f'unknown election: {election_uid}')
+        election_id = election.id
+    click.echo(f'{backfill_turnout(election_id)} vote(s) rolled up')
+
+
+def _election_by_uid(election_uid):
+    from models import Election
+
+    election = Election.query.filter_by(uid=election_uid).first()
+    if election is None:
+        raise click.ClickException(f'unknown election: {election_uid}')
+    return election
+
+
+@elections_cli.command('seal')
+@click.option('--election', 'election_uid', default=None, help='Only seal this election (uid).')
+def elections_seal(election_uid):
+    """Freeze the final results of closed elections (run from cron)."""
+    from sealing import seal_election, seal_closed_elections
+
+    if election_uid:
+        try:
+            seal_election(_election_by_uid(election_uid))
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f'{election_uid} sealed')
+        return
+    sealed = seal_closed_elections()
+    for uid in sealed:
+        click.echo(f'{uid} sealed')
+    click.echo(f'{len(sealed)} election(s) sealed')
+
+
+@elections_cli.command('archive')
+@click.argument('election_uid')
+def elections_archive(election_uid):
+    """Move the vote and token rows of a closed election to a gzip file and delete them."""
+    from sealing import archive_election
+
+    try:
+        report = archive_election(_election_by_uid(election_uid))
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"{report['votes']} vote(s) and {report['tokens']} token(s) archived to {report['path']}")
+
+
+def register_commands(app):
+    app.cli.add_command(tokens_cli)
+    app.cli.add_command(tallies_cli)
+    app.cli.add_command(sms_cli)
+    app.cli.add_command(outbox_cli)
+    app.cli.add_command(auth_cli)
+    app.cli.add_command(votes_cli)
+    app.cli.add_command(results_cli)
+    app.cli.add_command(turnout_cli)
+    app.cli.add_command(elections_cli)
+    app.cli.add_command(stats_cli)
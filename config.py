@@ -18,10 +18,65 @@ class Config:
     MAIL_PASS = os.getenv('MAIL_PASS', '')
     MAIL_USE_TLS = os.getenv('MAIL_USE_TLS', 'true').lower() in ('1', 'true', 'yes')
     MAIL_FROM = os.getenv('MAIL_FROM', os.getenv('MAIL_USER', 'noreply@example.com'))
+    # Email campaigns: one reused SMTP connection per worker thread
+    EMAIL_WORKERS = int(os.getenv('EMAIL_WORKERS', '4'))
+    EMAIL_SUBJECT = os.getenv('EMAIL_SUBJECT', '')
+    # Body template for vote emails (must contain {url}); empty uses the built-in text
+    EMAIL_TEMPLATE = os.getenv('EMAIL_TEMPLATE', '')
     # SMS API credentials used by admin token sender
     SMS_API_USERNAME = os.getenv('SMS_API_USERNAME', '')
     SMS_API_TOKEN = os.getenv('SMS_API_TOKEN', '')
     SMS_API_SENDER = os.getenv('SMS_API_SENDER', '')
+    SMS_API_BASE_URL = os.getenv('SMS_API_BASE_URL', 'https://sms.acim-ci.net:8443/api')
+    # Shared HTTP session to the SMS API: keep-alive pool size (>= SMS_DISPATCH_WORKERS),
+    # retries on connection errors, connect/read timeouts (seconds) and number of
+    # messages kept in the client's sent/failed history (0 disables it)
+    SMS_API_POOL_SIZE = int(os.getenv('SMS_API_POOL_SIZE', '10'))
+    SMS_API_MAX_RETRIES = int(os.getenv('SMS_API_MAX_RETRIES', '2'))
+    SMS_API_CONNECT_TIMEOUT = float(os.getenv('SMS_API_CONNECT_TIMEOUT', '5'))
+    SMS_API_READ_TIMEOUT = float(os.getenv('SMS_API_READ_TIMEOUT', '30'))
+    SMS_API_HISTORY_SIZE = int(os.getenv('SMS_API_HISTORY_SIZE', '100'))
+    # Background SMS dispatch: worker threads, provider rate limit (API calls/second, 0 = unlimited)
+    # and number of outbox messages claimed, sent and committed per batch
+    SMS_DISPATCH_WORKERS = int(os.getenv('SMS_DISPATCH_WORKERS', '8'))
+    SMS_DISPATCH_RATE_PER_SEC = float(os.getenv('SMS_DISPATCH_RATE_PER_SEC', '10'))
+    SMS_DISPATCH_COMMIT_BATCH = int(os.getenv('SMS_DISPATCH_COMMIT_BATCH', '500'))
+    # Outbox: send jobs in a thread of the web process (disable to rely on `flask outbox work`),
+    # seconds before a message stuck in `sending` is failed, worker poll interval (seconds)
+    OUTBOX_INPROCESS_WORKER = os.getenv('OUTBOX_INPROCESS_WORKER', 'true').lower() in ('1', 'true', 'yes')
+    OUTBOX_SENDING_TIMEOUT = float(os.getenv('OUTBOX_SENDING_TIMEOUT', '600'))
+    OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', '5'))
+    # Finished send jobs kept in memory for GET /jobs/<id> (older ones: outbox counts only)
+    SEND_JOB_HISTORY = int(os.getenv('SEND_JOB_HISTORY', '100'))
+    # `bulk` groups recipients into addBulkSms calls, `single` sends one addOneSms per token
+    SMS_DISPATCH_MODE = os.getenv('SMS_DISPATCH_MODE', 'bulk')
+    SMS_BULK_CHUNK_SIZE = int(os.getenv('SMS_BULK_CHUNK_SIZE', '100'))
+    SMS_BULK_MAX_RETRIES = int(os.getenv('SMS_BULK_MAX_RETRIES', '3'))
+    SMS_BULK_RETRY_BACKOFF = float(os.getenv('SMS_BULK_RETRY_BACKOFF', '1.0'))
+    # Delivery receipts (getAccuses) are polled in the background: pending SMS checked
+    # per pass, seconds between passes, and whether create_app starts the poller
+    DELIVERY_POLL_BATCH = int(os.getenv('DELIVERY_POLL_BATCH', '200'))
+    DELIVERY_POLL_INTERVAL = float(os.getenv('DELIVERY_POLL_INTERVAL', '60'))
+    # SMS still pending this long after sending are marked `unknown` and no longer polled
+    DELIVERY_PENDING_MAX_AGE_SECONDS = float(os.getenv('DELIVERY_PENDING_MAX_AGE_SECONDS', '172800'))
+    DELIVERY_RECONCILER_ENABLED = os.getenv('DELIVERY_RECONCILER_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    # SMS body sent to voters; `{url}` is replaced by the voter's link (default: campaign.DEFAULT_SMS_TEMPLATE)
+    SMS_TEMPLATE = os.getenv('SMS_TEMPLATE', '')
+    # Vote links sent by SMS: `local` (built-in short links served under SHORTLINK_PREFIX),
+    # `tinyurl` (external shortener) or `none` (full frontend URL)
+    URL_SHORTENER = os.getenv('URL_SHORTENER', 'local')
+    # Public base URL of this backend, used to build local short links (no trailing slash)
+    SHORTLINK_BASE_URL = os.getenv('SHORTLINK_BASE_URL', 'http://localhost:5000')
+    SHORTLINK_PREFIX = os.getenv('SHORTLINK_PREFIX', '/s')
+    SHORTLINK_CODE_LENGTH = int(os.getenv('SHORTLINK_CODE_LENGTH', '7'))
+    # Number of short-link redirects kept in the in-memory LRU cache
+    SHORTLINK_CACHE_SIZE = int(os.getenv('SHORTLINK_CACHE_SIZE', '10000'))
+    # Admin voter listing: default/max page size and export read chunk
+    VOTER_PAGE_SIZE = int(os.getenv('VOTER_PAGE_SIZE', '500'))
+    VOTER_PAGE_MAX = int(os.getenv('VOTER_PAGE_MAX', '5000'))
+    VOTER_EXPORT_CHUNK_SIZE = int(os.getenv('VOTER_EXPORT_CHUNK_SIZE', '1000'))
+    # Rows written per INSERT batch by the CSV voter importer
+    VOTER_IMPORT_CHUNK_SIZE = int(os.getenv('VOTER_IMPORT_CHUNK_SIZE', '5000'))
     # Admin credentials fallback (for initial setup). Prefer creating Admin rows in DB.
     ADMIN_USER = os.getenv('ADMIN_USER', '')
     ADMIN_PASS = os.getenv('ADMIN_PASS', '')
@@ -34,4 +89,40 @@ class Config:
     # JWT settings for admin authentication
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', os.getenv('SECRET_KEY', 'dev-secret'))
     JWT_EXP_DELTA_SECONDS = int(os.getenv('JWT_EXP_DELTA_SECONDS', '3600'))
-    JWT_ALGORITHM = os.getenv('JWT_ALGORITHM', 'HS256')
\ No newline at end of file
+    JWT_ALGORITHM = os.getenv('JWT_ALGORITHM', 'HS256')
+    # Revoked tokens are cached in memory; revocations from other processes are
+    # picked up within this many seconds (incremental sync), and the whole table
+    # is re-read every JWT_BLOCKLIST_FULL_RELOAD_SECONDS for late-committed rows
+    JWT_BLOCKLIST_SYNC_SECONDS = float(os.getenv('JWT_BLOCKLIST_SYNC_SECONDS', '5'))
+    JWT_BLOCKLIST_FULL_RELOAD_SECONDS = float(os.getenv('JWT_BLOCKLIST_FULL_RELOAD_SECONDS', '300'))
+    # Socket.IO message queue (e.g. redis://localhost:6379/0) shared by all workers;
+    # empty keeps rooms local to each process (single worker only)
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE', '')
+    SOCKETIO_CHANNEL = os.getenv('SOCKETIO_CHANNEL', 'flask-socketio')
+    # Real-time results: emit at most one `results_update` per election per interval
+    # (0 disables coalescing); optionally send only the candidates whose count changed.
+    RESULTS_BROADCAST_INTERVAL_MS = int(os.getenv('RESULTS_BROADCAST_INTERVAL_MS', '250'))
+    RESULTS_BROADCAST_DELTA = os.getenv('RESULTS_BROADCAST_DELTA', 'false').lower() in ('1', 'true', 'yes')
+    # `full` (results_update with every candidate field) or `compact` (candidate fields
+    # sent once on join, then results_delta index/count pairs); `json` or `msgpack`
+    RESULTS_PROTOCOL = os.getenv('RESULTS_PROTOCOL', 'full')
+    RESULTS_ENCODING = os.getenv('RESULTS_ENCODING', 'json')
+    # Election/candidate metadata cache for the public vote routes. Leave the Redis URL
+    # empty to cache per process; set it (requires `redis`) to share invalidations.
+    ELECTION_CACHE_REDIS_URL = os.getenv('ELECTION_CACHE_REDIS_URL', '')
+    ELECTION_CACHE_PREFIX = os.getenv('ELECTION_CACHE_PREFIX', 'election-meta')
+    ELECTION_CACHE_TTL = int(os.getenv('ELECTION_CACHE_TTL', '3600'))
+    # Without Redis, each process reloads an entry older than this (seconds), so admin
+    # edits made on another worker are seen within this delay
+    ELECTION_CACHE_LOCAL_TTL = float(os.getenv('ELECTION_CACHE_LOCAL_TTL', '5'))
+    # Group commit for votes: record ballots in batches of VOTE_BATCH_SIZE or every
+    # VOTE_BATCH_INTERVAL_MS; each request still waits for its batch to be committed.
+    VOTE_GROUP_COMMIT = os.getenv('VOTE_GROUP_COMMIT', 'false').lower() in ('1', 'true', 'yes')
+    VOTE_BATCH_SIZE = int(os.getenv('VOTE_BATCH_SIZE', '50'))
+    VOTE_BATCH_INTERVAL_MS = float(os.getenv('VOTE_BATCH_INTERVAL_MS', '10'))
+    VOTE_BATCH_TIMEOUT = float(os.getenv('VOTE_BATCH_TIMEOUT', '10'))
+    # Closed elections are sealed (final results frozen) this long after `end_at`;
+    # archives of raw vote/token rows go to RESULTS_ARCHIVE_FOLDER (required to archive;
+    # keep it outside the app directory, archives contain phone numbers and emails)
+    RESULTS_SEAL_GRACE_SECONDS = float(os.getenv('RESULTS_SEAL_GRACE_SECONDS', '60'))
+    RESULTS_ARCHIVE_FOLDER = os.getenv('RESULTS_ARCHIVE_FOLDER', '')
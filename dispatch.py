@@ -0,0 +1,669 @@
+"""Background SMS dispatch for vote tokens.
+
+`start_send_job` enqueues one `OutboxMessage` per token to notify and returns
+immediately with a `SendJob` whose progress can be read from `get_job` (or,
+from any process, from the outbox with `campaign_progress`). Only one job per
+election and channel can be in flight (`JobAlreadyRunning`), and only the
+last `SEND_JOB_HISTORY` finished jobs are kept in memory. The outbox is
+consumed by `process_outbox`, in a thread of the requesting process or by
+`flask outbox work`: messages are claimed in batches, sent over a bounded
+thread pool throttled by a rate limit on provider API calls, and their results
+committed with the tokens' `sent` flags. In `bulk` mode tokens are grouped into chunks of
+`SMS_BULK_CHUNK_SIZE`, each sent with one `addBulkSms` call and retried with
+exponential backoff when the call fails.
+
+Delivery receipts are not polled while sending: each sent token stores its SMS
+`ref` with `delivery_status='pending'`, and `reconcile_deliveries` later polls
+`getAccuses` in batches (periodically via `start_delivery_reconciler` or the
+`flask sms reconcile-deliveries` command), giving up after
+`DELIVERY_PENDING_MAX_AGE_SECONDS` (state `unknown`).
+
+The `email` channel goes through the same outbox: each worker thread keeps
+one SMTP connection open for the whole campaign (`mailer.SMTPSessionPool`)
+instead of connecting and logging in for every message.
+
+Messages left `sending` by a crashed worker are marked `interrupted` rather
+than re-sent (see `recover_stale_messages`), and new campaigns skip their
+tokens, so resuming or re-sending never double-sends; they are only sent again
+with `flask outbox requeue --interrupted`.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+SEND_MODES = ('single', 'bulk')
+CHANNELS = ('sms', 'email')
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+class JobAlreadyRunning(Exception):
+    """A send job is already in flight for this election and channel (`campaign` is its id)."""
+
+    def __init__(self, campaign: str):
+        super().__init__(f'a send job is already running for this election: {campaign}')
+        self.campaign = campaign
+
+
+class RateLimiter:
+    """Simple spacing limiter allowing at most `rate` acquisitions per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class SendJob:
+    def __init__(self, election_uid: str, resend_all: bool = False, mode: str = 'single', channel: str = 'sms'):
+        self.id = str(uuid.uuid4())
+        self.election_uid = election_uid
+        self.resend_all = resend_all
+        self.mode = mode
+        self.channel = channel
+        self.mailer = None
+        self.api_calls = 0
+        self.estimate = None
+        self.status = 'queued'
+        self.total = 0
+        self.sent = 0
+        self.failed = 0
+        self.errors = []
+        self.created_at = datetime.utcnow()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def count_api_call(self):
+        with self._lock:
+            self.api_calls += 1
+
+    def record(self, outcome: dict):
+        with self._lock:
+            if outcome.get('success'):
+                self.sent += 1
+            else:
+                self.failed += 1
+            if outcome.get('error'):
+                self.errors.append({k: outcome.get(k) for k in ('phone', 'email', 'error', 'ref') if outcome.get(k) is not None})
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                'job_id': self.id,
+                'election_uid': self.election_uid,
+                'resend_all': self.resend_all,
+                'mode': self.mode,
+                'channel': self.channel,
+                'mailer': self.mailer,
+                'api_calls': self.api_calls,
+                'estimate': self.estimate,
+                'status': self.status,
+                'total': self.total,
+                'sent': self.sent,
+                'failed': self.failed,
+                'done': self.sent + self.failed,
+                'errors': list(self.errors),
+                'created_at': self.created_at,
+                'finished_at': self.finished_at,
+            }
+
+
+def get_job(job_id: str):
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def _prune_jobs(keep: int):
+    """Drop the oldest finished jobs beyond the last `keep` (caller holds `_jobs_lock`)."""
+    finished = sorted((j for j in _jobs.values() if j.finished_at is not None), key=lambda j: j.finished_at)
+    for job in finished[:max(len(finished) - keep, 0)]:
+        del _jobs[job.id]
+
+
+def running_campaign(election_id: int, channel: str = 'sms'):
+    """Id of a campaign with messages still queued or sending for the election, or None.
+
+    Read from the outbox, so a job started by another process counts too.
+    """
+    from models import db, OutboxMessage
+
+    row = db.session.query(OutboxMessage.campaign).filter(
+        OutboxMessage.election_id == election_id,
+        OutboxMessage.channel == channel,
+        OutboxMessage.state.in_(('queued', 'sending')),
+    ).first()
+    return row[0] if row else None
+
+
+def start_send_job(app, election, resend_all: bool = False, mode: str = None, channel: str = 'sms') -> SendJob:
+    """Enqueue a campaign for `election` in the outbox and start sending it.
+
+    `channel` is `sms` or `email`. For SMS, `mode` is `single` (one
+    `addOneSms` per token) or `bulk` (chunked `addBulkSms`); defaults to
+    `SMS_DISPATCH_MODE`. When `OUTBOX_INPROCESS_WORKER` is disabled the
+    messages are only enqueued and are sent by `flask outbox work`.
+
+    Raises `JobAlreadyRunning` while a previous campaign of the election on
+    the same channel still has messages queued or sending (see `enqueue_campaign`).
+    """
+    if channel not in CHANNELS:
+        raise ValueError(f'unknown channel: {channel}')
+    mode = mode or app.config.get('SMS_DISPATCH_MODE', 'bulk')
+    if mode not in SEND_MODES:
+        raise ValueError(f'unknown send mode: {mode}')
+    job = SendJob(election.uid, resend_all=resend_all, mode=mode, channel=channel)
+    job.total = enqueue_campaign(election.id, job.id, resend_all=resend_all, channel=channel)
+    with _jobs_lock:
+        _prune_jobs(int(app.config.get('SEND_JOB_HISTORY', 100)))
+        _jobs[job.id] = job
+    if app.config.get('OUTBOX_INPROCESS_WORKER', True):
+        thread = threading.Thread(target=_run_send_job, args=(app, job), daemon=True)
+        thread.start()
+    return job
+
+
+def _lock_election(election_id: int):
+    """Lock the election row until the end of the current transaction.
+
+    `SELECT ... FOR UPDATE`; SQLite has no row locks, so a no-op UPDATE takes
+    the database write lock instead.
+    """
+    from models import db, Election
+    from sqlalchemy import update
+
+    if db.engine.dialect.name == 'sqlite':
+        db.session.execute(update(Election).where(Election.id == election_id).values(id=Election.id))
+    else:
+        db.session.query(Election.id).filter(Election.id == election_id).with_for_update().one()
+
+
+def enqueue_campaign(election_id: int, campaign: str, resend_all: bool = False, channel: str = 'sms') -> int:
+    """Insert one `queued` outbox row per token to notify, in a single INSERT ... SELECT.
+
+    Tokens already having a queued or in-flight message on `channel` are
+    skipped, as are tokens whose message was interrupted mid-send (it may have
+    reached the provider; see `recover_stale_messages`) and tokens without an
+    email address on the `email` channel.
+    Returns the number of messages enqueued.
+
+    Raises `JobAlreadyRunning` if another campaign of the election on
+    `channel` still has messages queued or sending. The check and the INSERT
+    run in one transaction holding a lock on the election row, so of two
+    concurrent calls the second waits and then sees the first campaign.
+    """
+    from models import db, VoteToken, OutboxMessage
+    from sqlalchemy import select, literal, insert, exists, and_
+    from flask import current_app
+    from utils import ensure_short_links
+
+    if current_app.config.get('URL_SHORTENER', 'local') == 'local':
+        ensure_short_links(election_id)
+    _lock_election(election_id)
+    running = running_campaign(election_id, channel)
+    if running is not None:
+        db.session.rollback()
+        raise JobAlreadyRunning(running)
+    in_flight = exists().where(and_(
+        OutboxMessage.vote_token_id == VoteToken.id,
+        OutboxMessage.channel == channel,
+        OutboxMessage.state.in_(('queued', 'sending', 'interrupted')),
+    ))
+    recipient = VoteToken.email if channel == 'email' else VoteToken.phone_number
+    source = select(
+        literal(campaign), VoteToken.election_id, VoteToken.id, literal(channel), recipient,
+        literal('queued'), literal(0), literal(datetime.utcnow()), literal(datetime.utcnow()),
+    ).where(VoteToken.election_id == election_id, ~in_flight)
+    if channel == 'email':
+        source = source.where(VoteToken.email.isnot(None))
+    if not resend_all:
+        source = source.where(VoteToken.sent.is_(False))
+    result = db.session.execute(insert(OutboxMessage).from_select(
+        ['campaign', 'election_id', 'vote_token_id', 'channel', 'recipient', 'state', 'attempts', 'created_at', 'updated_at'],
+        source,
+    ))
+    db.session.commit()
+    return result.rowcount
+
+
+def _send_one(app, job, limiter, renderer, vtoken) -> list:
+    from utils import send_vote_one_sms
+
+    limiter.acquire()
+    if job:
+        job.count_api_call()
+    with app.app_context():
+        result = send_vote_one_sms(vtoken, renderer.election_uid, renderer=renderer)
+        outcome = {'token_id': vtoken.id, 'phone': vtoken.phone_number}
+        if not result.get('success'):
+            outcome.update(success=False, error=result.get('error', 'unknown error'))
+            return [outcome]
+
+        ref = result.get('ref') if result.get('ref') not in (None, '', 'N/A') else None
+        outcome.update(success=True, ref=ref)
+        if not ref:
+            outcome['error'] = 'reference sms indisponible'
+        return [outcome]
+
+
+def _send_chunk(app, job, limiter, renderer, vtokens: list) -> list:
+    """Send one chunk with `addBulkSms`, retrying failed calls with backoff.
+
+    Recipients whose `Rep` entry reports a failure are marked failed with its
+    `Statut`, even when the call itself succeeded.
+    """
+    from utils import send_vote_sms_bulk
+
+    retries = int(app.config.get('SMS_BULK_MAX_RETRIES', 3))
+    backoff = float(app.config.get('SMS_BULK_RETRY_BACKOFF', 1.0))
+    with app.app_context():
+        for attempt in range(retries + 1):
+            limiter.acquire()
+            if job:
+                job.count_api_call()
+            result = send_vote_sms_bulk(vtokens, renderer.election_uid, flash=0, renderer=renderer)
+            if result.get('success'):
+                break
+            if attempt < retries:
+                time.sleep(backoff * (2 ** attempt))
+
+    outcomes = []
+    for vtoken in vtokens:
+        outcome = {'token_id': vtoken.id, 'phone': vtoken.phone_number}
+        if not result.get('success'):
+            outcome.update(success=False, error=result.get('error', 'unknown error'))
+        elif vtoken.id in result.get('failures', {}):
+            outcome.update(success=False, error=result['failures'][vtoken.id])
+        else:
+            ref = result['refs'].get(vtoken.id)
+            outcome.update(success=True, ref=ref)
+            if not ref:
+                outcome['error'] = 'reference sms indisponible'
+        outcomes.append(outcome)
+    return outcomes
+
+
+def _send_email(app, mailer, renderer, subject, mail_from, vtoken) -> list:
+    """Send one vote email over the calling thread's reused SMTP session."""
+    from mailer import build_message
+
+    with app.app_context():
+        msg = build_message(mail_from, vtoken.email, subject, renderer.render(vtoken))
+    result = mailer.send(msg)
+    outcome = {'token_id': vtoken.id, 'email': vtoken.email, 'success': result['success']}
+    if not result['success']:
+        outcome['error'] = result.get('error', 'unknown error')
+    return [outcome]
+
+
+def _run_send_job(app, job: SendJob):
+    from models import db, VoteToken, OutboxMessage
+    from sqlalchemy.orm import joinedload
+    from campaign import CampaignRenderer
+
+    with app.app_context():
+        try:
+            queued = VoteToken.query.options(joinedload(VoteToken.short_link)) \
+                .join(OutboxMessage, OutboxMessage.vote_token_id == VoteToken.id) \
+                .filter(OutboxMessage.campaign == job.id)
+            if job.channel == 'sms':
+                job.estimate = CampaignRenderer(job.election_uid).estimate(queued.yield_per(1000))
+            job.status = 'running'
+            process_outbox(app, campaign=job.id, mode=job.mode, job=job, channel=job.channel)
+            job.status = 'finished'
+        except Exception as exc:
+            app.logger.exception('%s send job %s failed', job.channel, job.id)
+            db.session.rollback()
+            job.status = 'failed'
+            job.errors.append({'error': str(exc)})
+        finally:
+            job.finished_at = datetime.utcnow()
+            db.session.remove()
+
+
+def process_outbox(app, campaign: str = None, mode: str = None, job: SendJob = None, worker_id: str = None,
+                   channel: str = 'sms') -> int:
+    """Send queued outbox messages of `channel` until none is left; returns the number processed.
+
+    Messages are claimed in batches of `SMS_DISPATCH_COMMIT_BATCH` (conditional
+    UPDATE `queued` -> `sending`, so concurrent workers never share a message),
+    sent over the worker pool and their results committed together with the
+    tokens' `sent` flags. Restrict to one send job with `campaign`.
+    """
+    from models import db, Election
+    from campaign import CampaignRenderer, DEFAULT_EMAIL_TEMPLATE, DEFAULT_EMAIL_SUBJECT
+    from mailer import SMTPSessionPool
+
+    mode = mode or app.config.get('SMS_DISPATCH_MODE', 'bulk')
+    worker_id = worker_id or f'{uuid.uuid4()}'
+    if channel == 'email':
+        workers = int(app.config.get('EMAIL_WORKERS', 4))
+        mailer = SMTPSessionPool(app.config)
+        template = app.config.get('EMAIL_TEMPLATE') or DEFAULT_EMAIL_TEMPLATE
+        subject = app.config.get('EMAIL_SUBJECT') or DEFAULT_EMAIL_SUBJECT
+        mail_from = app.config.get('MAIL_FROM') or app.config.get('MAIL_USER')
+    else:
+        workers = int(app.config.get('SMS_DISPATCH_WORKERS', 8))
+        mailer = template = None
+    batch_size = int(app.config.get('SMS_DISPATCH_COMMIT_BATCH', 500))
+    chunk_size = int(app.config.get('SMS_BULK_CHUNK_SIZE', 100))
+    limiter = RateLimiter(float(app.config.get('SMS_DISPATCH_RATE_PER_SEC', 10)))
+    renderers = {}
+    processed = 0
+
+    with app.app_context(), ThreadPoolExecutor(max_workers=workers) as pool:
+        recover_stale_messages(app)
+        try:
+            while True:
+                messages = _claim_messages(worker_id, batch_size, campaign=campaign, channel=channel)
+                if not messages:
+                    break
+                by_election = {}
+                for message in messages:
+                    by_election.setdefault(message.election_id, []).append(message.vote_token)
+                for election_id in by_election:
+                    if election_id not in renderers:
+                        renderers[election_id] = CampaignRenderer(db.session.get(Election, election_id).uid, template=template)
+                # Detach the rows so worker threads only read already-loaded attributes
+                db.session.expunge_all()
+
+                futures = {}
+                for election_id, vtokens in by_election.items():
+                    renderer = renderers[election_id]
+                    if channel == 'email':
+                        for vtoken in vtokens:
+                            futures[pool.submit(_send_email, app, mailer, renderer, subject, mail_from, vtoken)] = [vtoken]
+                    elif mode == 'bulk':
+                        for i in range(0, len(vtokens), chunk_size):
+                            unit = vtokens[i:i + chunk_size]
+                            futures[pool.submit(_send_chunk, app, job, limiter, renderer, unit)] = unit
+                    else:
+                        for vtoken in vtokens:
+                            futures[pool.submit(_send_one, app, job, limiter, renderer, vtoken)] = [vtoken]
+
+                outcomes = []
+                for future in as_completed(futures):
+                    try:
+                        unit_outcomes = future.result()
+                    except Exception as exc:
+                        unit_outcomes = [
+                            {'token_id': vt.id, 'phone': vt.phone_number, 'success': False, 'error': str(exc)}
+                            for vt in futures[future]
+                        ]
+                    for outcome in unit_outcomes:
+                        if job is not None:
+                            job.record(outcome)
+                    outcomes.extend(unit_outcomes)
+                _complete_messages(messages, outcomes, channel=channel)
+                processed += len(messages)
+        finally:
+            if mailer is not None:
+                # Workers are idle here: their SMTP sessions can be closed
+                pool.shutdown(wait=True)
+                if job is not None:
+                    job.mailer = mailer.metrics()
+                mailer.close()
+    return processed
+
+
+def _claim_messages(worker_id: str, limit: int, campaign: str = None, channel: str = 'sms') -> list:
+    """Atomically move up to `limit` queued messages to `sending` for `worker_id`."""
+    from models import db, OutboxMessage, VoteToken
+    from sqlalchemy.orm import joinedload
+
+    query = db.session.query(OutboxMessage.id).filter(
+        OutboxMessage.state == 'queued', OutboxMessage.channel == channel
+    )
+    if campaign:
+        query = query.filter(OutboxMessage.campaign == campaign)
+    query = query.order_by(OutboxMessage.id).limit(limit)
+    if db.engine.dialect.name == 'postgresql':
+        query = query.with_for_update(skip_locked=True)
+    ids = [message_id for (message_id,) in query]
+    if not ids:
+        return []
+    now = datetime.utcnow()
+    db.session.query(OutboxMessage).filter(
+        OutboxMessage.id.in_(ids), OutboxMessage.state == 'queued'
+    ).update({
+        OutboxMessage.state: 'sending',
+        OutboxMessage.claimed_by: worker_id,
+        OutboxMessage.claimed_at: now,
+        OutboxMessage.attempts: OutboxMessage.attempts + 1,
+        OutboxMessage.updated_at: now,
+    }, synchronize_session=False)
+    db.session.commit()
+    return OutboxMessage.query.options(
+        joinedload(OutboxMessage.vote_token).joinedload(VoteToken.short_link)
+    ).filter(
+        OutboxMessage.id.in_(ids), OutboxMessage.claimed_by == worker_id, OutboxMessage.state == 'sending'
+    ).order_by(OutboxMessage.id).all()
+
+
+def _complete_messages(messages: list, outcomes: list, channel: str = 'sms'):
+    """Store send results on the outbox rows and the tokens in one transaction."""
+    from models import db, VoteToken, OutboxMessage
+    from sqlalchemy import update
+
+    by_token = {o['token_id']: o for o in outcomes if o.get('token_id') is not None}
+    now = datetime.utcnow()
+    rows = []
+    sent = []
+    for message in messages:
+        outcome = by_token.get(message.vote_token_id, {'success': False, 'error': 'no result'})
+        if outcome.get('success'):
+            sent.append(outcome)
+        rows.append({
+            'id': message.id,
+            'state': 'sent' if outcome.get('success') else 'failed',
+            'provider_ref': outcome.get('ref'),
+            'last_error': (outcome.get('error') or None) and str(outcome['error'])[:255],
+            'sent_at': now if outcome.get('success') else None,
+            'updated_at': now,
+        })
+    if rows:
+        db.session.execute(update(OutboxMessage), rows)
+    if sent and channel == 'email':
+        db.session.execute(update(VoteToken), [{'id': o['token_id'], 'sent': True} for o in sent])
+    elif sent:
+        db.session.execute(update(VoteToken), [
+            {
+                'id': o['token_id'],
+                'sent': True,
+                'sms_ref': o.get('ref'),
+                'sms_sent_at': now,
+                'delivery_status': 'pending' if o.get('ref') else 'unknown',
+                'delivery_checked_at': None,
+            }
+            for o in sent
+        ])
+    db.session.commit()
+
+
+def recover_stale_messages(app) -> int:
+    """Mark messages left in `sending` longer than `OUTBOX_SENDING_TIMEOUT` seconds `interrupted`.
+
+    Such messages belong to a crashed worker and may or may not have reached
+    the provider, so they are not re-sent automatically and `enqueue_campaign`
+    skips their tokens; use `requeue_failed(interrupted=True)` to send them
+    again deliberately.
+    """
+    from models import db, OutboxMessage
+    from datetime import timedelta
+
+    timeout = float(app.config.get('OUTBOX_SENDING_TIMEOUT', 600))
+    cutoff = datetime.utcnow() - timedelta(seconds=timeout)
+    count = db.session.query(OutboxMessage).filter(
+        OutboxMessage.state == 'sending', OutboxMessage.claimed_at < cutoff
+    ).update({
+        OutboxMessage.state: 'interrupted',
+        OutboxMessage.last_error: 'interrupted while sending, not retried to avoid duplicates',
+        OutboxMessage.updated_at: datetime.utcnow(),
+    }, synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+def requeue_failed(election_id: int = None, campaign: str = None, interrupted: bool = False) -> int:
+    """Put failed outbox messages back in the queue; returns how many were requeued.
+
+    With `interrupted`, messages interrupted mid-send are requeued too (they
+    may already have been delivered, so this can send duplicates).
+    """
+    from models import db, OutboxMessage
+
+    states = ('failed', 'interrupted') if interrupted else ('failed',)
+    query = db.session.query(OutboxMessage).filter(OutboxMessage.state.in_(states))
+    if election_id:
+        query = query.filter(OutboxMessage.election_id == election_id)
+    if campaign:
+        query = query.filter(OutboxMessage.campaign == campaign)
+    count = query.update({
+        OutboxMessage.state: 'queued',
+        OutboxMessage.claimed_by: None,
+        OutboxMessage.claimed_at: None,
+        OutboxMessage.updated_at: datetime.utcnow(),
+    }, synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+def campaign_progress(campaign: str) -> dict:
+    """Message counts per outbox state for one send job."""
+    from models import db, OutboxMessage
+    from sqlalchemy import func
+
+    counts = dict(
+        db.session.query(OutboxMessage.state, func.count(OutboxMessage.id))
+        .filter(OutboxMessage.campaign == campaign)
+        .group_by(OutboxMessage.state).all()
+    )
+    return {state: counts.get(state, 0) for state in OutboxMessage.STATES}
+
+
+def outbox_stats(window_seconds: int = 60) -> dict:
+    """Queue depth per channel/state and recent throughput of the outbox."""
+    from models import db, OutboxMessage
+    from sqlalchemy import func
+    from datetime import timedelta
+
+    depth = {}
+    for channel, state, count in db.session.query(
+        OutboxMessage.channel, OutboxMessage.state, func.count(OutboxMessage.id)
+    ).group_by(OutboxMessage.channel, OutboxMessage.state):
+        depth.setdefault(channel, {})[state] = count
+    since = datetime.utcnow() - timedelta(seconds=window_seconds)
+    recent = db.session.query(func.count(OutboxMessage.id)).filter(
+        OutboxMessage.state.in_(('sent', 'acknowledged')), OutboxMessage.sent_at >= since
+    ).scalar() or 0
+    oldest_queued = db.session.query(func.min(OutboxMessage.created_at)).filter(OutboxMessage.state == 'queued').scalar()
+    return {
+        'depth': depth,
+        'sent_last_window': recent,
+        'window_seconds': window_seconds,
+        'throughput_per_sec': round(recent / float(window_seconds), 2),
+        'oldest_queued_at': oldest_queued,
+    }
+
+
+def run_outbox_worker(app, interval: float = None, stop_event=None):
+    """Consume the outbox forever (or until `stop_event` is set)."""
+    interval = interval or float(app.config.get('OUTBOX_POLL_INTERVAL', 5))
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        try:
+            if sum(process_outbox(app, channel=channel) for channel in CHANNELS):
+                continue
+        except Exception:
+            app.logger.exception('outbox worker pass failed')
+        stop_event.wait(interval)
+
+
+def reconcile_deliveries(app, limit: int = None) -> dict:
+    """Poll `getAccuses` for up to `limit` pending SMS and store their delivery state.
+
+    Tokens are checked oldest-checked first so every pending SMS is eventually
+    revisited. SMS still pending `DELIVERY_PENDING_MAX_AGE_SECONDS` after they
+    were sent are marked `unknown` and no longer polled. Returns the number of
+    tokens checked, how many changed state and how many `expired`.
+    """
+    from models import db, VoteToken, OutboxMessage
+    from datetime import timedelta
+    from utils import get_delivery_status, _create_sms_client
+
+    limit = limit or int(app.config.get('DELIVERY_POLL_BATCH', 200))
+    workers = int(app.config.get('SMS_DISPATCH_WORKERS', 8))
+    max_age = float(app.config.get('DELIVERY_PENDING_MAX_AGE_SECONDS', 172800))
+    with app.app_context():
+        expired = db.session.query(VoteToken).filter(
+            VoteToken.delivery_status == 'pending',
+            VoteToken.sms_sent_at < datetime.utcnow() - timedelta(seconds=max_age),
+        ).update({VoteToken.delivery_status: 'unknown', VoteToken.delivery_checked_at: datetime.utcnow()},
+                 synchronize_session=False)
+        db.session.commit()
+        pending = VoteToken.query.filter(
+            VoteToken.delivery_status == 'pending', VoteToken.sms_ref.isnot(None)
+        ).order_by(VoteToken.delivery_checked_at.asc().nullsfirst(), VoteToken.id).limit(limit).all()
+        if not pending:
+            return {'checked': 0, 'updated': 0, 'expired': expired}
+        smsclient = _create_sms_client()
+        checks = [(vt.id, vt.sms_ref, vt.phone_number) for vt in pending]
+
+        def check(item):
+            token_id, ref, dest = item
+            with app.app_context():
+                return token_id, get_delivery_status(ref, dest, smsclient=smsclient)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            statuses = dict(pool.map(check, checks))
+
+        now = datetime.utcnow()
+        updated = 0
+        delivered_refs = []
+        for vt in pending:
+            status = statuses.get(vt.id)
+            vt.delivery_checked_at = now
+            if status and status != vt.delivery_status:
+                vt.delivery_status = status
+                updated += 1
+                if status == 'delivered':
+                    delivered_refs.append(vt.sms_ref)
+        if delivered_refs:
+            OutboxMessage.query.filter(
+                OutboxMessage.provider_ref.in_(delivered_refs), OutboxMessage.state == 'sent'
+            ).update({OutboxMessage.state: 'acknowledged', OutboxMessage.updated_at: now}, synchronize_session=False)
+        db.session.commit()
+        db.session.remove()
+        return {'checked': len(pending), 'updated': updated, 'expired': expired}
+
+
+def run_delivery_reconciler(app, interval: float = None, stop_event=None):
+    """Run `reconcile_deliveries` forever (or until `stop_event` is set)."""
+    interval = interval or float(app.config.get('DELIVERY_POLL_INTERVAL', 60))
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        try:
+            reconcile_deliveries(app)
+        except Exception:
+            app.logger.exception('delivery reconciliation failed')
+        stop_event.wait(interval)
+
+
+def start_delivery_reconciler(app) -> threading.Event:
+    """Start the delivery reconciler in a daemon thread; set the returned event to stop it."""
+    stop_event = threading.Event()
+    thread = threading.Thread(target=run_delivery_reconciler, args=(app, None, stop_event), daemon=True)
+    thread.start()
+    return stop_event
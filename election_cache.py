@@ -0,0 +1,147 @@
+"""Read-through cache of election metadata for the public vote path.
+
+Holds, per election uid, the voting window and the candidate list (everything
+`public/vote.py` needs except the vote token and the tallies). Candidates
+cannot be changed while an election is in progress, so entries stay valid for
+the whole vote; the admin election and candidate routes call `invalidate()`
+after each change.
+
+Entries are versioned: `invalidate()` bumps the election's version and
+readers only accept an entry carrying the current version. By default
+versions and entries live in this process, so an invalidation is not seen by
+other workers: entries are then reloaded once they are older than
+`ELECTION_CACHE_LOCAL_TTL` seconds (a few seconds, at most
+`ELECTION_CACHE_TTL`), which bounds how long another worker can serve a
+stale voting window or candidate list. With `ELECTION_CACHE_REDIS_URL` set
+(requires the optional `redis` package), versions and serialized entries are
+kept in Redis so an invalidation made by one process is seen by all of them
+immediately; each process still keeps decoded entries in memory and only asks
+Redis for the current version.
+"""
+import json
+import threading
+import time
+from datetime import datetime
+
+
+def _encode(meta: dict) -> str:
+    return json.dumps({
+        **meta,
+        'start_at': meta['start_at'].isoformat() if meta['start_at'] else None,
+        'end_at': meta['end_at'].isoformat() if meta['end_at'] else None,
+    })
+
+
+def _decode(raw) -> dict:
+    meta = json.loads(raw)
+    for key in ('start_at', 'end_at'):
+        if meta[key]:
+            meta[key] = datetime.fromisoformat(meta[key])
+    return meta
+
+
+class ElectionCache:
+    def __init__(self):
+        self._entries = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.redis = None
+        self.prefix = 'election-meta'
+        self.ttl = 3600
+        self.local_ttl = 5.0
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.prefix = app.config.get('ELECTION_CACHE_PREFIX', 'election-meta')
+        self.ttl = int(app.config.get('ELECTION_CACHE_TTL', 3600))
+        self.local_ttl = min(float(app.config.get('ELECTION_CACHE_LOCAL_TTL', 5)), self.ttl)
+        url = app.config.get('ELECTION_CACHE_REDIS_URL')
+        if url:
+            import redis
+
+            self.redis = redis.Redis.from_url(url)
+
+    def _version(self, uid: str) -> int:
+        if self.redis is not None:
+            return int(self.redis.get(f'{self.prefix}:{uid}:version') or 0)
+        with self._lock:
+            return self._versions.get(uid, 0)
+
+    def _load(self, uid: str):
+        from models import Election, Candidate
+
+        election = Election.query.filter_by(uid=uid).first()
+        if election is None:
+            return None
+        candidates = Candidate.query.filter_by(election_id=election.id).order_by(Candidate.id).all()
+        return {
+            'id': election.id,
+            'uid': election.uid,
+            'title': election.title,
+            'start_at': election.start_at,
+            'end_at': election.end_at,
+            'candidates': [
+                {'id': c.id, 'uid': c.uid, 'name': c.name, 'prenom': c.prenom or '', 'photo': c.photo or ''}
+                for c in candidates
+            ],
+        }
+
+    def get(self, uid: str):
+        """Metadata of election `uid` (dict), or None if it does not exist."""
+        version = self._version(uid)
+        with self._lock:
+            entry = self._entries.get(uid)
+        if entry is not None and entry[0] == version and (
+                self.redis is not None or time.monotonic() - entry[2] < self.local_ttl):
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        meta = None
+        if self.redis is not None:
+            raw = self.redis.get(f'{self.prefix}:{uid}:{version}')
+            if raw is not None:
+                meta = _decode(raw)
+        if meta is None:
+            meta = self._load(uid)
+            if meta is None:
+                return None
+            if self.redis is not None:
+                self.redis.set(f'{self.prefix}:{uid}:{version}', _encode(meta), ex=self.ttl)
+        with self._lock:
+            self._entries[uid] = (version, meta, time.monotonic())
+        return meta
+
+    def invalidate(self, uid: str):
+        """Drop the cached metadata of election `uid` (call after committing a change)."""
+        with self._lock:
+            self._entries.pop(uid, None)
+            self._versions[uid] = self._versions.get(uid, 0) + 1
+        if self.redis is not None:
+            self.redis.incr(f'{self.prefix}:{uid}:version')
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+        return {'hits': self.hits, 'misses': self.misses, 'entries': size,
+                'backend': 'redis' if self.redis is not None else 'memory'}
+
+
+election_cache = ElectionCache()
+
+
+def find_candidate(meta: dict, candidate_id):
+    """Candidate entry of `meta` with id `candidate_id`, or None."""
+    try:
+        candidate_id = int(candidate_id)
+    except (TypeError, ValueError):
+        return None
+    for candidate in meta['candidates']:
+        if candidate['id'] == candidate_id:
+            return candidate
+    return None
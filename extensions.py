@@ -1,3 +1,208 @@
+import hashlib
+import threading
+
 from flask_socketio import SocketIO
 
 socketio = SocketIO(cors_allowed_origins="*")
+
+
+def results_seq(results) -> int:
+    """Sequence number of a results state: the election's total vote count.
+
+    Votes are only ever added, so it increases with every new state and is the
+    same whichever worker computed it. A client ignores messages whose `seq`
+    is not above the last one it applied; after applying a partial update the
+    sum of its counts must equal `seq`, otherwise it missed an update and
+    re-sends `join` to get a fresh snapshot.
+    """
+    return sum(r['vote_count'] or 0 for r in results)
+
+
+def candidates_version(results) -> str:
+    """Short fingerprint of an election's candidate list, in order.
+
+    Compact payloads address candidates by index; when candidates are added,
+    removed or reordered the indexes change, and so does this version. It is
+    derived from the candidate uids only, so every worker computes the same one.
+    """
+    uids = '|'.join(r['candidate_uid'] for r in results)
+    return hashlib.sha1(uids.encode('utf-8')).hexdigest()[:8]
+
+
+class ResultsBroadcaster:
+    """Coalesce `results_update` emits per election.
+
+    `publish()` only records the latest results for an election; a background
+    task emits them at most once every `RESULTS_BROADCAST_INTERVAL_MS`. With
+    `RESULTS_BROADCAST_DELTA` enabled, only candidates whose count changed since
+    the previous emit are sent (payload flagged with `'partial': True`).
+    An interval of 0 disables coalescing and emits on every publish.
+
+    Every payload carries `seq`, see `results_seq`. A payload whose `seq` is
+    not above the last one emitted for the election is dropped, so a flush
+    racing the background task never sends an older state last.
+
+    With `RESULTS_PROTOCOL=compact`, the candidates' static fields are only
+    sent in the `join` snapshot (`snapshot()`), in the order that defines
+    their index, and updates are `results_delta` events
+    `{"e": election_uid, "s": seq, "v": version, "d": [[index, count], ...]}`
+    listing the counts that changed; `version` (`candidates_version`) is also
+    in the snapshot and clients rejoin when it differs. A worker that has not
+    emitted for an election yet only sends the candidates named by
+    `publish(..., changed=...)`. `RESULTS_ENCODING=msgpack` (requires `msgpack`)
+    sends snapshots and updates as MessagePack binary instead of JSON.
+    """
+
+    def __init__(self, socketio, interval=0.25, delta=False):
+        self.socketio = socketio
+        self.interval = interval
+        self.delta = delta
+        self.protocol = 'full'
+        self.encoding = 'json'
+        self._packb = None
+        self._lock = threading.Lock()
+        self._emit_lock = threading.Lock()
+        self._pending = {}
+        self._changed = {}
+        self._last_counts = {}
+        self._last_seq = {}
+        self._flusher_running = False
+        self.published = 0
+        self.emitted = 0
+
+    def init_app(self, app):
+        self.interval = int(app.config.get('RESULTS_BROADCAST_INTERVAL_MS', 250)) / 1000.0
+        self.delta = bool(app.config.get('RESULTS_BROADCAST_DELTA', False))
+        self.protocol = app.config.get('RESULTS_PROTOCOL', 'full')
+        if self.protocol not in ('full', 'compact'):
+            raise ValueError(f'unknown RESULTS_PROTOCOL: {self.protocol}')
+        self.encoding = app.config.get('RESULTS_ENCODING', 'json')
+        if self.encoding == 'msgpack':
+            import msgpack
+
+            self._packb = msgpack.packb
+        elif self.encoding != 'json':
+            raise ValueError(f'unknown RESULTS_ENCODING: {self.encoding}')
+
+    def encode(self, payload):
+        return self._packb(payload) if self._packb else payload
+
+    def snapshot(self, election_uid, results):
+        """Payload of the `results_snapshot` sent to a client on `join`."""
+        seq = results_seq(results)
+        if self.protocol == 'compact':
+            payload = {
+                'election_uid': election_uid,
+                'seq': seq,
+                'version': candidates_version(results),
+                'candidates': [{k: r[k] for k in ('candidate_uid', 'name', 'prenom', 'photo')} for r in results],
+                'counts': [r['vote_count'] for r in results],
+            }
+        else:
+            payload = {'election_uid': election_uid, 'results': results, 'seq': seq}
+        return self.encode(payload)
+
+    def publish(self, election_uid, results, changed=None):
+        """Record the latest `results` of an election for the next emit.
+
+        `changed` is the uid of the candidate whose count changed (the one
+        just voted for), used by the compact protocol before this worker
+        knows the counts clients have.
+        """
+        with self._lock:
+            self.published += 1
+            if self.interval <= 0:
+                pending = {election_uid: results}
+                changed_uids = {election_uid: {changed}} if changed else {}
+            else:
+                self._pending[election_uid] = results
+                if changed:
+                    self._changed.setdefault(election_uid, set()).add(changed)
+                pending = None
+                if not self._flusher_running:
+                    self._flusher_running = True
+                    self.socketio.start_background_task(self._run)
+        if pending:
+            self._emit_all(pending, changed_uids)
+
+    def flush(self):
+        """Emit every pending update immediately."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            changed, self._changed = self._changed, {}
+        self._emit_all(pending, changed)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'interval_ms': int(self.interval * 1000),
+                'delta': self.delta,
+                'protocol': self.protocol,
+                'encoding': self.encoding,
+                'published': self.published,
+                'emitted': self.emitted,
+                'emits_saved': self.published - self.emitted,
+                'pending_elections': len(self._pending),
+            }
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.interval)
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                changed, self._changed = self._changed, {}
+                if not pending:
+                    self._flusher_running = False
+                    return
+            self._emit_all(pending, changed)
+
+    def _emit_all(self, pending, changed=None):
+        changed = changed or {}
+        for election_uid, results in pending.items():
+            seq = results_seq(results)
+            # Decide and emit under one lock: the timer thread and request threads
+            # (flush, interval 0) must not interleave, nor send an older state last
+            with self._emit_lock:
+                last_seq = self._last_seq.get(election_uid)
+                if last_seq is not None and seq <= last_seq:
+                    continue
+                if self.protocol == 'compact':
+                    event = 'results_delta'
+                    payload = self._compact_payload(election_uid, results, seq, changed.get(election_uid))
+                else:
+                    event = 'results_update'
+                    payload = self._full_payload(election_uid, results, seq)
+                if payload is None:
+                    continue
+                self._last_counts[election_uid] = {r['candidate_uid']: r['vote_count'] for r in results}
+                self._last_seq[election_uid] = seq
+                self.socketio.emit(event, self.encode(payload), to=election_uid)
+            with self._lock:
+                self.emitted += 1
+
+    def _full_payload(self, election_uid, results, seq):
+        previous = self._last_counts.get(election_uid)
+        if self.delta and previous is not None:
+            updated = [r for r in results if previous.get(r['candidate_uid']) != r['vote_count']]
+            if not updated:
+                return None
+            return {'election_uid': election_uid, 'results': updated, 'partial': True, 'seq': seq}
+        return {'election_uid': election_uid, 'results': results, 'seq': seq}
+
+    def _compact_payload(self, election_uid, results, seq, changed_uids=None):
+        previous = self._last_counts.get(election_uid)
+        if previous is not None:
+            changed = [[i, r['vote_count']] for i, r in enumerate(results)
+                       if previous.get(r['candidate_uid']) != r['vote_count']]
+        elif changed_uids:
+            # First emit from this worker: clients got the other counts from their
+            # snapshot or another worker, only send the candidates voted for since
+            changed = [[i, r['vote_count']] for i, r in enumerate(results) if r['candidate_uid'] in changed_uids]
+        else:
+            changed = [[i, r['vote_count']] for i, r in enumerate(results)]
+        if not changed:
+            return None
+        return {'e': election_uid, 's': seq, 'v': candidates_version(results), 'd': changed}
+
+
+results_broadcaster = ResultsBroadcaster(socketio)
@@ -0,0 +1,120 @@
+"""SMTP delivery with connection reuse.
+
+`SMTPSession` keeps one authenticated SMTP connection open and sends many
+messages over it, reconnecting once when the server drops the connection.
+`SMTPSessionPool` gives each worker thread its own session so a campaign can
+be sent concurrently (see `dispatch.process_outbox` with `channel='email'`).
+"""
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+
+
+class SMTPSession:
+    def __init__(self, host, port=587, user=None, password=None, use_tls=True, timeout=10):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self._server = None
+        self.connects = 0
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            host=config.get('MAIL_HOST'),
+            port=int(config.get('MAIL_PORT', 587)),
+            user=config.get('MAIL_USER'),
+            password=config.get('MAIL_PASS'),
+            use_tls=config.get('MAIL_USE_TLS', True),
+        )
+
+    def connect(self):
+        self.close()
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.user:
+            server.login(self.user, self.password)
+        self._server = server
+        self.connects += 1
+
+    def send(self, msg: EmailMessage):
+        """Send `msg`, (re)connecting if needed; retries once on a dropped connection."""
+        if self._server is None:
+            self.connect()
+        try:
+            self._server.send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            self.connect()
+            self._server.send_message(msg)
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
+
+
+class SMTPSessionPool:
+    """One `SMTPSession` per thread, with aggregate throughput counters."""
+
+    def __init__(self, config):
+        self.config = config
+        self._local = threading.local()
+        self._sessions = []
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self._started = time.perf_counter()
+
+    def session(self) -> SMTPSession:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = SMTPSession.from_config(self.config)
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def send(self, msg: EmailMessage) -> dict:
+        try:
+            self.session().send(msg)
+        except Exception as exc:
+            with self._lock:
+                self.failed += 1
+            return {'success': False, 'error': str(exc)}
+        with self._lock:
+            self.sent += 1
+        return {'success': True}
+
+    def metrics(self) -> dict:
+        elapsed = time.perf_counter() - self._started
+        with self._lock:
+            return {
+                'sent': self.sent,
+                'failed': self.failed,
+                'connections': sum(s.connects for s in self._sessions),
+                'elapsed': round(elapsed, 3),
+                'messages_per_sec': round(self.sent / elapsed, 1) if elapsed > 0 else None,
+            }
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+
+
+def build_message(mail_from: str, to_email: str, subject: str, body: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg['Subject'] = subject
+    msg['From'] = mail_from
+    msg['To'] = to_email
+    msg.set_content(body)
+    return msg
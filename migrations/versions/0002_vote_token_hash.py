@@ -0,0 +1,32 @@
+"""vote_token.token_hash
+
+Indexed HMAC of the token used in public vote links. Existing rows are left
+NULL: fill them with `flask tokens rehash --missing-only` right after this
+upgrade (it needs the application's `SECRET_KEY`), before serving votes.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('vote_token', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('token_hash', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_vote_token_token_hash'), ['token_hash'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('vote_token', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_vote_token_token_hash'))
+        batch_op.drop_column('token_hash')
@@ -0,0 +1,35 @@
+"""candidate.vote_count
+
+Per-candidate vote counter read by the results endpoint. Initialised here
+from the vote table, so existing elections keep their counts; check it later
+with `flask tallies reconcile`.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 10:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('candidate', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('vote_count', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute(
+        'UPDATE candidate SET vote_count = '
+        '(SELECT COUNT(*) FROM vote WHERE vote.candidate_id = candidate.id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('candidate', schema=None) as batch_op:
+        batch_op.drop_column('vote_count')
@@ -0,0 +1,36 @@
+"""vote_token SMS delivery tracking
+
+Provider reference and delivery state of the last SMS sent for each token,
+filled by the delivery reconciler. Tokens sent before this revision have no
+reference and are never polled.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 10:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('vote_token', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sms_ref', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('delivery_status', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('delivery_checked_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_vote_token_delivery_status'), ['delivery_status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('vote_token', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_vote_token_delivery_status'))
+        batch_op.drop_column('delivery_checked_at')
+        batch_op.drop_column('delivery_status')
+        batch_op.drop_column('sms_ref')
@@ -0,0 +1,43 @@
+"""short_link table
+
+Local short codes for vote links. Tokens created before this revision get
+their code the next time their link is generated.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 10:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('short_link',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('code', sa.String(length=16), nullable=False),
+    sa.Column('election_id', sa.Integer(), nullable=False),
+    sa.Column('vote_token_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['election_id'], ['election.id'], name=op.f('fk_short_link_election_id_election'), ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['vote_token_id'], ['vote_token.id'], name=op.f('fk_short_link_vote_token_id_vote_token'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_short_link')),
+    sa.UniqueConstraint('code', name=op.f('uq_short_link_code')),
+    sa.UniqueConstraint('vote_token_id', name=op.f('uq_short_link_vote_token_id'))
+    )
+    with op.batch_alter_table('short_link', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_short_link_election_id'), ['election_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('short_link', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_short_link_election_id'))
+
+    op.drop_table('short_link')
@@ -0,0 +1,61 @@
+"""outbox_message table
+
+Durable queue of outbound SMS and emails. Tokens already marked `sent`
+before this revision are not enqueued again.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 10:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('outbox_message',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('campaign', sa.String(length=36), nullable=False),
+    sa.Column('election_id', sa.Integer(), nullable=False),
+    sa.Column('vote_token_id', sa.Integer(), nullable=False),
+    sa.Column('channel', sa.String(length=10), nullable=False),
+    sa.Column('recipient', sa.String(length=120), nullable=False),
+    sa.Column('state', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('provider_ref', sa.String(length=64), nullable=True),
+    sa.Column('body', sa.Text(), nullable=True),
+    sa.Column('last_error', sa.String(length=255), nullable=True),
+    sa.Column('claimed_by', sa.String(length=64), nullable=True),
+    sa.Column('claimed_at', sa.DateTime(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['election_id'], ['election.id'], name=op.f('fk_outbox_message_election_id_election'), ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['vote_token_id'], ['vote_token.id'], name=op.f('fk_outbox_message_vote_token_id_vote_token'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_outbox_message')),
+    sa.UniqueConstraint('campaign', 'vote_token_id', 'channel', name='uq_outbox_campaign_token_channel')
+    )
+    with op.batch_alter_table('outbox_message', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_outbox_message_campaign'), ['campaign'], unique=False)
+        batch_op.create_index(batch_op.f('ix_outbox_message_election_id'), ['election_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_outbox_message_provider_ref'), ['provider_ref'], unique=False)
+        batch_op.create_index(batch_op.f('ix_outbox_message_state'), ['state'], unique=False)
+        batch_op.create_index(batch_op.f('ix_outbox_message_vote_token_id'), ['vote_token_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('outbox_message', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_outbox_message_vote_token_id'))
+        batch_op.drop_index(batch_op.f('ix_outbox_message_state'))
+        batch_op.drop_index(batch_op.f('ix_outbox_message_provider_ref'))
+        batch_op.drop_index(batch_op.f('ix_outbox_message_election_id'))
+        batch_op.drop_index(batch_op.f('ix_outbox_message_campaign'))
+
+    op.drop_table('outbox_message')
@@ -0,0 +1,28 @@
+"""vote_token.email
+
+Optional address used by the email distribution channel.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 10:25:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('vote_token', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('email', sa.String(length=120), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('vote_token', schema=None) as batch_op:
+        batch_op.drop_column('email')
@@ -0,0 +1,34 @@
+"""token_blocklist.expires_at and purge indexes
+
+Expiry of the revoked token, so `flask auth purge-blocklist` can delete rows
+once the token is no longer valid anyway. Rows revoked before this revision
+have no expiry and are purged seven days after `revoked_at`.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('token_blocklist', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('expires_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_token_blocklist_expires_at'), ['expires_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_token_blocklist_revoked_at'), ['revoked_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('token_blocklist', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_token_blocklist_revoked_at'))
+        batch_op.drop_index(batch_op.f('ix_token_blocklist_expires_at'))
+        batch_op.drop_column('expires_at')
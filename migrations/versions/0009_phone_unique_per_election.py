@@ -0,0 +1,68 @@
+"""phone numbers unique per election, indexes for hot queries
+
+Replaces the global unique constraint on `vote_token.phone_number` with
+`uq_vote_token_election_phone` on (election_id, phone_number) and adds the
+composite indexes used by the send queries, vote time windows and tally
+reconciliation.
+
+The old constraint is found by reflection: databases created by
+`db.create_all()` before the naming convention have it unnamed on SQLite
+(the batch naming convention below gives it a name so it can be dropped) and
+named `vote_token_phone_number_key` on PostgreSQL.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 23:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+NAMING_CONVENTION = {'uq': 'uq_%(table_name)s_%(column_0_name)s'}
+
+
+def _phone_unique_constraints():
+    inspector = sa.inspect(op.get_bind())
+    return [
+        uc['name'] or 'uq_vote_token_phone_number'
+        for uc in inspector.get_unique_constraints('vote_token')
+        if uc['column_names'] == ['phone_number']
+    ]
+
+
+def upgrade():
+    old_constraints = _phone_unique_constraints()
+    with op.batch_alter_table('vote_token', schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        for name in old_constraints:
+            batch_op.drop_constraint(name, type_='unique')
+        batch_op.create_unique_constraint('uq_vote_token_election_phone', ['election_id', 'phone_number'])
+        batch_op.create_index('ix_vote_token_election_sent', ['election_id', 'sent'], unique=False)
+
+    with op.batch_alter_table('vote', schema=None) as batch_op:
+        batch_op.create_index('ix_vote_election_created', ['election_id', 'created_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_vote_candidate_id'), ['candidate_id'], unique=False)
+
+    with op.batch_alter_table('candidate', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_candidate_election_id'), ['election_id'], unique=False)
+
+
+def downgrade():
+    # Fails if a phone number is registered in several elections
+    with op.batch_alter_table('candidate', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_candidate_election_id'))
+
+    with op.batch_alter_table('vote', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_vote_candidate_id'))
+        batch_op.drop_index('ix_vote_election_created')
+
+    with op.batch_alter_table('vote_token', schema=None) as batch_op:
+        batch_op.drop_index('ix_vote_token_election_sent')
+        batch_op.drop_constraint('uq_vote_token_election_phone', type_='unique')
+        batch_op.create_unique_constraint(batch_op.f('uq_vote_token_phone_number'), ['phone_number'])
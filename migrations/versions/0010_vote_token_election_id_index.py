@@ -0,0 +1,26 @@
+"""index for the keyset-paginated voter listing
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17 23:55:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('vote_token', schema=None) as batch_op:
+        batch_op.create_index('ix_vote_token_election_id', ['election_id', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('vote_token', schema=None) as batch_op:
+        batch_op.drop_index('ix_vote_token_election_id')
@@ -0,0 +1,42 @@
+"""turnout rollup table
+
+Fill it for votes cast before this revision with `flask turnout backfill`.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17 23:56:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('turnout_bucket',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('election_id', sa.Integer(), nullable=False),
+    sa.Column('candidate_id', sa.Integer(), nullable=False),
+    sa.Column('granularity', sa.String(length=10), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['candidate_id'], ['candidate.id'], name=op.f('fk_turnout_bucket_candidate_id_candidate'), ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['election_id'], ['election.id'], name=op.f('fk_turnout_bucket_election_id_election'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_turnout_bucket')),
+    sa.UniqueConstraint('election_id', 'granularity', 'bucket_start', 'candidate_id', name='uq_turnout_bucket')
+    )
+    with op.batch_alter_table('turnout_bucket', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_turnout_bucket_candidate_id'), ['candidate_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('turnout_bucket', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_turnout_bucket_candidate_id'))
+
+    op.drop_table('turnout_bucket')
@@ -0,0 +1,41 @@
+"""frozen final results of sealed elections
+
+Seal elections that already closed with `flask elections seal`.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-17 23:57:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('election_result',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('election_id', sa.Integer(), nullable=False),
+    sa.Column('sealed_at', sa.DateTime(), nullable=False),
+    sa.Column('results', sa.JSON(), nullable=False),
+    sa.Column('votes_cast', sa.Integer(), nullable=False),
+    sa.Column('total_candidates', sa.Integer(), nullable=False),
+    sa.Column('total_tokens', sa.Integer(), nullable=False),
+    sa.Column('total_voters', sa.Integer(), nullable=False),
+    sa.Column('tokens_used', sa.Integer(), nullable=False),
+    sa.Column('archive_path', sa.String(length=255), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['election_id'], ['election.id'], name=op.f('fk_election_result_election_id_election'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_election_result')),
+    sa.UniqueConstraint('election_id', name=op.f('uq_election_result_election_id'))
+    )
+
+
+def downgrade():
+    op.drop_table('election_result')
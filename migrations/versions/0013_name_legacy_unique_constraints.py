@@ -0,0 +1,53 @@
+"""name the unique constraints of create_all databases
+
+Databases created by `db.create_all()` before the naming convention have
+their original unique constraints unnamed (SQLite) or named by the backend
+(`admin_username_key` on PostgreSQL). Give them the convention's names, as
+a database built from the migrations has, so later revisions can address
+them on every backend. A no-op on databases that already use the names.
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-18 10:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0013'
+down_revision = '0012'
+branch_labels = None
+depends_on = None
+
+NAMING_CONVENTION = {'uq': 'uq_%(table_name)s_%(column_0_name)s'}
+
+UNIQUE_COLUMNS = {
+    'admin': 'username',
+    'election': 'uid',
+    'candidate': 'uid',
+    'vote_token': 'token',
+    'token_blocklist': 'jti',
+}
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for table, column in UNIQUE_COLUMNS.items():
+        expected = f'uq_{table}_{column}'
+        for uc in inspector.get_unique_constraints(table):
+            if uc['column_names'] != [column] or uc['name'] == expected:
+                continue
+            if bind.dialect.name == 'sqlite':
+                # The table copy names its unnamed constraints after the convention
+                with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION, recreate='always'):
+                    pass
+            else:
+                op.execute(f'ALTER TABLE {table} RENAME CONSTRAINT {uc["name"]} TO {expected}')
+
+
+def downgrade():
+    # The convention names are valid on every backend; nothing to restore
+    pass
@@ -0,0 +1,32 @@
+"""vote_token.sms_sent_at
+
+When the last SMS of each token was sent, so the delivery reconciler can stop
+polling receipts that never arrive (`DELIVERY_PENDING_MAX_AGE_SECONDS`).
+Tokens still pending at upgrade time are dated to the upgrade, so they are
+polled for at most one more max age.
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0014'
+down_revision = '0013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('vote_token', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sms_sent_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE vote_token SET sms_sent_at = CURRENT_TIMESTAMP WHERE delivery_status = 'pending'")
+
+
+def downgrade():
+    with op.batch_alter_table('vote_token', schema=None) as batch_op:
+        batch_op.drop_column('sms_sent_at')
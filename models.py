@@ -1,9 +1,22 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
+import secrets
+import string
 import uuid
 from flask import current_app as app
+from sqlalchemy import MetaData
 
-db = SQLAlchemy()
+# Deterministic constraint names, so migrations can drop them on every backend
+# (SQLite batch mode cannot alter an unnamed constraint)
+NAMING_CONVENTION = {
+    'ix': 'ix_%(column_0_label)s',
+    'uq': 'uq_%(table_name)s_%(column_0_name)s',
+    'ck': 'ck_%(table_name)s_%(constraint_name)s',
+    'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s',
+    'pk': 'pk_%(table_name)s',
+}
+
+db = SQLAlchemy(metadata=MetaData(naming_convention=NAMING_CONVENTION))
 
 class Admin(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -30,55 +43,208 @@ class Candidate(db.Model):
     prenom = db.Column(db.String(65), nullable=False)
     photo = db.Column(db.String(255), nullable=False)
     # Add ON DELETE CASCADE on the FK and cascade deletes at ORM-level for votes
-    election_id = db.Column(db.Integer, db.ForeignKey('election.id', ondelete='CASCADE'), nullable=False)
+    election_id = db.Column(db.Integer, db.ForeignKey('election.id', ondelete='CASCADE'), nullable=False, index=True)
+    # Running tally, incremented in the same transaction as each Vote insert.
+    # `flask tallies reconcile` re-derives it from the Vote table.
+    vote_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     votes = db.relationship('Vote', backref='candidate', lazy=True, cascade="all, delete-orphan")
 
 class Vote(db.Model):
+    # (election_id, created_at) serves per-election filters and time windows;
+    # candidate_id is what tally reconciliation groups by.
+    __table_args__ = (
+        db.Index('ix_vote_election_created', 'election_id', 'created_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     #user_id = db.Column(db.Integer, nullable=True)
     # ensure votes are removed when election or candidate is deleted
     election_id = db.Column(db.Integer, db.ForeignKey('election.id', ondelete='CASCADE'), nullable=False)
-    candidate_id = db.Column(db.Integer, db.ForeignKey('candidate.id', ondelete='CASCADE'), nullable=False)
+    candidate_id = db.Column(db.Integer, db.ForeignKey('candidate.id', ondelete='CASCADE'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class TurnoutBucket(db.Model):
+    """Votes per election, candidate and minute/hour (turnout rollup).
+
+    Incremented in the same transaction as the votes it counts (see
+    `utils.record_turnout`) so turnout charts never scan the Vote table;
+    `flask turnout backfill` rebuilds it from existing votes.
+    """
+    __table_args__ = (
+        db.UniqueConstraint('election_id', 'granularity', 'bucket_start', 'candidate_id', name='uq_turnout_bucket'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    election_id = db.Column(db.Integer, db.ForeignKey('election.id', ondelete='CASCADE'), nullable=False)
+    candidate_id = db.Column(db.Integer, db.ForeignKey('candidate.id', ondelete='CASCADE'), nullable=False, index=True)
+    # 'minute' or 'hour'; bucket_start is truncated to that granularity (UTC)
+    granularity = db.Column(db.String(10), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    candidate = db.relationship('Candidate', backref=db.backref('turnout_buckets', lazy=True, cascade='all, delete-orphan'))
+
+    def __repr__(self):
+        return f"<TurnoutBucket election={self.election_id} {self.granularity} {self.bucket_start} +{self.count}>"
+
+class ElectionResult(db.Model):
+    """Final results of a closed election, frozen when it is sealed (see sealing.py).
+
+    Once sealed, the results and stats endpoints read this row instead of the
+    candidate, vote and token tables. `archive_path` is set when the raw Vote
+    and VoteToken rows were moved to a compressed file and deleted.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    election_id = db.Column(db.Integer, db.ForeignKey('election.id', ondelete='CASCADE'), unique=True, nullable=False)
+    sealed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Same list as utils.build_results, counted from the Vote table when sealing
+    results = db.Column(db.JSON, nullable=False)
+    votes_cast = db.Column(db.Integer, nullable=False, default=0)
+    total_candidates = db.Column(db.Integer, nullable=False, default=0)
+    total_tokens = db.Column(db.Integer, nullable=False, default=0)
+    total_voters = db.Column(db.Integer, nullable=False, default=0)
+    tokens_used = db.Column(db.Integer, nullable=False, default=0)
+    archive_path = db.Column(db.String(255), nullable=True)
+    archived_at = db.Column(db.DateTime, nullable=True)
+    election = db.relationship('Election', backref=db.backref('final_result', uselist=False, cascade='all, delete-orphan'))
+
+    def __repr__(self):
+        return f"<ElectionResult election={self.election_id} votes={self.votes_cast}>"
+
 class VoteToken(db.Model):
+    # A phone number is unique within an election (the same voter can take part
+    # in several elections). The constraint's index also serves every
+    # `election_id` filter; (election_id, sent) serves the send queries and
+    # (election_id, id) the keyset-paginated voter listing.
+    __table_args__ = (
+        db.UniqueConstraint('election_id', 'phone_number', name='uq_vote_token_election_phone'),
+        db.Index('ix_vote_token_election_sent', 'election_id', 'sent'),
+        db.Index('ix_vote_token_election_id', 'election_id', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     #email = db.Column(db.String(120), unique=True, nullable=False)
-    phone_number = db.Column(db.String(13), unique=True, nullable=False)
+    phone_number = db.Column(db.String(13), nullable=False)
+    # Optional address used by the email distribution channel
+    email = db.Column(db.String(120), nullable=True)
     # allow tokens to be removed if the election is deleted
     election_id = db.Column(db.Integer, db.ForeignKey('election.id', ondelete='CASCADE'), nullable=False)
     token = db.Column(db.String(36), unique=True, nullable=False)
+    # HMAC of `token` (see utils.obfuscate_token) used in public vote URLs.
+    # Stored so a vote link resolves with one indexed lookup; recompute with
+    # `flask tokens rehash` after rotating SECRET_KEY.
+    token_hash = db.Column(db.String(64), unique=True, index=True, nullable=True)
     is_active = db.Column(db.Boolean, default=True)
     sent = db.Column(db.Boolean, default=False)
+    # SMS delivery tracking: provider reference of the last SMS sent, when it
+    # was sent and its delivery state (pending / delivered / failed / unknown),
+    # updated in the background by the delivery reconciler (see
+    # dispatch.reconcile_deliveries).
+    sms_ref = db.Column(db.String(64), nullable=True)
+    sms_sent_at = db.Column(db.DateTime, nullable=True)
+    delivery_status = db.Column(db.String(20), nullable=True, index=True)
+    delivery_checked_at = db.Column(db.DateTime, nullable=True)
 
     def __init__(self, *args, **kwargs):
         """Gérer l'unicité"""
         super().__init__(*args, **kwargs)
         if not self.token:
-            self.token = self._generate_unique_uuid()
+            self.regenerate_token()
+        if not self.token_hash:
+            from utils import obfuscate_token
+            self.token_hash = obfuscate_token(self.token)
 
-    def _generate_unique_uuid(self):
-        """Génère un UUID unique, retry"""
-        while True:
-            candidate = str(uuid.uuid4())
-            if not VoteToken.query.filter_by(token=candidate).first():
-                return candidate
+    @staticmethod
+    def generate_token() -> str:
+        """Nouveau UUID4, sans vérification en base.
+
+        L'unicité est garantie par la contrainte UNIQUE sur `token` : en cas de
+        collision (improbable), l'insertion échoue et l'appelant régénère le jeton.
+        """
+        return str(uuid.uuid4())
+
+    def regenerate_token(self):
+        """Remplace `token` (et son `token_hash`) par une nouvelle valeur."""
+        from utils import obfuscate_token
+        self.token = self.generate_token()
+        self.token_hash = obfuscate_token(self.token)
 
     def __repr__(self):
         return f"<VoteToken {self.token}>"
 
 
+class ShortLink(db.Model):
+    """Compact public code redirecting to a vote URL (see public/shortlinks.py).
+
+    The target is rebuilt at redirect time from the election uid and the
+    token's current `token_hash`, so links survive a `flask tokens rehash`.
+    """
+    CODE_ALPHABET = string.ascii_letters + string.digits
+
+    id = db.Column(db.Integer, primary_key=True)
+    code = db.Column(db.String(16), unique=True, nullable=False)
+    election_id = db.Column(db.Integer, db.ForeignKey('election.id', ondelete='CASCADE'), nullable=False, index=True)
+    vote_token_id = db.Column(db.Integer, db.ForeignKey('vote_token.id', ondelete='CASCADE'), unique=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    vote_token = db.relationship('VoteToken', backref=db.backref('short_link', uselist=False, cascade='all, delete-orphan'))
+
+    @classmethod
+    def generate_code(cls, length: int = 7) -> str:
+        """Code aléatoire base62 ; l'unicité est garantie par la contrainte UNIQUE."""
+        return ''.join(secrets.choice(cls.CODE_ALPHABET) for _ in range(length))
+
+    def __repr__(self):
+        return f"<ShortLink {self.code}>"
+
+
+class OutboxMessage(db.Model):
+    """Durable record of one outbound voting message (see dispatch.py).
+
+    Rows are enqueued per send campaign, claimed by a worker (`sending`),
+    then marked `sent` (with the provider reference) or `failed`; delivery
+    receipts move them to `acknowledged`. A message is claimed by a single
+    worker and is never re-sent automatically once it left `queued`, so an
+    interrupted run can be resumed without double-sending: messages a crashed
+    worker left `sending` become `interrupted` and are only requeued explicitly.
+    """
+    STATES = ('queued', 'sending', 'sent', 'failed', 'interrupted', 'acknowledged')
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Send job id the message belongs to
+    campaign = db.Column(db.String(36), nullable=False, index=True)
+    election_id = db.Column(db.Integer, db.ForeignKey('election.id', ondelete='CASCADE'), nullable=False, index=True)
+    vote_token_id = db.Column(db.Integer, db.ForeignKey('vote_token.id', ondelete='CASCADE'), nullable=False, index=True)
+    channel = db.Column(db.String(10), nullable=False, default='sms')
+    recipient = db.Column(db.String(120), nullable=False)
+    state = db.Column(db.String(20), nullable=False, default='queued', index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    provider_ref = db.Column(db.String(64), nullable=True, index=True)
+    body = db.Column(db.Text, nullable=True)
+    last_error = db.Column(db.String(255), nullable=True)
+    claimed_by = db.Column(db.String(64), nullable=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    vote_token = db.relationship('VoteToken', backref=db.backref('outbox_messages', lazy=True, cascade='all, delete-orphan'))
+
+    __table_args__ = (db.UniqueConstraint('campaign', 'vote_token_id', 'channel', name='uq_outbox_campaign_token_channel'),)
+
+    def __repr__(self):
+        return f"<OutboxMessage {self.id} {self.channel} {self.state}>"
+
+
 class TokenBlocklist(db.Model):
     """Store revoked JWT `jti` values so tokens can be invalidated server-side.
 
     Simple blocklist model storing the token identifier (jti), token type
     (access or refresh), optional admin id for auditing, and revocation time.
+    `expires_at` is the token's own expiry: past it the row can be purged
+    (see `blocklist.purge_expired_blocklist`). Lookups on the request path go
+    through the in-process cache `blocklist.revoked_tokens`.
     """
     id = db.Column(db.Integer, primary_key=True)
     jti = db.Column(db.String(64), unique=True, nullable=False)
     token_type = db.Column(db.String(20), nullable=False)
     admin_id = db.Column(db.Integer, nullable=True)
-    revoked_at = db.Column(db.DateTime, default=datetime.utcnow)
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    expires_at = db.Column(db.DateTime, nullable=True, index=True)
 
     @classmethod
     def is_blocked(cls, jti: str) -> bool:
@@ -3,3 +3,4 @@ from flask import Blueprint
 public_bp = Blueprint('public', __name__)
 
 from . import vote  # noqa: F401
+from .shortlinks import shortlink_bp  # noqa: F401
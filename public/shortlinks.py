@@ -0,0 +1,58 @@
+import threading
+from collections import OrderedDict
+from flask import Blueprint, current_app, jsonify, redirect
+from models import db, Election, ShortLink, VoteToken
+from utils import build_vote_url
+
+# Registered by the application under `SHORTLINK_PREFIX` (default `/s`),
+# outside `/api/v1` so SMS links stay short.
+shortlink_bp = Blueprint('shortlinks', __name__)
+
+
+class LRUCache:
+    """Small thread-safe LRU mapping used for hot short-link redirects."""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+redirect_cache = LRUCache()
+
+
+@shortlink_bp.route('/<code>', methods=['GET'])
+def follow_short_link(code):
+    target = redirect_cache.get(code)
+    if target is None:
+        row = db.session.query(Election.uid, VoteToken.token_hash) \
+            .select_from(ShortLink) \
+            .join(VoteToken, VoteToken.id == ShortLink.vote_token_id) \
+            .join(Election, Election.id == ShortLink.election_id) \
+            .filter(ShortLink.code == code).first()
+        if not row or not row.token_hash:
+            return jsonify({'error': 'link not found'}), 404
+        target = build_vote_url(row.uid, row.token_hash)
+        redirect_cache.maxsize = int(current_app.config.get('SHORTLINK_CACHE_SIZE', 10000))
+        redirect_cache.set(code, target)
+    return redirect(target, code=302)
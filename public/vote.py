@@ -1,92 +1,98 @@
-from flask import jsonify, request, redirect
+from flask import jsonify, request, redirect, abort
 from datetime import datetime
 from . import public_bp
-from models import Election, Candidate, Vote, VoteToken
-from utils import extract_token_from_obfuscated
-from models import db
-from extensions import socketio
-from flask_socketio import join_room, leave_room
+from utils import get_vote_token_by_hash, cast_vote, build_results_from_metadata
+from extensions import socketio, results_broadcaster, results_seq
+from election_cache import election_cache, find_candidate
+from vote_batcher import vote_batcher, BallotOutcomeUnknown
+from flask_socketio import join_room, emit
 
 @socketio.on('join')
 def on_join(data):
-    room = data.get('election_uid')
-    if room:
-        join_room(room)
+    """Abonne le client à la salle de l'élection et lui envoie l'état courant.
+
+    Le snapshot (`results_snapshot`) porte le même `seq` que les `results_update`
+    suivants ; un client réémet `join` pour se resynchroniser quand il détecte
+    un trou. L'accusé de réception ne contient que `ok` et ce `seq`.
+    """
+    room = (data or {}).get('election_uid')
+    if not room:
+        return {'error': 'election_uid is required'}
+    election = election_cache.get(room)
+    if election is None:
+        return {'error': 'election not found'}
+    join_room(room)
+    results = build_results_from_metadata(election)
+    emit('results_snapshot', results_broadcaster.snapshot(room, results))
+    return {'ok': True, 'seq': results_seq(results)}
 
 @public_bp.route('/elections/<election_uid>/vote/<token_hash>', methods=['GET'])
 def vote_get(election_uid, token_hash):
     if not token_hash:
         return redirect('/')
-    # Récupérer l'élection et vérifier si elle est déjà terminée
-    election = Election.query.filter_by(uid=election_uid).first_or_404()
+    # Récupérer l'élection (cache, voir election_cache.py) et vérifier si elle est déjà terminée
+    election = election_cache.get(election_uid)
+    if election is None:
+        abort(404)
     now = datetime.utcnow()
-    real_token = extract_token_from_obfuscated(token_hash)
-    if not real_token:
-        return jsonify({'error': 'invalid or expired token'}), 40
+    vtoken = get_vote_token_by_hash(token_hash)
+    if not vtoken:
+        return jsonify({'error': 'invalid or expired token'}), 403
     
     # Autoriser seulement si (start_at absent ou now >= start_at) ET (end_at absent ou now <= end_at)
-    if (election.start_at and now < election.start_at) or (election.end_at and now > election.end_at):
-        if election.end_at and now > election.end_at:
-            return jsonify({'error': "L'élection est terminée", 'end': election.end_at}), 403
-        if election.start_at and now < election.start_at:
-            return jsonify({'error': "L'élection n'a pas encore commencé", 'start': election.start_at}), 403
+    if (election['start_at'] and now < election['start_at']) or (election['end_at'] and now > election['end_at']):
+        if election['end_at'] and now > election['end_at']:
+            return jsonify({'error': "L'élection est terminée", 'end': election['end_at']}), 403
+        if election['start_at'] and now < election['start_at']:
+            return jsonify({'error': "L'élection n'a pas encore commencé", 'start': election['start_at']}), 403
     
-    vtoken = VoteToken.query.filter_by(token=real_token, is_active=False).first()
-    if vtoken:
+    if not vtoken.is_active:
         return jsonify({'error': 'Vote déjà effectué'}), 403
 
-    candidates = [{'id': c.id, 'name': c.name, 'prenom': getattr(c, 'prenom', ''), 'photo': getattr(c, 'photo', '')} for c in election.candidates]
-    return jsonify({'election': {'id': election.id, 'title': election.title}, 'candidates': candidates})
+    candidates = [{'id': c['id'], 'name': c['name'], 'prenom': c['prenom'], 'photo': c['photo']} for c in election['candidates']]
+    return jsonify({'election': {'id': election['id'], 'title': election['title']}, 'candidates': candidates})
 
 
 @public_bp.route('/elections/<election_uid>/vote/<token_hash>', methods=['POST'])
 def vote_post(election_uid, token_hash):
     data = request.get_json() or {}
     # Vérifier période de l'élection
-    election = Election.query.filter_by(uid=election_uid).first_or_404()
+    election = election_cache.get(election_uid)
+    if election is None:
+        abort(404)
     now = datetime.utcnow()
-    
-    real_token = extract_token_from_obfuscated(token_hash)
-    if not real_token:
-        return jsonify({'error': 'invalid or expired token'}), 403
-    
+
     # Autoriser seulement si (start_at absent ou now >= start_at) ET (end_at absent ou now <= end_at)
-    if (election.start_at and now < election.start_at) or (election.end_at and now > election.end_at):
-        if election.end_at and now > election.end_at:
-            return jsonify({'error': "L'élection est terminée", 'end': election.end_at}), 403
-        if election.start_at and now < election.start_at:
-            return jsonify({'error': "L'élection n'a pas encore commencé", 'start': election.start_at}), 403
+    if (election['start_at'] and now < election['start_at']) or (election['end_at'] and now > election['end_at']):
+        if election['end_at'] and now > election['end_at']:
+            return jsonify({'error': "L'élection est terminée", 'end': election['end_at']}), 403
+        if election['start_at'] and now < election['start_at']:
+            return jsonify({'error': "L'élection n'a pas encore commencé", 'start': election['start_at']}), 403
 
     candidate_id = data.get('candidate_id')
     if not candidate_id:
         return jsonify({'error': 'candidate_id required'}), 400
-    candidate = Candidate.query.filter_by(id=candidate_id, election_id=election.id).first()
+    candidate = find_candidate(election, candidate_id)
     if not candidate:
         return jsonify({'error': 'candidate not found for this election'}), 404
-    
 
-    vtoken = VoteToken.query.filter_by(token=real_token, is_active=True).first()
-    if not vtoken:
+    # Consommer le jeton et enregistrer le vote en une transaction (voir utils.cast_vote),
+    # ou dans une transaction groupée avec d'autres votes (voir vote_batcher.py)
+    if vote_batcher.enabled:
+        try:
+            token_id = vote_batcher.submit(election['id'], token_hash, candidate['id'])
+        except BallotOutcomeUnknown:
+            # Le lot est peut-être commité : ne pas inviter à revoter, le jeton tranchera
+            return jsonify({'message': 'vote submitted, outcome unknown', 'outcome': 'unknown'}), 202
+        except Exception:
+            # Bulletin annulé avant écriture ou transaction en échec : rien n'est enregistré
+            return jsonify({'error': 'vote could not be confirmed, please retry'}), 503
+    else:
+        token_id = cast_vote(election['id'], token_hash, candidate['id'])
+    if token_id is None:
         return jsonify({'error': 'invalid or expired token'}), 403
 
-    if vtoken:
-        vote = Vote(election_id=election.id, candidate_id=candidate_id)
-        db.session.add(vote)
-        vtoken.is_active = False
-
-    db.session.commit()
-
-    # Emit real-time update
-    results = []
-    for c in election.candidates:
-        vote_count = Vote.query.filter_by(candidate_id=c.id).count()
-        results.append({
-            'candidate_uid': c.uid,
-            'name': c.name,
-            'prenom': getattr(c, 'prenom', ''),
-            'photo': getattr(c, 'photo', ''),
-            'vote_count': vote_count
-        })
-    socketio.emit('results_update', {'election_uid': election.uid, 'results': results}, to=election.uid)
+    # Emit real-time update (coalesced per election, see extensions.ResultsBroadcaster)
+    results_broadcaster.publish(election['uid'], build_results_from_metadata(election), changed=candidate['uid'])
 
     return jsonify({'message': 'vote recorded'}), 201
@@ -0,0 +1,212 @@
+"""Final results of closed elections and archiving of their raw rows.
+
+Once `end_at` (plus `RESULTS_SEAL_GRACE_SECONDS`, so ballots accepted just
+before the close are committed) has passed, nothing can change an election's
+results any more. `seal_election` counts the votes one last time from the Vote
+table, fixes the candidate counters if they drifted, and freezes the
+per-candidate counts and token stats into an `ElectionResult` row; the results
+and stats endpoints then read that row. Closed elections are sealed by
+`flask elections seal` (run from cron) or `POST .../seal`; reading results
+never seals, so a GET stays read-only and serves live counts until then.
+
+`archive_election` then optionally writes the election's Vote and VoteToken
+rows to a gzip-compressed NDJSON file in `RESULTS_ARCHIVE_FOLDER` and deletes
+them (with their short links and outbox messages) to keep the hot tables
+small. The file is written and synced before anything is deleted. Candidates,
+turnout buckets and the sealed results are kept.
+
+Changing the end date of a sealed election to a future date unseals it; an
+archived election can no longer be reopened.
+"""
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+from flask import current_app
+
+
+def seal_grace() -> timedelta:
+    return timedelta(seconds=float(current_app.config.get('RESULTS_SEAL_GRACE_SECONDS', 60)))
+
+
+def is_closed(election, now: datetime = None) -> bool:
+    """True once votes can no longer be recorded for `election`."""
+    now = now or datetime.utcnow()
+    return election.end_at is not None and election.end_at + seal_grace() <= now
+
+
+def seal_election(election):
+    """Freeze the final results of `election` (closed) and return its `ElectionResult`.
+
+    Already sealed elections are returned unchanged, including when another
+    request or worker seals it concurrently. Raises ValueError if the
+    election is still open.
+    """
+    from models import db, ElectionResult, Candidate, Vote, VoteToken
+    from sqlalchemy import func
+    from sqlalchemy.exc import IntegrityError
+
+    if election.final_result is not None:
+        return election.final_result
+    if not is_closed(election):
+        raise ValueError('election is not closed yet')
+
+    counts = dict(
+        db.session.query(Vote.candidate_id, func.count(Vote.id))
+        .filter(Vote.election_id == election.id).group_by(Vote.candidate_id).all()
+    )
+    candidates = Candidate.query.filter_by(election_id=election.id).order_by(Candidate.id).all()
+    results = []
+    for c in candidates:
+        # Final counts come from the Vote rows; repair the running counter if it drifted
+        if (c.vote_count or 0) != counts.get(c.id, 0):
+            c.vote_count = counts.get(c.id, 0)
+        results.append({
+            'candidate_uid': c.uid,
+            'name': c.name,
+            'prenom': c.prenom or '',
+            'photo': c.photo or '',
+            'vote_count': c.vote_count,
+        })
+    total_tokens, total_voters, tokens_used = db.session.query(
+        func.count(VoteToken.id),
+        func.count(func.distinct(VoteToken.phone_number)),
+        func.count(VoteToken.id).filter(VoteToken.is_active.is_(False)),
+    ).filter(VoteToken.election_id == election.id).one()
+
+    sealed = ElectionResult(
+        election_id=election.id,
+        results=results,
+        votes_cast=sum(r['vote_count'] for r in results),
+        total_candidates=len(results),
+        total_tokens=total_tokens,
+        total_voters=total_voters,
+        tokens_used=tokens_used,
+    )
+    db.session.add(sealed)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Sealed concurrently by another request or worker: keep its row
+        db.session.rollback()
+        db.session.refresh(election)
+        if election.final_result is None:
+            raise
+        return election.final_result
+    return sealed
+
+
+def seal_closed_elections() -> list:
+    """Seal every closed election that is not sealed yet; returns their uids."""
+    from models import Election, ElectionResult
+
+    deadline = datetime.utcnow() - seal_grace()
+    pending = Election.query.outerjoin(ElectionResult) \
+        .filter(Election.end_at <= deadline, ElectionResult.id.is_(None)) \
+        .order_by(Election.id).all()
+    sealed = []
+    for election in pending:
+        seal_election(election)
+        sealed.append(election.uid)
+    return sealed
+
+
+def unseal_election(election):
+    """Drop the sealed results (before reopening an election). Raises ValueError if archived."""
+    from models import db
+
+    if election.final_result is None:
+        return
+    if election.final_result.archived_at is not None:
+        raise ValueError('election is archived and cannot be reopened')
+    db.session.delete(election.final_result)
+    election.final_result = None
+
+
+def _archive_folder() -> str:
+    # No default: archives hold phone numbers and emails and must not land in the app directory
+    folder = current_app.config.get('RESULTS_ARCHIVE_FOLDER')
+    if not folder:
+        raise ValueError('RESULTS_ARCHIVE_FOLDER is not set')
+    return folder
+
+
+def archive_election(election, batch_size: int = 5000) -> dict:
+    """Move the Vote and VoteToken rows of `election` to a compressed file, then delete them.
+
+    Seals the election first if needed (ValueError if it is still open,
+    already archived, or if `RESULTS_ARCHIVE_FOLDER` is not set). Each line
+    of the file is a JSON object with a `type` (`election`, `vote` or
+    `token`); raw token values are not written, only their hashes. Returns `{'path', 'votes', 'tokens'}`.
+    """
+    from models import db, Vote, VoteToken, ShortLink, OutboxMessage
+
+    folder = _archive_folder()
+    sealed = seal_election(election)
+    if sealed.archived_at is not None:
+        raise ValueError('election is already archived')
+
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f'election-{election.uid}.ndjson.gz')
+    tmp_path = path + '.tmp'
+    votes = tokens = 0
+    with open(tmp_path, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as out:
+            header = {
+                'type': 'election', 'uid': election.uid, 'title': election.title,
+                'start_at': election.start_at.isoformat(), 'end_at': election.end_at.isoformat(),
+                'results': sealed.results,
+            }
+            out.write((json.dumps(header) + '\n').encode('utf-8'))
+            vote_rows = db.session.query(Vote.id, Vote.candidate_id, Vote.created_at) \
+                .filter(Vote.election_id == election.id).order_by(Vote.id).yield_per(batch_size)
+            for row in vote_rows:
+                out.write((json.dumps({
+                    'type': 'vote', 'id': row.id, 'candidate_id': row.candidate_id,
+                    'created_at': row.created_at.isoformat() if row.created_at else None,
+                }) + '\n').encode('utf-8'))
+                votes += 1
+            token_rows = db.session.query(
+                VoteToken.id, VoteToken.phone_number, VoteToken.email, VoteToken.token_hash,
+                VoteToken.is_active, VoteToken.sent, VoteToken.delivery_status,
+            ).filter(VoteToken.election_id == election.id).order_by(VoteToken.id).yield_per(batch_size)
+            for row in token_rows:
+                out.write((json.dumps({
+                    'type': 'token', 'id': row.id, 'phone': row.phone_number, 'email': row.email,
+                    'token_hash': row.token_hash, 'is_active': bool(row.is_active), 'sent': bool(row.sent),
+                    'delivery_status': row.delivery_status,
+                }) + '\n').encode('utf-8'))
+                tokens += 1
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, path)
+
+    token_ids = db.session.query(VoteToken.id).filter(VoteToken.election_id == election.id)
+    try:
+        db.session.query(OutboxMessage).filter(OutboxMessage.election_id == election.id).delete(synchronize_session=False)
+        db.session.query(ShortLink).filter(ShortLink.vote_token_id.in_(token_ids.scalar_subquery())) \
+            .delete(synchronize_session=False)
+        db.session.query(Vote).filter(Vote.election_id == election.id).delete(synchronize_session=False)
+        db.session.query(VoteToken).filter(VoteToken.election_id == election.id).delete(synchronize_session=False)
+        sealed.archive_path = path
+        sealed.archived_at = datetime.utcnow()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    db.session.expire_all()
+    return {'path': path, 'votes': votes, 'tokens': tokens}
+
+
+def sealed_payload(sealed) -> dict:
+    """Summary of a sealed election for the admin endpoints."""
+    return {
+        'sealed_at': sealed.sealed_at,
+        'votes_cast': sealed.votes_cast,
+        'total_candidates': sealed.total_candidates,
+        'total_tokens': sealed.total_tokens,
+        'total_voters': sealed.total_voters,
+        'tokens_used': sealed.tokens_used,
+        'participation_rate': float(sealed.votes_cast) / sealed.total_voters if sealed.total_voters else 0.0,
+        'archived_at': sealed.archived_at,
+    }
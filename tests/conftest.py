@@ -0,0 +1,68 @@
+"""Shared fixtures: the application bound to a throwaway file-backed SQLite database.
+
+The database URL must be set before `app` is imported (Config reads the
+environment at import time), and `app.app` is reused rather than calling
+`create_app()` again, which would rebind the Socket.IO server and lose the
+handlers registered by `public/vote.py`.
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_tmpdir = tempfile.mkdtemp(prefix='electionapp-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmpdir, 'test.db')
+os.environ.setdefault('SECRET_KEY', 'test-secret-key-of-at-least-32-bytes')
+os.environ.setdefault('RESULTS_ARCHIVE_FOLDER', os.path.join(_tmpdir, 'archives'))
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app as flask_app
+
+    flask_app.config['TESTING'] = True
+    return flask_app
+
+
+@pytest.fixture
+def db(app):
+    from models import db as _db
+    from election_cache import election_cache
+
+    with app.app_context():
+        _db.drop_all()
+        _db.create_all()
+        election_cache.clear()
+        yield _db
+        _db.session.remove()
+
+
+@pytest.fixture
+def make_election(db):
+    """Create an open (or, with `closed=True`, ended) election with candidates and tokens."""
+    from models import Election, Candidate, VoteToken
+
+    def _make(candidates=2, tokens=10, closed=False):
+        now = datetime.utcnow()
+        if closed:
+            start_at, end_at = now - timedelta(days=2), now - timedelta(days=1)
+        else:
+            start_at, end_at = now - timedelta(hours=1), now + timedelta(days=1)
+        election = Election(title='test', start_at=start_at, end_at=end_at)
+        db.session.add(election)
+        db.session.flush()
+        db.session.add_all([
+            Candidate(name=f'candidate {i}', prenom='', photo='', election_id=election.id) for i in range(candidates)
+        ])
+        db.session.add_all([
+            VoteToken(phone_number=f'2250700{i:06d}', election_id=election.id) for i in range(tokens)
+        ])
+        db.session.commit()
+        return election
+
+    return _make
@@ -0,0 +1,63 @@
+"""Smoke tests of the `flask ... bench` harnesses, on small sizes."""
+from models import Election, VoteToken
+
+
+def test_tokens_bench_reports_each_size_and_cleans_up(app, db):
+    result = app.test_cli_runner().invoke(args=['tokens', 'bench', '--sizes', '50,200', '--lookups', '20'])
+
+    assert result.exit_code == 0, result.output
+    lines = result.output.strip().splitlines()
+    assert lines[0].split() == ['tokens', 'lookups', 'p50', 'us', 'p99', 'us']
+    assert [line.split()[:2] for line in lines[1:]] == [['50', '20'], ['200', '20']]
+    assert Election.query.count() == 0
+    assert VoteToken.query.count() == 0
+
+
+def test_broadcast_load_test_counts_emits_saved():
+    from bench import broadcast_load_test
+
+    baseline, coalesced = broadcast_load_test(200, 50, [0, 200], candidates=3, duration=0.2)
+
+    assert baseline['published'] == coalesced['published'] == 200
+    assert baseline['emitted'] + baseline['emits_saved'] == 200
+    assert baseline['deliveries'] == baseline['emitted'] * 50
+    assert coalesced['emitted'] < 20
+    assert coalesced['emits_saved'] > 180
+    assert coalesced['bytes_sent'] < baseline['bytes_sent']
+
+
+def test_stats_bench_query_count_is_constant(app, db):
+    result = app.test_cli_runner().invoke(args=['stats', 'bench', '--elections', '5,40'])
+
+    assert result.exit_code == 0, result.output
+    rows = [line.split() for line in result.output.strip().splitlines()[1:]]
+    assert [row[0] for row in rows] == ['5', '40']
+    assert rows[0][1] == rows[1][1] == '1'
+    assert Election.query.count() == 0
+    assert VoteToken.query.count() == 0
+
+
+def test_tokens_bench_generate_saves_one_select_per_token(app, db):
+    from bench import benchmark_token_generation
+
+    legacy, current = benchmark_token_generation(app, count=30, chunk_size=10)
+
+    assert (legacy['path'], current['path']) == ('select_per_token', 'constraint')
+    assert legacy['queries'] - current['queries'] >= 30
+    assert Election.query.count() == 0
+    assert VoteToken.query.count() == 0
+
+
+def test_votes_bench_records_every_ballot_and_cleans_up(app, db):
+    from vote_batcher import vote_batcher
+
+    before = (vote_batcher.batch_size, vote_batcher.interval)
+    result = app.test_cli_runner().invoke(args=['votes', 'bench', '--batch-sizes', '0,5', '--ballots', '20',
+                                                '--concurrency', '4'])
+
+    assert result.exit_code == 0, result.output
+    rows = [line.split() for line in result.output.strip().splitlines()[1:]]
+    assert [(row[0], row[1]) for row in rows] == [('0', '20'), ('5', '20')]
+    assert (vote_batcher.batch_size, vote_batcher.interval) == before
+    assert Election.query.count() == 0
+    assert VoteToken.query.count() == 0
@@ -0,0 +1,42 @@
+"""Revoked-token cache: revocations from other processes are picked up by the sync."""
+from datetime import datetime, timedelta
+
+from blocklist import RevokedTokenCache
+from models import TokenBlocklist
+
+
+def _revoke_elsewhere(db, jti, revoked_at):
+    db.session.add(TokenBlocklist(jti=jti, token_type='access', revoked_at=revoked_at,
+                                  expires_at=datetime.utcnow() + timedelta(hours=1)))
+    db.session.commit()
+
+
+def test_sync_sees_rows_revoked_with_a_skewed_clock(app, db):
+    cache = RevokedTokenCache()
+    cache.sync_interval = 0
+    _revoke_elsewhere(db, 'first', datetime.utcnow())
+    assert cache.is_revoked('first')
+
+    # Written by a process whose clock is a minute behind
+    _revoke_elsewhere(db, 'late', datetime.utcnow() - timedelta(minutes=1))
+    assert cache.is_revoked('late')
+    assert not cache.is_revoked('unknown')
+
+
+def test_full_reload_catches_rows_committed_late(app, db):
+    cache = RevokedTokenCache()
+    cache.sync_interval = 0
+    cache.full_reload_interval = 3600
+    db.session.add(TokenBlocklist(id=100, jti='recent', token_type='access',
+                                  expires_at=datetime.utcnow() + timedelta(hours=1)))
+    db.session.commit()
+    assert cache.is_revoked('recent')
+
+    # A low id committed after the cache moved past it, beyond the sync overlap
+    db.session.add(TokenBlocklist(id=1, jti='late', token_type='access',
+                                  expires_at=datetime.utcnow() + timedelta(hours=1)))
+    db.session.commit()
+    assert not cache.is_revoked('late')
+
+    cache._next_full_reload = 0.0
+    assert cache.is_revoked('late')
@@ -0,0 +1,15 @@
+"""SMS segment counting (GSM 03.38 / UCS-2)."""
+from campaign import sms_segments
+
+
+def test_gsm7_basic_and_extended_characters():
+    assert sms_segments('a' * 160) == ('gsm7', 1)
+    assert sms_segments('a' * 161) == ('gsm7', 2)
+    # Extension characters take two septets
+    assert sms_segments('€' * 80) == ('gsm7', 1)
+    assert sms_segments('€' * 81) == ('gsm7', 2)
+
+
+def test_literal_escape_forces_ucs2():
+    assert sms_segments('vote\x1b') == ('ucs2', 1)
+    assert sms_segments('a' * 70 + '\x1b') == ('ucs2', 2)
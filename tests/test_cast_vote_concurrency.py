@@ -0,0 +1,101 @@
+"""The same vote token submitted concurrently must record exactly one vote."""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from models import Candidate, Vote, VoteToken
+from utils import cast_vote
+from vote_batcher import record_ballots, vote_batcher
+
+THREADS = 16
+
+
+def _race(app, fn):
+    """Run `fn()` from THREADS threads released at the same time; returns their results."""
+    barrier = threading.Barrier(THREADS)
+
+    def run(_):
+        barrier.wait()
+        with app.app_context():
+            try:
+                return fn()
+            finally:
+                from models import db
+                db.session.remove()
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        return list(pool.map(run, range(THREADS)))
+
+
+def _ids(election):
+    token = VoteToken.query.filter_by(election_id=election.id).order_by(VoteToken.id).first()
+    candidate = Candidate.query.filter_by(election_id=election.id).order_by(Candidate.id).first()
+    return election.id, token.token_hash, token.id, candidate.id
+
+
+def _assert_one_vote(db, election_id, candidate_id):
+    db.session.expire_all()
+    assert Vote.query.filter_by(election_id=election_id).count() == 1
+    assert db.session.get(Candidate, candidate_id).vote_count == 1
+
+
+def test_same_token_from_many_threads_records_one_vote(app, db, make_election):
+    election_id, token_hash, token_id, candidate_id = _ids(make_election())
+
+    results = _race(app, lambda: cast_vote(election_id, token_hash, candidate_id))
+
+    assert [r for r in results if r is not None] == [token_id]
+    _assert_one_vote(db, election_id, candidate_id)
+
+
+def test_token_of_another_election_is_rejected(app, db, make_election):
+    election_id, token_hash, _, _ = _ids(make_election())
+    other_id, _, _, other_candidate = _ids(make_election())
+
+    assert cast_vote(other_id, token_hash, other_candidate) is None
+    assert Vote.query.count() == 0
+
+
+def test_same_token_twice_in_one_batch(app, db, make_election):
+    election_id, token_hash, token_id, candidate_id = _ids(make_election())
+
+    results = record_ballots([(election_id, token_hash, candidate_id), (election_id, token_hash, candidate_id)])
+
+    assert results == [token_id, None]
+    _assert_one_vote(db, election_id, candidate_id)
+
+
+def test_same_token_across_two_batches(app, db, make_election):
+    election_id, token_hash, token_id, candidate_id = _ids(make_election())
+
+    assert record_ballots([(election_id, token_hash, candidate_id)]) == [token_id]
+    assert record_ballots([(election_id, token_hash, candidate_id)]) == [None]
+    _assert_one_vote(db, election_id, candidate_id)
+
+
+def test_same_token_from_many_threads_through_the_batcher(app, db, make_election):
+    election_id, token_hash, token_id, candidate_id = _ids(make_election())
+    previous = (vote_batcher.batch_size, vote_batcher.interval)
+    # Small batches so the concurrent submissions spread over several batches
+    vote_batcher.configure(batch_size=4, interval_ms=5)
+    try:
+        results = _race(app, lambda: vote_batcher.submit(election_id, token_hash, candidate_id))
+    finally:
+        vote_batcher.configure(batch_size=previous[0], interval_ms=previous[1] * 1000)
+
+    assert [r for r in results if r is not None] == [token_id]
+    _assert_one_vote(db, election_id, candidate_id)
+
+
+def test_sealed_election_refuses_ballots(app, db, make_election):
+    from sealing import seal_election
+
+    election = make_election(closed=True)
+    election_id, token_hash, _, candidate_id = _ids(election)
+    seal_election(election)
+
+    # The route checks end_at from the cache; the database refuses the ballot anyway
+    assert cast_vote(election_id, token_hash, candidate_id) is None
+    assert record_ballots([(election_id, token_hash, candidate_id)]) == [None]
+    db.session.expire_all()
+    assert Vote.query.filter_by(election_id=election_id).count() == 0
+    assert VoteToken.query.filter_by(token_hash=token_hash).one().is_active
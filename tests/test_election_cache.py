@@ -0,0 +1,60 @@
+"""Election metadata cache: invalidations must reach every process."""
+import time
+from datetime import timedelta
+
+import fakeredis
+
+from election_cache import ElectionCache
+from models import Election
+
+
+def _shared_caches(count):
+    server = fakeredis.FakeServer()
+    caches = []
+    for _ in range(count):
+        cache = ElectionCache()
+        cache.redis = fakeredis.FakeRedis(server=server)
+        caches.append(cache)
+    return caches
+
+
+def test_redis_invalidation_reaches_other_processes(app, db, make_election):
+    election = make_election()
+    reader, writer = _shared_caches(2)
+    end_at = reader.get(election.uid)['end_at']
+    assert reader.get(election.uid)['end_at'] == end_at
+    assert reader.hits == 1
+
+    election.end_at = end_at - timedelta(days=2)
+    db.session.commit()
+    writer.invalidate(election.uid)
+
+    assert reader.get(election.uid)['end_at'] == election.end_at
+    # The reloaded entry is shared through Redis: the writer does not hit the database
+    assert writer.get(election.uid)['end_at'] == election.end_at
+
+
+def test_memory_entries_expire_after_local_ttl(app, db, make_election):
+    election = make_election()
+    cache = ElectionCache()
+    cache.local_ttl = 0.05
+    cache.get(election.uid)
+
+    # Changed by another worker: this process is not told
+    db.session.query(Election).filter_by(id=election.id).update({Election.title: 'renamed'})
+    db.session.commit()
+    assert cache.get(election.uid)['title'] != 'renamed'
+
+    time.sleep(0.1)
+    assert cache.get(election.uid)['title'] == 'renamed'
+
+
+def test_local_ttl_is_capped_by_ttl(app):
+    saved = {key: app.config[key] for key in ('ELECTION_CACHE_TTL', 'ELECTION_CACHE_LOCAL_TTL')}
+    app.config.update(ELECTION_CACHE_TTL=2, ELECTION_CACHE_LOCAL_TTL=30)
+    try:
+        cache = ElectionCache()
+        cache.init_app(app)
+        assert cache.local_ttl == 2
+    finally:
+        app.config.update(saved)
@@ -0,0 +1,85 @@
+"""Streaming CSV import of voters."""
+import io
+
+from models import VoteToken
+from utils import import_voters_csv
+
+
+class _BrokenStream(io.StringIO):
+    """Text stream that fails to decode after `good` lines."""
+
+    def __init__(self, text, good):
+        super().__init__(text)
+        self._good = good
+
+    def __next__(self):
+        if self._good == 0:
+            raise UnicodeDecodeError('utf-8', b'\xff', 0, 1, 'invalid start byte')
+        self._good -= 1
+        return super().__next__()
+
+
+def _csv(count, start=0):
+    return 'phone\n' + ''.join(f'22507{i:08d}\n' for i in range(start, start + count))
+
+
+def test_import_creates_one_token_per_phone(app, db, make_election):
+    election = make_election(tokens=0)
+    report = import_voters_csv(io.StringIO(_csv(7)), election.id, chunk_size=3)
+    assert (report['created'], report['rows']) == (7, 7)
+    assert 'stopped_at' not in report
+
+
+def test_unreadable_file_reports_where_import_stopped(app, db, make_election):
+    election = make_election(tokens=0)
+    # header + 5 rows readable, then a decode error
+    report = import_voters_csv(_BrokenStream(_csv(10), good=6), election.id, chunk_size=2)
+    assert report['created'] == 5
+    assert report['stopped_at']['line'] == 7
+    assert VoteToken.query.filter_by(election_id=election.id).count() == 5
+
+    report = import_voters_csv(io.StringIO(_csv(10)), election.id, chunk_size=2)
+    assert (report['created'], report['skipped']) == (5, 5)
+
+
+def test_upload_returns_207_on_partial_import(app, db, make_election):
+    from admin.auth import create_access_token
+
+    election = make_election(tokens=0)
+    with app.test_request_context():
+        headers = {'Authorization': 'Bearer ' + create_access_token(1)}
+    # The upload is decoded in blocks: the first ones are imported before the bad byte is reached
+    body = _csv(2000).encode() + b'\xff\n'
+    response = app.test_client().post(
+        f'/api/v1/admin/elections/{election.uid}/tokens/create/csv',
+        data={'file': (io.BytesIO(body), 'voters.csv')}, headers=headers,
+    )
+    assert response.status_code == 207
+    report = response.get_json()
+    assert 0 < report['created'] < 2000
+    assert report['stopped_at']['line'] == report['rows'] + 2
+    assert VoteToken.query.filter_by(election_id=election.id).count() == report['created']
+
+
+def test_invalid_rows_are_reported_with_their_line(app, db, make_election):
+    election = make_election(tokens=0)
+    text = 'phone\n2250700000001\n07 00 00 00\n22507000000012345\n\n+2250700000002\n07x0000000\n'
+    report = import_voters_csv(io.StringIO(text), election.id)
+    assert report['created'] == 2
+    assert report['errors'] == [
+        {'line': 3, 'phone': '22507 00 00 00', 'error': 'invalid phone number'},
+        {'line': 4, 'phone': '22507000000012345', 'error': 'invalid phone number'},
+        {'line': 7, 'phone': '22507x0000000', 'error': 'invalid phone number'},
+    ]
+
+
+def test_persistent_token_collisions_are_errors_not_skips(app, db, make_election, monkeypatch):
+    taken = make_election(tokens=1)
+    election = make_election(tokens=0)
+    token = VoteToken.query.filter_by(election_id=taken.id).one().token
+    monkeypatch.setattr(VoteToken, 'generate_token', staticmethod(lambda: token))
+    report = import_voters_csv(io.StringIO(_csv(1)), election.id)
+    assert (report['created'], report['skipped']) == (0, 0)
+    assert report['errors'] == [
+        {'line': 2, 'phone': '2250700000000', 'error': 'token collision, import the file again'},
+    ]
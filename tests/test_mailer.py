@@ -0,0 +1,104 @@
+"""SMTP connection reuse: one connection per worker, reconnect after a drop."""
+import smtplib
+import threading
+
+import pytest
+
+import mailer
+from mailer import SMTPSession, SMTPSessionPool, build_message
+
+CONFIG = {'MAIL_HOST': 'smtp.test', 'MAIL_PORT': 587, 'MAIL_USER': 'user', 'MAIL_PASS': 'secret',
+          'MAIL_USE_TLS': True}
+
+
+class FakeSMTP:
+    """Stand-in for `smtplib.SMTP` recording connections, STARTTLS, logins and messages."""
+
+    instances = []
+    drop_next = 0
+    lock = threading.Lock()
+
+    def __init__(self, host, port, timeout=None):
+        self.starttls_calls = 0
+        self.logins = []
+        self.sent = []
+        self.closed = False
+        with FakeSMTP.lock:
+            FakeSMTP.instances.append(self)
+
+    def starttls(self):
+        self.starttls_calls += 1
+
+    def login(self, user, password):
+        self.logins.append(user)
+
+    def send_message(self, msg):
+        with FakeSMTP.lock:
+            if FakeSMTP.drop_next:
+                FakeSMTP.drop_next -= 1
+                self.closed = True
+                raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        if self.closed:
+            raise smtplib.SMTPServerDisconnected('please run connect() first')
+        self.sent.append(msg['To'])
+
+    def quit(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_smtp(monkeypatch):
+    FakeSMTP.instances = []
+    FakeSMTP.drop_next = 0
+    monkeypatch.setattr(mailer.smtplib, 'SMTP', FakeSMTP)
+    return FakeSMTP
+
+
+def _message(n):
+    return build_message('noreply@test', f'voter{n}@test', 'Vote', 'body')
+
+
+def test_pool_opens_one_connection_per_worker(fake_smtp):
+    pool = SMTPSessionPool(CONFIG)
+    workers, per_worker = 4, 25
+
+    def work(worker):
+        for n in range(per_worker):
+            assert pool.send(_message(worker * per_worker + n))['success']
+
+    threads = [threading.Thread(target=work, args=(w,)) for w in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(fake_smtp.instances) == workers
+    assert all(len(conn.sent) == per_worker for conn in fake_smtp.instances)
+    assert all(conn.starttls_calls == 1 and conn.logins == ['user'] for conn in fake_smtp.instances)
+    assert pool.metrics()['connections'] == workers
+    assert pool.metrics()['sent'] == workers * per_worker
+    pool.close()
+    assert all(conn.closed for conn in fake_smtp.instances)
+
+
+def test_session_reconnects_once_after_a_drop(fake_smtp):
+    session = SMTPSession.from_config(CONFIG)
+    session.send(_message(0))
+    fake_smtp.drop_next = 1
+    session.send(_message(1))
+    session.send(_message(2))
+
+    first, second = fake_smtp.instances
+    assert first.sent == ['voter0@test']
+    assert second.sent == ['voter1@test', 'voter2@test']
+    assert (second.starttls_calls, second.logins) == (1, ['user'])
+    assert session.connects == 2
+
+
+def test_failed_retry_is_reported_not_raised(fake_smtp):
+    pool = SMTPSessionPool(CONFIG)
+    fake_smtp.drop_next = 2
+    result = pool.send(_message(0))
+    assert result['success'] is False
+    assert pool.metrics()['failed'] == 1
+    assert len(fake_smtp.instances) == 2
@@ -0,0 +1,171 @@
+"""Migrations from the pre-migration schema (revision 0001) to head."""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from flask_migrate import upgrade
+import sqlalchemy as sa
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from conftest import ROOT
+
+MIGRATIONS = os.path.join(ROOT, 'migrations')
+
+
+@pytest.fixture
+def empty_db(app, db):
+    db.drop_all()
+    db.session.execute(text('DROP TABLE IF EXISTS alembic_version'))
+    db.session.commit()
+    yield db
+    db.session.rollback()
+    db.drop_all()
+    db.session.execute(text('DROP TABLE IF EXISTS alembic_version'))
+    db.session.commit()
+
+
+def _insert_token(db, election_id, phone, token):
+    db.session.execute(
+        text('INSERT INTO vote_token (phone_number, election_id, token, is_active, sent) VALUES (:p, :e, :t, 1, 0)'),
+        {'p': phone, 'e': election_id, 't': token},
+    )
+
+
+def _insert_elections(db, count):
+    now = datetime.utcnow()
+    for i in range(count):
+        db.session.execute(
+            text('INSERT INTO election (id, uid, title, start_at, end_at) VALUES (:id, :uid, :t, :s, :e)'),
+            {'id': i + 1, 'uid': f'uid-{i}', 't': 'e', 's': now, 'e': now + timedelta(days=1)},
+        )
+
+
+def test_upgrade_allows_same_phone_in_two_elections(app, empty_db):
+    db = empty_db
+    upgrade(directory=MIGRATIONS, revision='0001')
+    _insert_elections(db, 2)
+    _insert_token(db, 1, '2250700000001', 't1')
+    with pytest.raises(IntegrityError):
+        _insert_token(db, 2, '2250700000001', 't2')
+    db.session.rollback()
+
+    upgrade(directory=MIGRATIONS, revision='0009')
+    _insert_elections(db, 2)
+    _insert_token(db, 1, '2250700000001', 't1')
+    _insert_token(db, 2, '2250700000001', 't2')
+    with pytest.raises(IntegrityError):
+        _insert_token(db, 1, '2250700000001', 't3')
+    db.session.rollback()
+
+
+def test_head_matches_models(app, empty_db):
+    from alembic.autogenerate import compare_metadata
+    from alembic.migration import MigrationContext
+
+    upgrade(directory=MIGRATIONS)
+    with empty_db.engine.connect() as conn:
+        diff = compare_metadata(MigrationContext.configure(conn), empty_db.metadata)
+    assert diff == []
+
+
+def test_token_hash_is_added_and_backfilled_after_upgrade(app, empty_db):
+    from utils import get_vote_token_by_hash, obfuscate_token, rehash_vote_tokens
+
+    db = empty_db
+    upgrade(directory=MIGRATIONS, revision='0001')
+    _insert_elections(db, 1)
+    _insert_token(db, 1, '2250700000001', 'legacy-token')
+    db.session.commit()
+
+    upgrade(directory=MIGRATIONS)
+    assert db.session.execute(text('SELECT token_hash FROM vote_token')).scalar() is None
+    assert rehash_vote_tokens(only_missing=True) == 1
+    assert get_vote_token_by_hash(obfuscate_token('legacy-token')).token == 'legacy-token'
+
+
+def test_vote_count_is_initialised_from_votes(app, empty_db):
+    db = empty_db
+    upgrade(directory=MIGRATIONS, revision='0002')
+    _insert_elections(db, 1)
+    for candidate_id in (1, 2):
+        db.session.execute(
+            text("INSERT INTO candidate (id, uid, name, prenom, photo, election_id) VALUES (:id, :uid, 'c', '', '', 1)"),
+            {'id': candidate_id, 'uid': f'c-{candidate_id}'},
+        )
+    for candidate_id in (1, 1, 2):
+        db.session.execute(text('INSERT INTO vote (election_id, candidate_id) VALUES (1, :c)'), {'c': candidate_id})
+    db.session.commit()
+
+    upgrade(directory=MIGRATIONS, revision='0003')
+    counts = dict(db.session.execute(text('SELECT id, vote_count FROM candidate')).all())
+    assert counts == {1: 2, 2: 1}
+
+
+def _baseline_metadata():
+    """Tables as `db.create_all()` built them before migrations (no naming convention)."""
+    metadata = sa.MetaData()
+    sa.Table('admin', metadata,
+             sa.Column('id', sa.Integer, primary_key=True),
+             sa.Column('username', sa.String(80), unique=True, nullable=False),
+             sa.Column('password_hash', sa.String(128), nullable=False))
+    sa.Table('election', metadata,
+             sa.Column('id', sa.Integer, primary_key=True),
+             sa.Column('uid', sa.String(36), unique=True, nullable=False),
+             sa.Column('title', sa.String(140), nullable=False),
+             sa.Column('start_at', sa.DateTime, nullable=False),
+             sa.Column('end_at', sa.DateTime, nullable=False),
+             sa.Column('created_at', sa.DateTime))
+    sa.Table('candidate', metadata,
+             sa.Column('id', sa.Integer, primary_key=True),
+             sa.Column('uid', sa.String(36), unique=True, nullable=False),
+             sa.Column('name', sa.String(120), nullable=False),
+             sa.Column('prenom', sa.String(65), nullable=False),
+             sa.Column('photo', sa.String(255), nullable=False),
+             sa.Column('election_id', sa.Integer, sa.ForeignKey('election.id', ondelete='CASCADE'), nullable=False))
+    sa.Table('vote', metadata,
+             sa.Column('id', sa.Integer, primary_key=True),
+             sa.Column('election_id', sa.Integer, sa.ForeignKey('election.id', ondelete='CASCADE'), nullable=False),
+             sa.Column('candidate_id', sa.Integer, sa.ForeignKey('candidate.id', ondelete='CASCADE'), nullable=False),
+             sa.Column('created_at', sa.DateTime))
+    sa.Table('vote_token', metadata,
+             sa.Column('id', sa.Integer, primary_key=True),
+             sa.Column('phone_number', sa.String(13), unique=True, nullable=False),
+             sa.Column('election_id', sa.Integer, sa.ForeignKey('election.id', ondelete='CASCADE'), nullable=False),
+             sa.Column('token', sa.String(36), unique=True, nullable=False),
+             sa.Column('is_active', sa.Boolean),
+             sa.Column('sent', sa.Boolean))
+    sa.Table('token_blocklist', metadata,
+             sa.Column('id', sa.Integer, primary_key=True),
+             sa.Column('jti', sa.String(64), unique=True, nullable=False),
+             sa.Column('token_type', sa.String(20), nullable=False),
+             sa.Column('admin_id', sa.Integer),
+             sa.Column('revoked_at', sa.DateTime))
+    return metadata
+
+
+def _schema_diff(db, metadata):
+    from alembic.autogenerate import compare_metadata
+    from alembic.migration import MigrationContext
+
+    with db.engine.connect() as conn:
+        return compare_metadata(MigrationContext.configure(conn), metadata)
+
+
+def test_initial_revision_is_the_baseline_schema(app, empty_db):
+    upgrade(directory=MIGRATIONS, revision='0001')
+    assert _schema_diff(empty_db, _baseline_metadata()) == []
+
+
+def test_stamped_baseline_upgrades_to_the_current_models(app, empty_db):
+    from flask_migrate import stamp
+
+    db = empty_db
+    baseline = _baseline_metadata()
+    baseline.create_all(db.engine)
+    stamp(directory=MIGRATIONS, revision='0001')
+    upgrade(directory=MIGRATIONS)
+    try:
+        assert _schema_diff(db, db.metadata) == []
+    finally:
+        baseline.drop_all(db.engine)
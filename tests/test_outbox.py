@@ -0,0 +1,84 @@
+"""Outbox: interrupted messages are never re-sent implicitly; one send job per election at a time."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from dispatch import enqueue_campaign, recover_stale_messages, requeue_failed
+from models import OutboxMessage
+
+
+def _crash_while_sending(db, message):
+    message.state = 'sending'
+    message.claimed_by = 'dead-worker'
+    message.claimed_at = datetime.utcnow() - timedelta(days=1)
+    db.session.commit()
+
+
+def test_interrupted_tokens_are_skipped_by_new_campaigns(app, db, make_election):
+    election = make_election(tokens=3)
+    assert enqueue_campaign(election.id, 'first') == 3
+    message = OutboxMessage.query.filter_by(campaign='first').order_by(OutboxMessage.id).first()
+    _crash_while_sending(db, message)
+    OutboxMessage.query.filter(OutboxMessage.id != message.id).update({OutboxMessage.state: 'failed'})
+    db.session.commit()
+
+    assert recover_stale_messages(app) == 1
+    db.session.refresh(message)
+    assert message.state == 'interrupted'
+
+    # The token still has sent=False, but its SMS may have reached the provider
+    assert enqueue_campaign(election.id, 'second') == 2
+    assert OutboxMessage.query.filter_by(campaign='second', vote_token_id=message.vote_token_id).count() == 0
+
+
+def test_interrupted_messages_are_only_requeued_explicitly(app, db, make_election):
+    election = make_election(tokens=2)
+    enqueue_campaign(election.id, 'job')
+    first, second = OutboxMessage.query.order_by(OutboxMessage.id).all()
+    _crash_while_sending(db, first)
+    second.state = 'failed'
+    db.session.commit()
+    recover_stale_messages(app)
+
+    assert requeue_failed() == 1
+    db.session.expire_all()
+    assert (first.state, second.state) == ('interrupted', 'queued')
+
+    assert requeue_failed(interrupted=True) == 1
+    db.session.expire_all()
+    assert first.state == 'queued'
+
+
+def test_second_job_for_the_same_election_is_refused(app, db, make_election, monkeypatch):
+    from dispatch import JobAlreadyRunning, start_send_job
+
+    election = make_election(tokens=2)
+    monkeypatch.setitem(app.config, 'OUTBOX_INPROCESS_WORKER', False)
+    job = start_send_job(app, election, channel='sms')
+    with pytest.raises(JobAlreadyRunning) as exc:
+        start_send_job(app, election, resend_all=True, channel='sms')
+    assert exc.value.campaign == job.id
+
+    OutboxMessage.query.update({OutboxMessage.state: 'sent'})
+    db.session.commit()
+    assert start_send_job(app, election, resend_all=True, channel='sms').total == 2
+
+
+def test_finished_jobs_are_evicted(app, db, make_election, monkeypatch):
+    import dispatch
+
+    election = make_election(tokens=1)
+    monkeypatch.setitem(app.config, 'OUTBOX_INPROCESS_WORKER', False)
+    monkeypatch.setitem(app.config, 'SEND_JOB_HISTORY', 2)
+    monkeypatch.setattr(dispatch, '_jobs', {})
+    jobs = []
+    for _ in range(4):
+        job = dispatch.start_send_job(app, election, resend_all=True)
+        OutboxMessage.query.update({OutboxMessage.state: 'sent'})
+        db.session.commit()
+        job.finished_at = datetime.utcnow()
+        jobs.append(job)
+    running = dispatch.start_send_job(app, election, resend_all=True)
+
+    # The new job is kept with the last SEND_JOB_HISTORY finished ones
+    assert set(dispatch._jobs) == {jobs[2].id, jobs[3].id, running.id}
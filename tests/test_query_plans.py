@@ -0,0 +1,141 @@
+"""Query plans of the hot queries (SQLite EXPLAIN QUERY PLAN).
+
+Per-election lookups must be index searches, not table scans. Only plans the
+planner also picks without table statistics are asserted, so they hold at
+production size.
+"""
+from datetime import datetime
+
+from sqlalchemy import event, select, update
+
+from models import Candidate, TurnoutBucket, Vote, VoteToken
+
+
+def _explain(db, sql, params) -> str:
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, params).all()
+    return '\n'.join(row[-1] for row in rows)
+
+
+def _plan(db, stmt) -> str:
+    compiled = stmt.compile(dialect=db.engine.dialect)
+    return _explain(db, str(compiled), tuple(compiled.params[name] for name in compiled.positiontup))
+
+
+def _captured(db, run) -> list:
+    """`(sql, params)` of every statement executed by `run()`."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters[0] if executemany else parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        run()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+    return statements
+
+
+def test_voter_listing_uses_election_id_index(app, db, make_election):
+    from admin.stats import _voters_query
+
+    election = make_election(tokens=50)
+    with app.test_request_context('/?limit=10&after=5'):
+        stmt = _voters_query(election.id).where(VoteToken.id > 5).limit(11)
+    plan = _plan(db, stmt)
+    assert 'USING INDEX ix_vote_token_election_id' in plan or 'USING COVERING INDEX ix_vote_token_election_id' in plan
+    assert 'SCAN vote_token' not in plan
+
+
+def test_unsent_tokens_use_election_sent_index(app, db, make_election):
+    election = make_election(tokens=50)
+    stmt = select(VoteToken.id).where(VoteToken.election_id == election.id, VoteToken.sent.is_(False))
+    plan = _plan(db, stmt)
+    assert 'ix_vote_token_election_sent' in plan
+    assert 'SCAN vote_token' not in plan
+
+
+def test_token_lookup_and_consumption_use_token_hash_index(app, db, make_election):
+    election = make_election()
+    lookup = select(VoteToken).where(VoteToken.token_hash == 'x' * 64)
+    consume = update(VoteToken).where(
+        VoteToken.token_hash == 'x' * 64,
+        VoteToken.election_id == election.id,
+        VoteToken.is_active.is_(True),
+    ).values(is_active=False)
+    for stmt in (lookup, consume):
+        plan = _plan(db, stmt)
+        assert 'ix_vote_token_token_hash' in plan
+        assert 'SCAN vote_token' not in plan
+
+
+def test_phone_lookup_uses_per_election_unique_constraint(app, db, make_election):
+    election = make_election()
+    stmt = select(VoteToken.id).where(VoteToken.election_id == election.id, VoteToken.phone_number == '2250700000001')
+    plan = _plan(db, stmt)
+    assert 'sqlite_autoindex_vote_token' in plan or 'uq_vote_token_election_phone' in plan
+    assert 'SCAN vote_token' not in plan
+
+
+def test_vote_time_window_uses_election_created_index(app, db, make_election):
+    election = make_election()
+    stmt = select(Vote.id).where(Vote.election_id == election.id, Vote.created_at >= datetime(2026, 1, 1).isoformat())
+    plan = _plan(db, stmt)
+    assert 'ix_vote_election_created' in plan
+    assert 'SCAN vote' not in plan
+
+
+def test_stats_aggregate_reads_each_table_once(app, db, make_election):
+    from admin.auth import create_access_token
+
+    for _ in range(3):
+        make_election(tokens=20)
+    with app.test_request_context():
+        headers = {'Authorization': 'Bearer ' + create_access_token(1)}
+    client = app.test_client()
+    client.get('/api/v1/admin/stats', headers=headers)  # warm-up: blocklist sync
+    statements = _captured(db, lambda: client.get('/api/v1/admin/stats', headers=headers))
+    assert len(statements) == 1
+    plan = _explain(db, *statements[0])
+    # Aggregating every open election reads all its token and candidate rows:
+    # one pass over each table, grouped in index order, never once per election
+    assert plan.count('SCAN vote_token') == 1
+    assert plan.count('SCAN candidate') == 1
+    assert 'CORRELATED' not in plan
+    assert 'TEMP B-TREE FOR GROUP BY' not in plan
+    assert 'SCAN election_result' not in plan
+
+
+def test_vote_counter_update_is_a_primary_key_search(app, db, make_election):
+    from utils import increment_vote_count
+
+    election = make_election()
+    candidate_id = Candidate.query.filter_by(election_id=election.id).first().id
+    statements = _captured(db, lambda: increment_vote_count(candidate_id))
+    db.session.rollback()
+    assert len(statements) == 1
+    assert 'SEARCH candidate USING INTEGER PRIMARY KEY' in _explain(db, *statements[0])
+
+
+def test_turnout_upsert_targets_the_bucket_unique_key(app, db, make_election):
+    from utils import record_turnout
+
+    election = make_election()
+    candidate_id = Candidate.query.filter_by(election_id=election.id).first().id
+    now = datetime.utcnow()
+    # SQLite rejects an ON CONFLICT target that matches no unique index
+    for _ in range(2):
+        record_turnout(election.id, {(candidate_id, now): 1})
+    db.session.commit()
+    assert sorted(b.count for b in TurnoutBucket.query.filter_by(election_id=election.id)) == [2, 2]
+
+    # The UPDATE-then-INSERT path of other backends finds the bucket by the same key
+    table = TurnoutBucket.__table__
+    stmt = table.update().where(
+        table.c.election_id == election.id, table.c.granularity == 'hour',
+        table.c.bucket_start == now, table.c.candidate_id == candidate_id,
+    ).values(count=table.c.count + 1)
+    plan = _plan(db, stmt)
+    assert 'SEARCH turnout_bucket USING INDEX' in plan
+    assert 'election_id=? AND granularity=? AND bucket_start=? AND candidate_id=?' in plan
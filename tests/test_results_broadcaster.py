@@ -0,0 +1,107 @@
+"""Real-time results payloads (Socket.IO emits captured by a fake server)."""
+from extensions import ResultsBroadcaster, candidates_version
+
+
+class FakeSocketIO:
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, event, payload, to=None):
+        self.emitted.append((event, payload, to))
+
+
+def _results(*counts, uids=None):
+    uids = uids or [f'c{i}' for i in range(len(counts))]
+    return [{'candidate_uid': uid, 'name': uid, 'prenom': '', 'photo': '', 'vote_count': n}
+            for uid, n in zip(uids, counts)]
+
+
+def _broadcaster(protocol='compact', delta=False):
+    broadcaster = ResultsBroadcaster(FakeSocketIO(), interval=0, delta=delta)
+    broadcaster.protocol = protocol
+    return broadcaster
+
+
+def test_first_compact_delta_only_sends_the_voted_candidate():
+    broadcaster = _broadcaster()
+    broadcaster.publish('e1', _results(5, 3, 9), changed='c1')
+    broadcaster.publish('e1', _results(6, 3, 9), changed='c0')
+
+    deltas = [payload['d'] for _, payload, _ in broadcaster.socketio.emitted]
+    assert deltas == [[[1, 3]], [[0, 6]]]
+
+
+def test_compact_payloads_carry_the_candidate_set_version():
+    broadcaster = _broadcaster()
+    results = _results(1, 2)
+    snapshot = broadcaster.snapshot('e1', results)
+    broadcaster.publish('e1', _results(2, 2), changed='c0')
+    delta = broadcaster.socketio.emitted[-1][1]
+    assert delta['v'] == snapshot['version'] == candidates_version(results)
+
+    # A candidate added after the snapshot changes the indexes: clients must rejoin
+    broadcaster.publish('e1', _results(2, 2, 1, uids=['c0', 'c1', 'c2']), changed='c2')
+    assert broadcaster.socketio.emitted[-1][1]['v'] != snapshot['version']
+
+
+def test_full_delta_for_several_elections_in_one_flush():
+    broadcaster = _broadcaster(protocol='full', delta=True)
+    broadcaster.interval = 1
+    broadcaster._flusher_running = True  # no background task: flushed by hand
+    for counts in ((1, 0), (1, 1)):
+        broadcaster.publish('e1', _results(*counts), changed='c0')
+        broadcaster.publish('e2', _results(*counts), changed='c0')
+        broadcaster.flush()
+
+    partial = [payload for _, payload, _ in broadcaster.socketio.emitted if payload.get('partial')]
+    assert [(p['election_uid'], [r['candidate_uid'] for r in p['results']]) for p in partial] == \
+        [('e1', ['c1']), ('e2', ['c1'])]
+
+
+def test_stale_states_are_not_emitted():
+    broadcaster = _broadcaster(protocol='full')
+    broadcaster.publish('e1', _results(3, 2))
+    broadcaster.publish('e1', _results(2, 2))
+    broadcaster.publish('e1', _results(3, 2))
+    assert [payload['seq'] for _, payload, _ in broadcaster.socketio.emitted] == [5]
+
+
+def test_concurrent_publishers_emit_increasing_seq():
+    import random
+    import threading
+
+    broadcaster = _broadcaster()
+    states = [_results(n, 0) for n in range(1, 201)]
+    random.shuffle(states)
+    barrier = threading.Barrier(8)
+
+    def run(chunk):
+        barrier.wait()
+        for results in chunk:
+            broadcaster.publish('e1', results, changed='c0')
+
+    threads = [threading.Thread(target=run, args=(states[i::8],)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    seqs = [payload['s'] for _, payload, _ in broadcaster.socketio.emitted]
+    assert seqs == sorted(set(seqs))
+    assert seqs[-1] == 200
+
+
+def test_join_sends_one_snapshot_and_a_small_ack(app, db, make_election):
+    from extensions import socketio
+
+    election = make_election(candidates=2, tokens=0)
+    client = socketio.test_client(app)
+    assert client.emit('join', {'election_uid': 'unknown'}, callback=True) == {'error': 'election not found'}
+    assert client.get_received() == []
+
+    ack = client.emit('join', {'election_uid': election.uid}, callback=True)
+    assert ack == {'ok': True, 'seq': 0}
+    received = client.get_received()
+    assert [m['name'] for m in received] == ['results_snapshot']
+    assert received[0]['args'][0]['election_uid'] == election.uid
+    client.disconnect()
@@ -0,0 +1,58 @@
+"""Sealing and archiving of closed elections."""
+import os
+
+import pytest
+
+from sealing import archive_election
+
+
+def test_archive_requires_archive_folder(app, db, make_election, monkeypatch):
+    election = make_election(closed=True)
+    monkeypatch.setitem(app.config, 'RESULTS_ARCHIVE_FOLDER', '')
+    with pytest.raises(ValueError, match='RESULTS_ARCHIVE_FOLDER'):
+        archive_election(election)
+    assert election.final_result is None
+
+
+def test_archive_writes_to_archive_folder(app, db, make_election, tmp_path, monkeypatch):
+    election = make_election(closed=True, tokens=3)
+    monkeypatch.setitem(app.config, 'RESULTS_ARCHIVE_FOLDER', str(tmp_path))
+    report = archive_election(election)
+    assert os.path.dirname(report['path']) == str(tmp_path)
+    assert report['tokens'] == 3
+
+
+def test_concurrent_seal_returns_existing_result(app, db, make_election):
+    from models import ElectionResult
+    from sealing import seal_election
+
+    election = make_election(closed=True)
+    election_id = election.id
+    # Another worker seals first, after this session loaded the election
+    assert election.final_result is None
+    with db.engine.begin() as conn:
+        conn.execute(ElectionResult.__table__.insert(), {
+            'election_id': election_id, 'results': [], 'votes_cast': 7, 'sealed_at': election.end_at,
+        })
+
+    sealed = seal_election(election)
+    assert sealed.votes_cast == 7
+    assert ElectionResult.query.filter_by(election_id=election_id).count() == 1
+
+
+def test_reading_results_does_not_seal(app, db, make_election):
+    from admin.auth import create_access_token
+
+    election = make_election(closed=True)
+    with app.test_request_context():
+        headers = {'Authorization': 'Bearer ' + create_access_token(1)}
+    client = app.test_client()
+    response = client.get(f'/api/v1/admin/elections/{election.uid}/results', headers=headers)
+    assert response.status_code == 200
+    assert 'final' not in response.get_json()
+    db.session.expire_all()
+    assert election.final_result is None
+
+    assert client.post(f'/api/v1/admin/elections/{election.uid}/seal', headers=headers).status_code == 200
+    response = client.get(f'/api/v1/admin/elections/{election.uid}/results', headers=headers)
+    assert response.get_json()['final']['votes_cast'] == 0
@@ -0,0 +1,94 @@
+"""Send jobs and delivery receipts against a stub ACIM server, and one job per election at a time."""
+import threading
+import time
+from datetime import datetime, timedelta
+
+import dispatch
+from bench import FakeACIMServer
+from models import OutboxMessage, VoteToken
+
+
+def _headers(app):
+    from admin.auth import create_access_token
+
+    with app.test_request_context():
+        return {'Authorization': 'Bearer ' + create_access_token(1)}
+
+
+def _wait_for(client, headers, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f'/api/v1/admin/jobs/{job_id}', headers=headers).get_json()
+        if job['status'] in ('finished', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f'job {job_id} did not finish')
+
+
+def test_send_job_delivers_every_token_through_the_api(app, db, make_election, monkeypatch):
+    election = make_election(tokens=5)
+    client, headers = app.test_client(), _headers(app)
+    with FakeACIMServer() as server:
+        monkeypatch.setitem(app.config, 'SMS_API_BASE_URL', server.url)
+        monkeypatch.setitem(app.config, 'SMS_DISPATCH_RATE_PER_SEC', 0)
+        monkeypatch.setitem(app.config, 'SMS_DISPATCH_MODE', 'single')
+        response = client.post(f'/api/v1/admin/elections/{election.uid}/tokens/send', headers=headers)
+        assert response.status_code == 202
+        job = _wait_for(client, headers, response.get_json()['job_id'])
+
+    assert (job['status'], job['total'], job['sent'], job['failed']) == ('finished', 5, 5, 0)
+    assert sorted(body['Dest'] for path, body in server.payloads) == \
+        sorted(t.phone_number for t in VoteToken.query.filter_by(election_id=election.id))
+    db.session.expire_all()
+    tokens = VoteToken.query.filter_by(election_id=election.id).all()
+    assert all(t.sent and t.sms_ref and t.delivery_status == 'pending' for t in tokens)
+    assert {m.state for m in OutboxMessage.query.filter_by(election_id=election.id)} == {'sent'}
+
+
+def test_concurrent_starts_enqueue_a_single_campaign(app, db, make_election, monkeypatch):
+    election = make_election(tokens=3)
+    monkeypatch.setitem(app.config, 'OUTBOX_INPROCESS_WORKER', False)
+    check = dispatch.running_campaign
+
+    def slow_check(*args, **kwargs):
+        # widen the window between the check and the INSERT
+        running = check(*args, **kwargs)
+        time.sleep(0.2)
+        return running
+
+    monkeypatch.setattr(dispatch, 'running_campaign', slow_check)
+    client, headers = app.test_client(), _headers(app)
+    url = f'/api/v1/admin/elections/{election.uid}/tokens/send'
+    statuses = []
+
+    def start():
+        response = client.post(url, headers=headers)
+        statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=start) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(statuses) == [202, 409]
+    assert OutboxMessage.query.filter_by(election_id=election.id).count() == 3
+
+
+def test_reconciler_gives_up_on_old_pending_sms(app, db, make_election, monkeypatch):
+    election = make_election(tokens=2)
+    old, recent = VoteToken.query.filter_by(election_id=election.id).order_by(VoteToken.id).all()
+    for vtoken, age in ((old, timedelta(days=3)), (recent, timedelta(minutes=5))):
+        vtoken.sent, vtoken.sms_ref, vtoken.delivery_status = True, f'ref-{vtoken.id}', 'pending'
+        vtoken.sms_sent_at = datetime.utcnow() - age
+    db.session.commit()
+
+    with FakeACIMServer() as server:
+        monkeypatch.setitem(app.config, 'SMS_API_BASE_URL', server.url)
+        monkeypatch.setitem(app.config, 'DELIVERY_PENDING_MAX_AGE_SECONDS', 86400)
+        report = dispatch.reconcile_deliveries(app)
+
+    assert report == {'checked': 1, 'updated': 1, 'expired': 1}
+    assert [body['Ref'] for path, body in server.payloads] == [recent.sms_ref]
+    db.session.expire_all()
+    assert (old.delivery_status, recent.delivery_status) == ('unknown', 'delivered')
@@ -0,0 +1,39 @@
+"""Short links: code collisions are retried and only inserted links are counted."""
+import itertools
+
+from models import ShortLink, VoteToken
+from utils import ensure_short_links, generate_vote_url
+
+
+def _codes(monkeypatch, *first):
+    """Make ShortLink.generate_code return `first`, then unique codes."""
+    codes = itertools.chain(first, (f'code{i}' for i in itertools.count()))
+    monkeypatch.setattr(ShortLink, 'generate_code', classmethod(lambda cls, length=7: next(codes)))
+
+
+def _take_code(db, election, code):
+    other = VoteToken.query.filter_by(election_id=election.id).order_by(VoteToken.id.desc()).first()
+    db.session.add(ShortLink(code=code, election_id=election.id, vote_token_id=other.id))
+    db.session.commit()
+
+
+def test_ensure_short_links_counts_inserted_rows_and_retries_collisions(app, db, make_election, monkeypatch):
+    election = make_election(tokens=5)
+    _take_code(db, election, 'taken')
+    _codes(monkeypatch, 'taken', 'taken')
+
+    assert ensure_short_links(election.id) == 4
+    assert ShortLink.query.filter_by(election_id=election.id).count() == 5
+    assert ensure_short_links(election.id) == 0
+
+
+def test_generate_vote_url_retries_code_collisions(app, db, make_election, monkeypatch):
+    election = make_election(tokens=2)
+    _take_code(db, election, 'taken')
+    _codes(monkeypatch, 'taken')
+    vtoken = VoteToken.query.filter_by(election_id=election.id).order_by(VoteToken.id).first()
+
+    with app.test_request_context():
+        url = generate_vote_url(vtoken, election.uid)
+    assert url.endswith('code0')
+    assert ShortLink.query.filter_by(vote_token_id=vtoken.id).one().code == 'code0'
@@ -0,0 +1,39 @@
+"""Bulk SMS sends: per-recipient `Rep` statuses decide which messages were sent."""
+from types import SimpleNamespace
+
+import utils
+from dispatch import _send_chunk
+from utils import _map_bulk_reps
+
+
+def _tokens(count):
+    return [SimpleNamespace(id=i + 1, phone_number=f'22507000000{i}') for i in range(count)]
+
+
+def test_failed_reps_are_reported_with_their_statut():
+    vtokens = _tokens(3)
+    reps = [
+        {'Dest': '225070000000', 'Ref': 'r1', 'Statut': 'Envoyé'},
+        {'Dest': '225070000001', 'Ref': '', 'Statut': 'Échec - numéro invalide'},
+        {'Dest': '225070000002', 'Ref': 'r3', 'Statut': 0},
+    ]
+    refs, failures = _map_bulk_reps(vtokens, reps)
+    assert refs == {1: 'r1', 2: None, 3: 'r3'}
+    assert failures == {2: 'Échec - numéro invalide', 3: '0'}
+
+
+def test_reps_without_statut_are_not_failures():
+    refs, failures = _map_bulk_reps(_tokens(2), [{'Ref': 'a'}, {'Ref': 'b', 'Statut': 1}])
+    assert refs == {1: 'a', 2: 'b'}
+    assert failures == {}
+
+
+def test_send_chunk_marks_failed_recipients(app, monkeypatch):
+    vtokens = _tokens(2)
+    monkeypatch.setattr(utils, 'send_vote_sms_bulk', lambda *a, **kw: {
+        'success': True, 'refs': {1: 'r1', 2: None}, 'failures': {2: 'Crédit insuffisant'},
+    })
+    limiter = SimpleNamespace(acquire=lambda: None)
+    outcomes = _send_chunk(app, None, limiter, SimpleNamespace(election_uid='e'), vtokens)
+    assert outcomes[0]['success'] and outcomes[0]['ref'] == 'r1'
+    assert outcomes[1]['success'] is False and outcomes[1]['error'] == 'Crédit insuffisant'
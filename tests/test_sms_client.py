@@ -0,0 +1,36 @@
+"""ACIM SMS client: one keep-alive connection per worker, retries only before the request is sent."""
+import urllib3.util.connection
+
+from ACIMClient import ACIMSMSClient
+from bench import FakeACIMServer, benchmark_sms_client
+
+
+def test_shared_session_reuses_one_connection_per_worker():
+    reports = {r['mode']: r for r in benchmark_sms_client(sends=30, workers=3, pool_size=3)}
+    assert reports['session']['failed'] == reports['no session']['failed'] == 0
+    assert reports['session']['requests'] == reports['no session']['requests'] == 30
+    assert reports['no session']['connections'] == 30
+    assert reports['session']['connections'] <= 3
+
+
+def test_request_is_not_retried_once_sent():
+    with FakeACIMServer(drop_requests=True) as server:
+        client = ACIMSMSClient('u', 't', 'S', base_url=server.url, max_retries=2)
+        result = client.send_one_sms('2250700000000', 'hello')
+    assert result['success'] is False
+    # a retry here could send the SMS twice
+    assert server.requests == 1
+
+
+def test_connection_errors_are_retried(monkeypatch):
+    attempts = []
+
+    def refuse(*args, **kwargs):
+        attempts.append(args[0])
+        raise ConnectionRefusedError('refused')
+
+    monkeypatch.setattr(urllib3.util.connection, 'create_connection', refuse)
+    client = ACIMSMSClient('u', 't', 'S', base_url='http://127.0.0.1:9/api', max_retries=1)
+    result = client.send_one_sms('2250700000000', 'hello')
+    assert result['success'] is False
+    assert len(attempts) == 2
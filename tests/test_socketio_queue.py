@@ -0,0 +1,80 @@
+"""Several workers share Socket.IO rooms through the message queue.
+
+Each worker is a Flask app with its own Socket.IO server, as in separate
+processes, and the Redis queue they share is a fakeredis server. The
+Flask-SocketIO test client refuses message queues, so the subscriber on the
+second worker is registered directly with its client manager and the
+packets sent to it are captured.
+"""
+import json
+import time
+
+import fakeredis
+import pytest
+import redis
+from flask import Flask
+from flask_socketio import SocketIO
+
+from extensions import ResultsBroadcaster
+
+QUEUE_URL = 'redis://queue.test:6379/0'
+
+
+@pytest.fixture
+def shared_queue(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis.Redis, 'from_url', classmethod(lambda cls, url, **kw: fakeredis.FakeRedis(server=server)))
+    return server
+
+
+def _worker():
+    sio = SocketIO(Flask(__name__), message_queue=QUEUE_URL, channel='test-results', async_mode='threading')
+    return sio
+
+
+def _subscribe(sio, room):
+    """Connect a fake client to `sio` in `room`; returns the list its events are appended to."""
+    received = []
+
+    def send(eio_sid, pkt):
+        received.append(json.loads(pkt.data[1:]))
+
+    sio.server._send_eio_packet = send
+    sio.server.manager.initialize()  # starts the queue listener, normally done on first connect
+    sid = sio.server.manager.connect('eio-1', '/')
+    sio.server.manager.enter_room(sid, '/', room)
+    return received
+
+
+def _wait_for(received, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not received and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return received
+
+
+def test_results_update_reaches_client_of_another_worker(shared_queue):
+    sio_a, sio_b = _worker(), _worker()
+    received = _subscribe(sio_b, 'e1')
+    time.sleep(0.1)  # let the listener subscribe before publishing
+
+    broadcaster = ResultsBroadcaster(sio_a, interval=0)
+    results = [{'candidate_uid': 'c0', 'name': 'c0', 'prenom': '', 'photo': '', 'vote_count': 1}]
+    broadcaster.publish('e1', results, changed='c0')
+
+    assert _wait_for(received), 'results_update was not relayed to the other worker'
+    event, payload = received[0]
+    assert event == 'results_update'
+    assert (payload['election_uid'], payload['seq']) == ('e1', 1)
+
+
+def test_other_rooms_do_not_receive_the_update(shared_queue):
+    sio_a, sio_b = _worker(), _worker()
+    received = _subscribe(sio_b, 'e2')
+    time.sleep(0.1)
+
+    ResultsBroadcaster(sio_a, interval=0).publish(
+        'e1', [{'candidate_uid': 'c0', 'name': 'c0', 'prenom': '', 'photo': '', 'vote_count': 1}])
+
+    time.sleep(0.3)
+    assert received == []
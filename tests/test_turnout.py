@@ -0,0 +1,31 @@
+"""Turnout rollup: rows are upserted in a fixed order so concurrent writers cannot deadlock."""
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from models import TurnoutBucket
+from utils import record_turnout
+
+
+def test_turnout_rows_are_written_in_key_order(app, db, make_election):
+    election = make_election(candidates=3)
+    c0, c1, c2 = sorted(c.id for c in election.candidates)
+    now = datetime(2026, 10, 17, 12, 30)
+    increments = {(c2, now): 1, (c0, now + timedelta(hours=1)): 2, (c1, now): 1, (c0, now): 1}
+
+    written = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if 'turnout_bucket' in statement and statement.lstrip().upper().startswith('INSERT'):
+            written.append(context.compiled_parameters)
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        record_turnout(election.id, increments)
+        db.session.commit()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+
+    keys = [(p['candidate_id'], p['granularity'], p['bucket_start']) for batch in written for p in batch]
+    assert keys == sorted(keys)
+    assert db.session.query(TurnoutBucket).filter_by(candidate_id=c0, granularity='hour').count() == 2
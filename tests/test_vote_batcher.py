@@ -0,0 +1,105 @@
+"""Group commit: timeouts and failed batches never leave a ballot in an ambiguous state silently."""
+import threading
+
+import vote_batcher as vote_batcher_module
+from models import Vote, VoteToken
+from vote_batcher import VoteBatcher, BallotNotRecorded, BallotOutcomeUnknown
+
+
+def _batcher(app, batch_size, interval_ms=0, timeout=10.0):
+    batcher = VoteBatcher()
+    batcher.app = app
+    batcher.timeout = timeout
+    batcher.configure(batch_size=batch_size, interval_ms=interval_ms)
+    return batcher
+
+
+def _ballots(election):
+    candidate_id = election.candidates[0].id
+    return [(election.id, t.token_hash, candidate_id)
+            for t in VoteToken.query.filter_by(election_id=election.id).order_by(VoteToken.id)]
+
+
+def test_timeout_cancels_queued_ballot_and_reports_running_one_as_unknown(app, db, make_election, monkeypatch):
+    first, second = _ballots(make_election(tokens=2))[:2]
+    release = threading.Event()
+    real_record = vote_batcher_module.record_ballots
+
+    def slow_record(ballots):
+        release.wait(5)
+        return real_record(ballots)
+
+    monkeypatch.setattr(vote_batcher_module, 'record_ballots', slow_record)
+    batcher = _batcher(app, batch_size=1, timeout=0.2)
+    outcomes = {}
+
+    def submit(name, ballot):
+        try:
+            outcomes[name] = batcher.submit(*ballot)
+        except Exception as exc:
+            outcomes[name] = exc
+
+    running = threading.Thread(target=submit, args=('running', first))
+    running.start()
+    # Let the writer pick up the first ballot before queueing the second
+    threading.Event().wait(0.05)
+    submit('queued', second)
+    running.join()
+    release.set()
+
+    assert isinstance(outcomes['running'], BallotOutcomeUnknown)
+    assert isinstance(outcomes['queued'], BallotNotRecorded)
+    # The writer still commits the running ballot and skips the cancelled one
+    batcher.timeout = 5
+    batcher.submit(*first)
+    db.session.expire_all()
+    assert Vote.query.count() == 1
+    assert VoteToken.query.filter_by(token_hash=second[1]).one().is_active
+
+
+def test_failed_batch_is_retried_ballot_by_ballot(app, db, make_election, monkeypatch):
+    ballots = _ballots(make_election(tokens=3))
+    bad_token = ballots[1][1]
+    real_record = vote_batcher_module.record_ballots
+
+    def flaky_record(batch):
+        if any(token_hash == bad_token for _, token_hash, _ in batch):
+            raise RuntimeError('deadlock detected')
+        return real_record(batch)
+
+    monkeypatch.setattr(vote_batcher_module, 'record_ballots', flaky_record)
+    batcher = _batcher(app, batch_size=3, interval_ms=200)
+    results = {}
+
+    def submit(ballot):
+        try:
+            results[ballot[1]] = batcher.submit(*ballot)
+        except Exception as exc:
+            results[ballot[1]] = exc
+
+    threads = [threading.Thread(target=submit, args=(ballot,)) for ballot in ballots]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert isinstance(results.pop(bad_token), RuntimeError)
+    assert all(isinstance(token_id, int) for token_id in results.values())
+    db.session.expire_all()
+    assert Vote.query.count() == 2
+
+
+def test_vote_route_returns_202_when_outcome_is_unknown(app, db, make_election, monkeypatch):
+    from vote_batcher import vote_batcher
+
+    election = make_election()
+    _, token_hash, candidate_id = _ballots(election)[0]
+
+    def unknown(*args):
+        raise BallotOutcomeUnknown()
+
+    monkeypatch.setattr(vote_batcher, 'enabled', True)
+    monkeypatch.setattr(vote_batcher, 'submit', unknown)
+    response = app.test_client().post(f'/api/v1/elections/{election.uid}/vote/{token_hash}', json={'candidate_id': candidate_id})
+    assert response.status_code == 202
+    assert response.get_json()['outcome'] == 'unknown'
@@ -0,0 +1,52 @@
+"""Admin listings: full voter list by default, keyset pages on request, paging headers readable cross-origin."""
+import pytest
+
+
+@pytest.fixture
+def admin_headers(app):
+    from admin.auth import create_access_token
+
+    with app.app_context():
+        return {'Authorization': 'Bearer ' + create_access_token(1), 'Origin': 'https://admin.example.org'}
+
+
+def test_without_limit_every_voter_is_returned(app, db, make_election, admin_headers, monkeypatch):
+    election = make_election(tokens=12)
+    monkeypatch.setitem(app.config, 'VOTER_PAGE_SIZE', 5)
+
+    response = app.test_client().get(f'/api/v1/admin/elections/{election.uid}/votants', headers=admin_headers)
+
+    assert response.status_code == 200
+    assert len(response.get_json()) == 12
+    assert 'X-Next-Cursor' not in response.headers
+
+
+def test_pages_follow_the_exposed_cursor(app, db, make_election, admin_headers):
+    election = make_election(tokens=12)
+    client = app.test_client()
+    url = f'/api/v1/admin/elections/{election.uid}/votants'
+
+    phones = []
+    response = client.get(url + '?limit=5', headers=admin_headers)
+    while True:
+        assert response.status_code == 200
+        phones += [v['phone'] for v in response.get_json()]
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            break
+        assert 'X-Next-Cursor' in response.headers['Access-Control-Expose-Headers']
+        response = client.get(url + f'?limit=5&after={cursor}', headers=admin_headers)
+
+    assert len(phones) == len(set(phones)) == 12
+
+
+def test_stats_total_count_is_exposed(app, db, make_election, admin_headers):
+    make_election()
+    make_election()
+
+    response = app.test_client().get('/api/v1/admin/stats?page=1&per_page=1', headers=admin_headers)
+
+    assert response.status_code == 200
+    assert len(response.get_json()) == 1
+    assert response.headers['X-Total-Count'] == '2'
+    assert 'X-Total-Count' in response.headers['Access-Control-Expose-Headers']
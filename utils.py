@@ -1,16 +1,24 @@
+import csv
 import hmac
 import hashlib
-import smtplib
+import threading
+import time
+from datetime import datetime
 import requests
-from email.message import EmailMessage
 from ACIMClient import ACIMSMSClient
+from campaign import CampaignRenderer, DEFAULT_SMS_TEMPLATE, DEFAULT_EMAIL_TEMPLATE, DEFAULT_EMAIL_SUBJECT
+from mailer import SMTPSession, build_message
 from flask import current_app
 
 def shorten(url):
-  base_url = 'http://tinyurl.com/api-create.php?url='
-  response = requests.get(base_url+url)
-  short_url = response.text
-  return short_url
+  """Raccourcit `url` via TinyURL ; retourne l'URL d'origine en cas d'échec."""
+  base_url = 'http://tinyurl.com/api-create.php'
+  try:
+    response = requests.get(base_url, params={'url': url}, timeout=5)
+    response.raise_for_status()
+    return response.text.strip() or url
+  except requests.exceptions.RequestException:
+    return url
 
 def obfuscate_token(token: str) -> str:
     """Hash sécurisé du token UUID avec HMAC-SHA256.
@@ -22,84 +30,615 @@ def obfuscate_token(token: str) -> str:
     return hmac.new(secret.encode(), token_str.encode(), hashlib.sha256).hexdigest()
 
 
-def extract_token_from_obfuscated(hashed_token: str):
-    """Retourne le UUID brut correspondant au `hashed_token` ou None.
+def get_vote_token_by_hash(hashed_token: str):
+    """Retourne le `VoteToken` dont le `token_hash` stocké vaut `hashed_token`, ou None.
 
+    Une seule requête sur la colonne indexée `VoteToken.token_hash`.
     Importe `VoteToken` localement pour éviter import circulaire entre `models` et `utils`.
     """
     from models import VoteToken
 
-    for vote_token in VoteToken.query.all():
-        if obfuscate_token(vote_token.token) == hashed_token:
-            return str(vote_token.token)
-    return None
+    if not hashed_token:
+        return None
+    return VoteToken.query.filter_by(token_hash=hashed_token).first()
 
-def generate_vote_url(vote_token, election_uid) -> str:
+
+def rehash_vote_tokens(only_missing: bool = False, batch_size: int = 1000) -> int:
+    """Recalcule `VoteToken.token_hash` avec la `SECRET_KEY` courante.
+
+    Sert de backfill pour les lignes existantes (`only_missing=True`) et après une
+    rotation de `SECRET_KEY` (les liens déjà envoyés deviennent alors invalides).
+    Retourne le nombre de lignes mises à jour.
+    """
+    from models import db, VoteToken
+
+    query = VoteToken.query.order_by(VoteToken.id)
+    if only_missing:
+        query = query.filter(VoteToken.token_hash.is_(None))
+
+    updated = 0
+    last_id = 0
+    while True:
+        batch = query.filter(VoteToken.id > last_id).limit(batch_size).all()
+        if not batch:
+            break
+        for vote_token in batch:
+            vote_token.token_hash = obfuscate_token(vote_token.token)
+        db.session.commit()
+        updated += len(batch)
+        last_id = batch[-1].id
+    return updated
+
+def increment_vote_count(candidate_id: int) -> None:
+    """Incrémente le compteur `Candidate.vote_count` dans la transaction courante.
+
+    L'UPDATE est fait côté base (`vote_count = vote_count + 1`) pour rester correct
+    avec des votes concurrents ; l'appelant commit avec l'insertion du `Vote`.
+    """
+    from models import db, Candidate
+
+    db.session.query(Candidate).filter(Candidate.id == candidate_id).update(
+        {Candidate.vote_count: Candidate.vote_count + 1}, synchronize_session=False
+    )
+
+
+TURNOUT_GRANULARITIES = ('minute', 'hour')
+
+
+def turnout_bucket(when: datetime, granularity: str) -> datetime:
+    """Début du créneau `granularity` ('minute' ou 'hour') contenant `when`."""
+    if granularity == 'hour':
+        return when.replace(minute=0, second=0, microsecond=0)
+    return when.replace(second=0, microsecond=0)
+
+
+def record_turnout(election_id: int, increments: dict) -> None:
+    """Ajoute des votes aux créneaux de participation dans la transaction courante.
+
+    `increments` associe `(candidate_id, created_at)` à un nombre de votes ; chaque
+    vote compte dans son créneau minute et dans son créneau heure. UPSERT
+    (`ON CONFLICT ... DO UPDATE SET count = count + excluded.count`) sur PostgreSQL
+    et SQLite, UPDATE puis INSERT sinon ; l'appelant commit avec les votes.
+
+    Les lignes sont écrites triées par (candidat, granularité, créneau) : deux
+    transactions concurrentes verrouillent alors les créneaux dans le même
+    ordre et ne peuvent pas s'interbloquer (PostgreSQL).
+    """
+    from models import db, TurnoutBucket
+
+    totals = {}
+    for (candidate_id, created_at), n in increments.items():
+        for granularity in TURNOUT_GRANULARITIES:
+            key = (candidate_id, granularity, turnout_bucket(created_at, granularity))
+            totals[key] = totals.get(key, 0) + n
+    if not totals:
+        return
+    rows = [
+        {'election_id': election_id, 'candidate_id': candidate_id, 'granularity': granularity,
+         'bucket_start': bucket_start, 'count': n}
+        for (candidate_id, granularity, bucket_start), n in sorted(totals.items())
+    ]
+    table = TurnoutBucket.__table__
+    dialect = db.engine.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['election_id', 'granularity', 'bucket_start', 'candidate_id'],
+            set_={'count': table.c.count + stmt.excluded['count']},
+        )
+        db.session.execute(stmt, rows)
+        return
+    for row in rows:
+        updated = db.session.execute(
+            table.update().where(
+                table.c.election_id == row['election_id'], table.c.granularity == row['granularity'],
+                table.c.bucket_start == row['bucket_start'], table.c.candidate_id == row['candidate_id'],
+            ).values(count=table.c.count + row['count'])
+        ).rowcount
+        if not updated:
+            db.session.execute(table.insert(), [row])
+
+
+def backfill_turnout(election_id: int = None, batch_size: int = 5000) -> int:
+    """Reconstruit les créneaux de participation depuis la table `Vote`.
+
+    Les créneaux existants des élections concernées sont supprimés puis recalculés
+    en une passe sur les votes lus par lots (seule opération qui parcourt `Vote`).
+    À lancer hors période de vote : un vote enregistré pendant la passe peut être
+    compté deux fois. Les élections archivées (votes supprimés, voir sealing.py)
+    gardent leurs créneaux. Retourne le nombre de votes pris en compte.
+    """
+    from models import db, Vote, TurnoutBucket, ElectionResult
+
+    archived = db.session.query(ElectionResult.election_id).filter(ElectionResult.archived_at.isnot(None))
+    buckets = db.session.query(TurnoutBucket).filter(TurnoutBucket.election_id.notin_(archived.scalar_subquery()))
+    votes = db.session.query(Vote.election_id, Vote.candidate_id, Vote.created_at) \
+        .filter(Vote.created_at.isnot(None))
+    if election_id is not None:
+        buckets = buckets.filter(TurnoutBucket.election_id == election_id)
+        votes = votes.filter(Vote.election_id == election_id)
+    buckets.delete(synchronize_session=False)
+
+    by_election = {}
+    total = 0
+    for row in votes.yield_per(batch_size):
+        increments = by_election.setdefault(row.election_id, {})
+        key = (row.candidate_id, turnout_bucket(row.created_at, 'minute'))
+        increments[key] = increments.get(key, 0) + 1
+        total += 1
+    for eid, increments in by_election.items():
+        record_turnout(eid, increments)
+    db.session.commit()
+    return total
+
+
+def unsealed_token_election():
+    """Condition SQL : l'élection du `VoteToken` n'a pas encore de résultats scellés.
+
+    Ajoutée aux UPDATE qui consomment les jetons, elle refuse en base les
+    bulletins arrivés après le scellement (`sealing.seal_election`), même si
+    la route a accepté le vote d'après une fin d'élection périmée en cache.
+    """
+    from models import ElectionResult, VoteToken
+    from sqlalchemy import exists
+
+    return ~exists().where(ElectionResult.election_id == VoteToken.election_id)
+
+
+def cast_vote(election_id: int, token_hash: str, candidate_id: int):
+    """Enregistre un vote de façon atomique ; retourne l'id du `VoteToken` consommé, ou None.
+
+    Le jeton est désactivé par un seul UPDATE conditionnel
+    (`... SET is_active = false WHERE token_hash = ? AND is_active RETURNING id`) :
+    sur deux requêtes concurrentes avec le même jeton, une seule obtient la ligne.
+    Le même UPDATE ne touche aucune ligne si l'élection est déjà scellée
+    (`unsealed_token_election`). L'insertion du `Vote`, l'incrément du compteur et des créneaux de participation
+    (`record_turnout`) suivent dans la même transaction, commitée ici. None si le jeton est inconnu, d'une autre élection
+    ou déjà utilisé, ou si l'élection est scellée (rien n'est écrit).
+    """
+    from models import db, Vote, VoteToken
+    from sqlalchemy import update
+
+    stmt = update(VoteToken).where(
+        VoteToken.token_hash == token_hash,
+        VoteToken.election_id == election_id,
+        VoteToken.is_active.is_(True),
+        unsealed_token_election(),
+    ).values(is_active=False)
+    if db.engine.dialect.name in ('postgresql', 'sqlite'):
+        token_id = db.session.execute(stmt.returning(VoteToken.id)).scalar()
+    else:
+        # Sans RETURNING : le nombre de lignes modifiées suffit à arbitrer la course
+        if db.session.execute(stmt).rowcount != 1:
+            token_id = None
+        else:
+            token_id = db.session.query(VoteToken.id).filter_by(token_hash=token_hash).scalar()
+    if token_id is None:
+        db.session.rollback()
+        return None
+    now = datetime.utcnow()
+    db.session.add(Vote(election_id=election_id, candidate_id=candidate_id, created_at=now))
+    increment_vote_count(candidate_id)
+    record_turnout(election_id, {(candidate_id, now): 1})
+    db.session.commit()
+    return token_id
+
+
+def build_results(election) -> list:
+    """Construit la liste des résultats d'une élection à partir des compteurs."""
+    results = []
+    for c in election.candidates:
+        results.append({
+            'candidate_uid': c.uid,
+            'name': c.name,
+            'prenom': getattr(c, 'prenom', ''),
+            'photo': getattr(c, 'photo', ''),
+            'vote_count': c.vote_count or 0
+        })
+    return results
+
+
+def build_results_from_metadata(meta: dict) -> list:
+    """Comme `build_results`, à partir des métadonnées en cache (`election_cache`).
+
+    Seuls les compteurs sont lus en base, en une requête.
+    """
+    from models import db, Candidate
+
+    counts = dict(db.session.query(Candidate.id, Candidate.vote_count).filter(Candidate.election_id == meta['id']))
+    return [
+        {
+            'candidate_uid': c['uid'],
+            'name': c['name'],
+            'prenom': c['prenom'],
+            'photo': c['photo'],
+            'vote_count': counts.get(c['id']) or 0,
+        }
+        for c in meta['candidates']
+    ]
+
+
+def reconcile_vote_counts(fix: bool = False) -> list:
+    """Compare `Candidate.vote_count` au nombre réel de lignes `Vote`.
+
+    Retourne la liste des écarts (`candidate_uid`, `stored`, `actual`) ; si `fix`
+    est vrai, les compteurs sont corrigés. Les élections archivées (votes
+    supprimés, voir sealing.py) sont ignorées.
+    """
+    from models import db, Candidate, Vote, ElectionResult
+    from sqlalchemy import func
+
+    actual_counts = dict(
+        db.session.query(Vote.candidate_id, func.count(Vote.id)).group_by(Vote.candidate_id).all()
+    )
+    archived = db.session.query(ElectionResult.election_id).filter(ElectionResult.archived_at.isnot(None))
+    drift = []
+    for candidate in Candidate.query.filter(Candidate.election_id.notin_(archived.scalar_subquery())) \
+            .order_by(Candidate.id).all():
+        actual = actual_counts.get(candidate.id, 0)
+        stored = candidate.vote_count or 0
+        if stored != actual:
+            drift.append({'candidate_uid': candidate.uid, 'election_id': candidate.election_id, 'stored': stored, 'actual': actual})
+            if fix:
+                candidate.vote_count = actual
+    if fix and drift:
+        db.session.commit()
+    return drift
+
+
+def normalize_phone(raw) -> str:
+    """Normalise un numéro au format international ivoirien sans `+` (ex: 2250554760285).
+
+    Retourne une chaîne vide si aucun numéro n'est fourni.
+    """
+    phone = (raw or '').strip()
+    if not phone:
+        return ''
+    if phone.startswith('+225'):
+        phone = phone[1:]
+    elif not phone.startswith('225'):
+        phone = '225' + phone
+    return phone
+
+
+PHONE_MAX_LENGTH = 13
+
+
+def is_valid_phone(phone: str) -> bool:
+    """Vrai si le numéro normalisé ne contient que des chiffres (13 au plus)."""
+    return phone.isascii() and phone.isdigit() and len(phone) <= PHONE_MAX_LENGTH
+
+
+def _insert_ignore_conflicts(table):
+    """INSERT ... ON CONFLICT DO NOTHING pour PostgreSQL et SQLite (INSERT simple sinon)."""
+    from models import db
+
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy import insert
+        return insert(table)
+    return insert(table).on_conflict_do_nothing()
+
+
+# Nombre maximal de tentatives d'insertion d'un lot en cas de collision de jeton
+TOKEN_INSERT_RETRIES = 3
+
+
+def _with_new_token(row: dict) -> dict:
+    """Affecte un nouveau jeton (et son hash) à une ligne `vote_token` à insérer."""
+    from models import VoteToken
+
+    token = VoteToken.generate_token()
+    row['token'] = token
+    row['token_hash'] = obfuscate_token(token)
+    return row
+
+
+def import_voters_csv(stream, election_id: int, chunk_size: int = 5000) -> dict:
+    """Importe un CSV de votants en flux, par lots de `chunk_size` lignes.
+
+    Les numéros sont normalisés et dédoublonnés en mémoire, les numéros déjà présents
+    pour l'élection sont chargés en une requête, et les nouveaux jetons sont écrits
+    par INSERT groupé ignorant les conflits (numéro ajouté entre-temps pour l'élection).
+    Retourne `created`, `skipped`, `errors` (par ligne : numéro manquant ou invalide,
+    doublon dans le fichier, collision de jeton persistante), `rows` et `rows_per_sec`.
+
+    Chaque lot est commité : si le fichier devient illisible en cours de route
+    (encodage, CSV mal formé), les lots précédents restent importés et le
+    rapport porte `stopped_at` (`line`, `error`). Réimporter le fichier corrigé
+    ignore les numéros déjà créés.
+    """
+    from models import db, VoteToken
+
+    started = time.perf_counter()
+    existing = {
+        phone for (phone,) in db.session.query(VoteToken.phone_number).filter(VoteToken.election_id == election_id)
+    }
+    seen = set()
+    created = 0
+    skipped = 0
+    errors = []
+    rows = 0
+    insert_stmt = _insert_ignore_conflicts(VoteToken.__table__)
+    returning = db.engine.dialect.name in ('postgresql', 'sqlite')
+    if returning:
+        insert_stmt = insert_stmt.returning(VoteToken.__table__.c.phone_number)
+
+    def flush(batch, lines):
+        nonlocal created, skipped
+        for _ in range(TOKEN_INSERT_RETRIES):
+            if not batch:
+                return
+            result = db.session.execute(insert_stmt, batch)
+            if not returning:
+                created += len(batch)
+                db.session.commit()
+                return
+            inserted = {phone for (phone,) in result.all()}
+            db.session.commit()
+            created += len(inserted)
+            missed = [row for row in batch if row['phone_number'] not in inserted]
+            if not missed:
+                return
+            # Lignes ignorées : numéro ajouté entre-temps à l'élection (import
+            # concurrent) ou, très rarement, collision de jeton. Seules ces
+            # dernières sont réessayées.
+            taken = {
+                phone for (phone,) in db.session.query(VoteToken.phone_number).filter(
+                    VoteToken.election_id == election_id,
+                    VoteToken.phone_number.in_([row['phone_number'] for row in missed]),
+                )
+            }
+            skipped += len(taken)
+            batch = [_with_new_token(row) for row in missed if row['phone_number'] not in taken]
+        for row in batch:
+            errors.append({'line': lines[row['phone_number']], 'phone': row['phone_number'],
+                           'error': 'token collision, import the file again'})
+
+    batch = []
+    # numéro -> ligne du fichier, pour les erreurs du lot en cours
+    lines = {}
+    stopped_at = None
+    reader = csv.DictReader(stream)
+    line_no = 0
+    try:
+        # Lecture explicite de l'en-tête (ligne 1), pour qu'une erreur de décodage
+        # à cet endroit soit rapportée à la bonne ligne
+        if reader.fieldnames is None:
+            errors.append({'line': 1, 'error': 'empty file'})
+        line_no = reader.line_num
+        for row in reader:
+            # ligne physique du fichier (les lignes vides sont sautées par le lecteur)
+            line_no = reader.line_num
+            rows += 1
+            phone = normalize_phone(row.get('phone') or row.get('phone_number') or row.get('telephone') or row.get('numero'))
+            if not phone:
+                errors.append({'line': line_no, 'error': 'missing phone number'})
+                continue
+            if not is_valid_phone(phone):
+                errors.append({'line': line_no, 'phone': phone, 'error': 'invalid phone number'})
+                continue
+            if phone in seen:
+                errors.append({'line': line_no, 'phone': phone, 'error': 'duplicate phone in file'})
+                continue
+            seen.add(phone)
+            if phone in existing:
+                skipped += 1
+                continue
+            lines[phone] = line_no
+            batch.append(_with_new_token({
+                'phone_number': phone,
+                'email': (row.get('email') or row.get('mail') or '').strip() or None,
+                'election_id': election_id,
+                'is_active': True,
+                'sent': False,
+            }))
+            if len(batch) >= chunk_size:
+                flush(batch, lines)
+                batch = []
+                lines = {}
+    except (UnicodeDecodeError, csv.Error) as exc:
+        # Les lignes lues jusqu'ici sont valides : on les écrit avant de s'arrêter
+        stopped_at = {'line': line_no + 1, 'error': str(exc)}
+    flush(batch, lines)
+    if created and current_app.config.get('URL_SHORTENER', 'local') == 'local':
+        ensure_short_links(election_id)
+
+    elapsed = time.perf_counter() - started
+    report = {
+        'created': created,
+        'skipped': skipped,
+        'errors': errors,
+        'rows': rows,
+        'elapsed': round(elapsed, 3),
+        'rows_per_sec': round(rows / elapsed, 1) if elapsed > 0 else None,
+    }
+    if stopped_at is not None:
+        report['stopped_at'] = stopped_at
+    return report
+
+
+def build_vote_url(election_uid: str, token_hash: str) -> str:
+    """URL complète de la page de vote sur le frontend."""
     frontend = current_app.config.get('FRONTEND_URL', '').rstrip('/')
-    obf = obfuscate_token(vote_token.token)
-    vote_url = f"{frontend}/elections/{election_uid}/vote/{obf}"
-    short_url = shorten(vote_url)
-    return short_url
+    return f"{frontend}/elections/{election_uid}/vote/{token_hash}"
+
+
+def build_short_url(code: str) -> str:
+    """URL publique d'un lien court local (route `public.shortlinks`)."""
+    base = current_app.config.get('SHORTLINK_BASE_URL', '').rstrip('/')
+    prefix = current_app.config.get('SHORTLINK_PREFIX', '/s').rstrip('/')
+    return f"{base}{prefix}/{code}"
+
+
+def ensure_short_links(election_id: int, batch_size: int = 5000) -> int:
+    """Crée en masse les liens courts manquants des jetons d'une élection.
+
+    Les lignes ignorées par l'INSERT (jeton lié entre-temps par un autre
+    processus, ou collision de code) ne sont pas comptées ; les jetons encore
+    sans lien sont recherchés à nouveau et reçoivent de nouveaux codes, jusqu'à
+    `TOKEN_INSERT_RETRIES` passes (au-delà, `generate_vote_url` crée le lien à
+    l'envoi). Retourne le nombre de liens réellement créés.
+    """
+    from models import db, ShortLink, VoteToken
+
+    length = int(current_app.config.get('SHORTLINK_CODE_LENGTH', 7))
+    insert_stmt = _insert_ignore_conflicts(ShortLink.__table__)
+    returning = db.engine.dialect.name in ('postgresql', 'sqlite')
+    if returning:
+        insert_stmt = insert_stmt.returning(ShortLink.__table__.c.vote_token_id)
+    created = 0
+    for _ in range(TOKEN_INSERT_RETRIES):
+        missing = [
+            token_id for (token_id,) in db.session.query(VoteToken.id)
+            .outerjoin(ShortLink, ShortLink.vote_token_id == VoteToken.id)
+            .filter(VoteToken.election_id == election_id, ShortLink.id.is_(None))
+        ]
+        if not missing:
+            break
+        for start in range(0, len(missing), batch_size):
+            rows = [
+                {'code': ShortLink.generate_code(length), 'election_id': election_id, 'vote_token_id': token_id}
+                for token_id in missing[start:start + batch_size]
+            ]
+            result = db.session.execute(insert_stmt, rows)
+            created += len(result.all()) if returning else result.rowcount
+            db.session.commit()
+    return created
+
+
+def _create_short_link(vote_token):
+    """Crée le lien court d'un jeton, en réessayant sur collision de code.
+
+    Si un autre processus a créé le lien du jeton entre-temps, c'est ce lien
+    qui est retourné.
+    """
+    from models import db, ShortLink
+    from sqlalchemy.exc import IntegrityError
+
+    length = int(current_app.config.get('SHORTLINK_CODE_LENGTH', 7))
+    token_id, election_id = vote_token.id, vote_token.election_id
+    for attempt in range(TOKEN_INSERT_RETRIES):
+        link = ShortLink(code=ShortLink.generate_code(length), election_id=election_id, vote_token_id=token_id)
+        db.session.add(link)
+        try:
+            db.session.commit()
+            return link
+        except IntegrityError:
+            db.session.rollback()
+            existing = ShortLink.query.filter_by(vote_token_id=token_id).first()
+            if existing is not None:
+                return existing
+            if attempt == TOKEN_INSERT_RETRIES - 1:
+                raise
+
+
+def generate_vote_url(vote_token, election_uid) -> str:
+    """URL envoyée au votant, selon `URL_SHORTENER` (`local`, `tinyurl` ou `none`)."""
+    obf = vote_token.token_hash or obfuscate_token(vote_token.token)
+    shortener = current_app.config.get('URL_SHORTENER', 'local')
+    if shortener == 'local':
+        link = vote_token.short_link
+        if link is None:
+            link = _create_short_link(vote_token)
+        return build_short_url(link.code)
+    vote_url = build_vote_url(election_uid, obf)
+    if shortener == 'tinyurl':
+        return shorten(vote_url)
+    return vote_url
 
 def generate_vote_message(vote_token, election_uid, body=None) -> str:
     if not body:
         vote_url = generate_vote_url(vote_token, election_uid)
-        sms_message = f"Bonjour,\nVeuillez voter pour l'election du BDE en suivant ce lien : {vote_url} \nCordialement."
-        return sms_message
+        template = current_app.config.get('SMS_TEMPLATE') or DEFAULT_SMS_TEMPLATE
+        return template.format(url=vote_url)
     return body
 
-def send_vote_email(to_email: str, vote_url: str, subject: str = None, body: str = None) -> dict:
+def send_vote_email(to_email: str, vote_url: str, subject: str = None, body: str = None, session=None) -> dict:
     """Send an email containing the voting URL using SMTP settings from current_app.
 
+    Pass an open `mailer.SMTPSession` as `session` to reuse its connection.
     Returns a dict with `success` (bool) and `error` (str) on failure.
     """
 
     host = current_app.config.get('MAIL_HOST')
-    port = int(current_app.config.get('MAIL_PORT', 587))
-    user = current_app.config.get('MAIL_USER')
-    password = current_app.config.get('MAIL_PASS')
-    use_tls = current_app.config.get('MAIL_USE_TLS', True)
-    mail_from = current_app.config.get('MAIL_FROM', user)
+    mail_from = current_app.config.get('MAIL_FROM', current_app.config.get('MAIL_USER'))
 
-    if not host:
+    if not host and session is None:
         return {'success': False, 'error': 'MAIL_HOST not configured'}
-    
-
-    subject = subject or 'Votre lien de vote'
-    body = body or f'Bonjour,\n\nVeuillez voter en suivant ce lien : {vote_url}\n\nCordialement.'
 
-    msg = EmailMessage()
-    msg['Subject'] = subject
-    msg['From'] = mail_from
-    msg['To'] = to_email
-    msg.set_content(body)
+    subject = subject or current_app.config.get('EMAIL_SUBJECT') or DEFAULT_EMAIL_SUBJECT
+    body = body or (current_app.config.get('EMAIL_TEMPLATE') or DEFAULT_EMAIL_TEMPLATE).format(url=vote_url)
+    msg = build_message(mail_from, to_email, subject, body)
 
+    own_session = session is None
+    if own_session:
+        session = SMTPSession.from_config(current_app.config)
     try:
-        with smtplib.SMTP(host, port, timeout=10) as server:
-            if use_tls:
-                server.starttls()
-            if user:
-                server.login(user, password)
-            server.send_message(msg)
+        session.send(msg)
         return {'success': True}
     except Exception as e:
         return {'success': False, 'error': str(e)}
+    finally:
+        if own_session:
+            session.close()
     
-def _create_sms_client():
-    username = current_app.config.get('SMS_API_USERNAME')
-    token = current_app.config.get('SMS_API_TOKEN')
-    sender = current_app.config.get('SMS_API_SENDER')
-    return ACIMSMSClient(username=username, token=token, sender=sender)
+_sms_client = None
+_sms_client_key = None
+_sms_client_lock = threading.Lock()
+
 
+def _create_sms_client():
+    """Retourne le client SMS partagé par le processus (session HTTP keep-alive poolée).
 
-def send_vote_one_sms(vtoken, election_uid: str, flash: int = 0, titre: str = "") -> dict:
+    Le client est recréé uniquement si la configuration SMS change.
+    """
+    global _sms_client, _sms_client_key
+    config = current_app.config
+    key = (
+        config.get('SMS_API_USERNAME'),
+        config.get('SMS_API_TOKEN'),
+        config.get('SMS_API_SENDER'),
+        config.get('SMS_API_BASE_URL'),
+        int(config.get('SMS_API_POOL_SIZE', 10)),
+        int(config.get('SMS_API_MAX_RETRIES', 2)),
+        float(config.get('SMS_API_CONNECT_TIMEOUT', 5)),
+        float(config.get('SMS_API_READ_TIMEOUT', 30)),
+        int(config.get('SMS_API_HISTORY_SIZE', 100)),
+    )
+    with _sms_client_lock:
+        if _sms_client is None or _sms_client_key != key:
+            username, token, sender, base_url, pool_size, max_retries, connect_timeout, read_timeout, history_size = key
+            _sms_client = ACIMSMSClient(
+                username=username, token=token, sender=sender, base_url=base_url,
+                pool_size=pool_size, max_retries=max_retries,
+                timeout=(connect_timeout, read_timeout), history_size=history_size,
+            )
+            _sms_client_key = key
+        return _sms_client
+
+
+def send_vote_one_sms(vtoken, election_uid: str, flash: int = 0, titre: str = "", renderer=None) -> dict:
     """Send an SMS containing the voting URL using external SMS API.
 
+    `renderer` (a `campaign.CampaignRenderer`) avoids rebuilding the message
+    settings for every recipient of a campaign.
     Returns a dict with `success` (bool) and `error` (str) on failure.
     """
 
     smsclient = _create_sms_client()
-    message = generate_vote_message(vote_token=vtoken, election_uid=election_uid)
+    if renderer is not None:
+        message = renderer.render(vtoken)
+    else:
+        message = generate_vote_message(vote_token=vtoken, election_uid=election_uid)
     result = smsclient.send_one_sms(dest=vtoken.phone_number, message=message, flash=flash, titre=titre)
 
     if result.get('success'):
@@ -107,53 +646,92 @@ def send_vote_one_sms(vtoken, election_uid: str, flash: int = 0, titre: str = ""
     else:
         return {'success': False, 'error': result.get('error', result.get('status', 'unknown error'))}
 
-def get_accuse_sms(ref: str, dest: str) -> bool:
-    """Vérifie l'accusé de réception pour un SMS envoyé via l'API ACIM.
+# Statuts ACIM `Statutdelivred` -> état de livraison stocké sur `VoteToken.delivery_status`
+DELIVERY_STATUS_MAP = {
+    'delivered': 'delivered',
+    'pending': 'pending',
+    'expired': 'failed',
+    'undelivered': 'failed',
+    'failed': 'failed',
+}
 
-    Utilise l'API `getAccuses` et retourne True uniquement si l'appel réussit et que le
-    SMS est considéré comme délivré par ACIM.
+
+def get_delivery_status(ref: str, dest: str, smsclient=None):
+    """Retourne l'état de livraison normalisé d'un SMS (`delivered`, `pending`, `failed`).
+
+    Retourne None si l'accusé n'est pas (encore) disponible.
     """
     if not ref or not dest:
-        return False
-
-    smsclient = _create_sms_client()
+        return None
+    smsclient = smsclient or _create_sms_client()
     delivery_info = smsclient.get_delivery_report(ref, dest)
+    if not isinstance(delivery_info, dict) or not delivery_info.get('statut_delivred'):
+        return None
+    return DELIVERY_STATUS_MAP.get(delivery_info['statut_delivred'])
 
-    if not isinstance(delivery_info, dict):
-        return False
 
-    if not delivery_info.get('success'):
-        return False
-
-    # Si l'appel est un succès, on vérifie que la plateforme signale la livraison effective.
-    return bool(delivery_info.get('delivered', False))
-
-def prepare_sms_bulk(vtokens: list, election_uid: str, flash: int) -> list:
-    """Prépare une liste de numéros de téléphone pour l'envoi en masse.
+def prepare_sms_bulk(vtokens: list, election_uid: str, flash: int, renderer=None) -> list:
+    """Prépare les messages (`Dest`, `Sms`, `Sender`, `Flash`) pour l'envoi en masse.
 
-    Extrait les numéros de téléphone des objets VoteToken fournis.
+    Le gabarit et la configuration sont compilés une seule fois par `CampaignRenderer`.
     """
-    messages = []
-    for token in vtokens:
-        payload = {
-            'Dest': token.phone_number,
-            'Sms': generate_vote_message(token, election_uid),
-            'Sender': current_app.config.get('SMS_API_SENDER'),
-            'Flash': flash,
-        }
-        messages.append(payload)
-    return messages
+    if renderer is None:
+        renderer = CampaignRenderer(election_uid, flash=flash)
+    return list(renderer.iter_payloads(vtokens))
 
-def send_vote_sms_bulk(vtokens: list, election_uid: str, flash: int) -> dict:
+def send_vote_sms_bulk(vtokens: list, election_uid: str, flash: int, renderer=None) -> dict:
     """Send SMS messages in bulk containing the voting URL using external SMS API.
 
-    Returns a dict with `success` (bool) and `error` (str) on failure.
+    Returns a dict with `success` (bool) and `error` (str) on failure. On success
+    `refs` maps each token id to its SMS reference (None when the provider did not
+    return one for that recipient) and `failures` maps the token ids whose `Rep`
+    entry reports a failure to that entry's `Statut`: `Etat == 1` only means the
+    call was accepted, not that every recipient was.
     """
-    messages = prepare_sms_bulk(vtokens, election_uid, flash)
+    messages = prepare_sms_bulk(vtokens, election_uid, flash, renderer=renderer)
     smsclient = _create_sms_client()
     result = smsclient.send_bulk_sms(messages)
 
     if result.get('success'):
-        return {'success': True, 'ref': result.get('ref', 'N/A')}
+        refs, failures = _map_bulk_reps(vtokens, result.get('reps', []))
+        return {'success': True, 'ref': result.get('ref', 'N/A'), 'refs': refs, 'failures': failures}
     else:
-        return {'success': False, 'error': result.get('error', 'unknown error')}
\ No newline at end of file
+        return {'success': False, 'error': result.get('error', result.get('status', 'unknown error'))}
+
+
+# Mots d'un `Statut` de `Rep` signalant qu'un destinataire d'un envoi groupé a été refusé
+BULK_REP_FAILURE_WORDS = ('echec', 'échec', 'erreur', 'error', 'fail', 'invalid', 'rejet', 'refus', 'insuffisant')
+
+
+def _rep_failed(rep: dict) -> bool:
+    """True si l'entrée `Rep` indique l'échec de ce destinataire (`Statut` 0 ou message d'erreur)."""
+    statut = rep.get('Statut')
+    if statut is None or statut == '':
+        return False
+    if isinstance(statut, (bool, int)) or str(statut).strip().lstrip('-').isdigit():
+        return int(statut) != 1
+    text = str(statut).lower()
+    return any(word in text for word in BULK_REP_FAILURE_WORDS)
+
+
+def _map_bulk_reps(vtokens: list, reps: list):
+    """Associe les entrées `Rep` d'un envoi groupé aux jetons, par `Dest` puis par position.
+
+    Retourne `(refs, failures)` : la référence SMS de chaque jeton (None si
+    absente) et, pour les destinataires en échec, leur `Statut`.
+    """
+    by_dest = {}
+    for rep in reps:
+        if isinstance(rep, dict) and rep.get('Dest'):
+            by_dest.setdefault(str(rep['Dest']), rep)
+    refs = {}
+    failures = {}
+    for position, vtoken in enumerate(vtokens):
+        rep = by_dest.get(vtoken.phone_number)
+        if rep is None and not by_dest and position < len(reps) and isinstance(reps[position], dict):
+            rep = reps[position]
+        rep = rep or {}
+        if _rep_failed(rep):
+            failures[vtoken.id] = str(rep['Statut'])
+        refs[vtoken.id] = rep.get('Ref') or None
+    return refs, failures
\ No newline at end of file
@@ -0,0 +1,206 @@
+"""Group commit for vote casting (optional, `VOTE_GROUP_COMMIT=true`).
+
+When polls open most ballots arrive within minutes and committing each one
+in its own transaction caps throughput at the database commit rate.
+`VoteBatcher` queues validated ballots in memory and a single writer thread
+records them in batches: up to `VOTE_BATCH_SIZE` ballots, or whatever arrived
+within `VOTE_BATCH_INTERVAL_MS` of the first one, in one transaction. Tokens
+are consumed with the same conditional UPDATE as `utils.cast_vote` (one
+statement per election in the batch), so a token used twice, even within the
+same batch, records one vote.
+
+`submit()` blocks the request until its batch is committed and returns the
+consumed token id (None if the token was invalid or already used); nothing is
+acknowledged before it is durable. Ballots still queued when the process dies
+were never acknowledged, so clients see an error and can retry.
+
+When `VOTE_BATCH_TIMEOUT` expires, a ballot still waiting in the queue is
+cancelled and `BallotNotRecorded` is raised (the client can safely retry); a
+ballot already being written raises `BallotOutcomeUnknown`, since its commit
+may still succeed. If a batch fails, its ballots are retried one per
+transaction so that one bad ballot does not fail the others.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from datetime import datetime
+
+
+class BallotNotRecorded(Exception):
+    """The ballot was cancelled before being written: nothing was recorded."""
+
+
+class BallotOutcomeUnknown(Exception):
+    """The ballot was being committed when the wait timed out: it may or may not be recorded."""
+
+
+class VoteBatcher:
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.batch_size = 50
+        self.interval = 0.01
+        self.timeout = 10.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.ballots = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('VOTE_GROUP_COMMIT', False)
+        self.configure(
+            batch_size=int(app.config.get('VOTE_BATCH_SIZE', 50)),
+            interval_ms=float(app.config.get('VOTE_BATCH_INTERVAL_MS', 10)),
+        )
+        self.timeout = float(app.config.get('VOTE_BATCH_TIMEOUT', 10))
+
+    def configure(self, batch_size: int = None, interval_ms: float = None):
+        if batch_size is not None:
+            self.batch_size = max(1, batch_size)
+        if interval_ms is not None:
+            self.interval = max(0.0, interval_ms) / 1000.0
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def submit(self, election_id: int, token_hash: str, candidate_id: int):
+        """Queue a ballot and wait until its batch is committed; returns the token id or None.
+
+        Raises `BallotNotRecorded` or `BallotOutcomeUnknown` after `timeout`.
+        """
+        self._ensure_started()
+        future = Future()
+        self._queue.put((election_id, token_hash, candidate_id, future))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                raise BallotNotRecorded('vote batch timed out before this ballot was written')
+            if future.done():
+                return future.result()
+            raise BallotOutcomeUnknown('vote batch still committing')
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # Ballots whose request gave up waiting are dropped; the others can no longer be cancelled
+            batch = [b for b in batch if b[3].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            with self.app.app_context():
+                try:
+                    results = record_ballots([b[:3] for b in batch])
+                except Exception:
+                    self.app.logger.exception('vote batch of %d failed, retrying ballots one by one', len(batch))
+                    self._record_one_by_one(batch)
+                    continue
+            self.batches += 1
+            self.ballots += len(batch)
+            for ballot, token_id in zip(batch, results):
+                ballot[3].set_result(token_id)
+
+    def _record_one_by_one(self, batch: list):
+        for ballot in batch:
+            try:
+                token_id = record_ballots([ballot[:3]])[0]
+            except Exception as exc:
+                self.app.logger.exception('ballot for election %s failed', ballot[0])
+                ballot[3].set_exception(exc)
+                continue
+            self.batches += 1
+            self.ballots += 1
+            ballot[3].set_result(token_id)
+
+    def metrics(self) -> dict:
+        return {
+            'enabled': self.enabled,
+            'batches': self.batches,
+            'ballots': self.ballots,
+            'avg_batch': round(self.ballots / self.batches, 2) if self.batches else None,
+            'queued': self._queue.qsize(),
+        }
+
+
+vote_batcher = VoteBatcher()
+
+
+def record_ballots(ballots: list) -> list:
+    """Record `(election_id, token_hash, candidate_id)` ballots in one transaction.
+
+    Returns, in order, the consumed token id of each ballot or None when its
+    token was unknown, of another election, already used, or repeated earlier
+    in `ballots`, or when its election is already sealed.
+
+    Rows are locked in a fixed order (tokens per election, then candidate
+    counters, then turnout buckets, each sorted by id) so concurrent batches
+    cannot deadlock on PostgreSQL.
+    """
+    from models import db, Vote, VoteToken, Candidate
+    from sqlalchemy import update
+    from utils import record_turnout, unsealed_token_election
+
+    try:
+        by_election = {}
+        for election_id, token_hash, _ in ballots:
+            by_election.setdefault(election_id, set()).add(token_hash)
+        consumed = {}
+        for election_id, hashes in sorted(by_election.items()):
+            stmt = update(VoteToken).where(
+                VoteToken.token_hash.in_(hashes),
+                VoteToken.election_id == election_id,
+                VoteToken.is_active.is_(True),
+                unsealed_token_election(),
+            ).values(is_active=False)
+            if db.engine.dialect.name in ('postgresql', 'sqlite'):
+                rows = db.session.execute(stmt.returning(VoteToken.id, VoteToken.token_hash))
+                consumed.update({(election_id, h): token_id for token_id, h in rows})
+            else:
+                for token_hash in hashes:
+                    one = stmt.where(VoteToken.token_hash == token_hash)
+                    if db.session.execute(one).rowcount == 1:
+                        consumed[(election_id, token_hash)] = db.session.query(VoteToken.id) \
+                            .filter_by(token_hash=token_hash).scalar()
+
+        results = []
+        increments = {}
+        votes = []
+        now = datetime.utcnow()
+        for election_id, token_hash, candidate_id in ballots:
+            # pop: a token repeated in the batch only counts for its first ballot
+            token_id = consumed.pop((election_id, token_hash), None)
+            results.append(token_id)
+            if token_id is not None:
+                votes.append({'election_id': election_id, 'candidate_id': candidate_id, 'created_at': now})
+                increments[candidate_id] = increments.get(candidate_id, 0) + 1
+        if votes:
+            db.session.execute(Vote.__table__.insert(), votes)
+            for candidate_id, n in sorted(increments.items()):
+                db.session.query(Candidate).filter(Candidate.id == candidate_id).update(
+                    {Candidate.vote_count: Candidate.vote_count + n}, synchronize_session=False
+                )
+            turnout = {}
+            for vote in votes:
+                key = (vote['election_id'], vote['candidate_id'])
+                turnout[key] = turnout.get(key, 0) + 1
+            for election_id in sorted({e for e, _ in turnout}):
+                record_turnout(election_id, {(c, now): n for (e, c), n in turnout.items() if e == election_id})
+        db.session.commit()
+        return results
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        db.session.remove()